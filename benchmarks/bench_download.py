@@ -0,0 +1,131 @@
+import argparse
+import http.server
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+import resource_downloader  # noqa: E402
+from resource_downloader import create_session, download_file  # noqa: E402
+
+
+class QuietTqdm:
+    def __init__(self, iterable=None, **kwargs):
+        self.iterable = iterable
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        return iter(self.iterable or ())
+
+    def update(self, n):
+        pass
+
+    def reset(self, total=0):
+        pass
+
+
+def serve(
+    directory: str, latency: float, connect_latency: float
+) -> http.server.ThreadingHTTPServer:
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=directory, **kwargs)
+
+        def setup(self):
+            # Stands in for the TCP/TLS handshake of a new connection.
+            time.sleep(connect_latency)
+            super().setup()
+
+        def send_head(self):
+            # Stands in for the round trip to a remote portal.
+            time.sleep(latency)
+            return super().send_head()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def download_per_file_with_head(url: str, out_dir: str) -> str:
+    # What the downloader used to do: a fresh session and a HEAD per file.
+    session = create_session()
+    try:
+        session.head(url, timeout=30, allow_redirects=True)
+        return download_file(url, out_dir, session=session)
+    finally:
+        session.close()
+
+
+def run(urls: list[str], out_dir: str, workers: int, shared: bool) -> float:
+    shutil.rmtree(out_dir, ignore_errors=True)
+    session = create_session(pool_size=workers) if shared else None
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if shared:
+            fetch = lambda url: download_file(url, out_dir, session=session)
+        else:
+            fetch = lambda url: download_per_file_with_head(url, out_dir)
+        list(executor.map(fetch, urls))
+    elapsed = time.perf_counter() - start
+    if session is not None:
+        session.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Per-file sessions vs one pooled session against a local server"
+    )
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--size-kb", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--connect-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    resource_downloader.tqdm = QuietTqdm
+    with tempfile.TemporaryDirectory() as tmp:
+        served = os.path.join(tmp, "served")
+        os.makedirs(served)
+        payload = os.urandom(args.size_kb * 1024)
+        for n in range(args.files):
+            with open(os.path.join(served, f"file{n}.bin"), "wb") as f:
+                f.write(payload)
+
+        server = serve(served, args.latency_ms / 1000, args.connect_ms / 1000)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        urls = [f"{base}/file{n}.bin" for n in range(args.files)]
+        out_dir = os.path.join(tmp, "out")
+
+        try:
+            per_file = run(urls, out_dir, args.workers, shared=False)
+            pooled = run(urls, out_dir, args.workers, shared=True)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    print(f"files={args.files} size={args.size_kb}KB workers={args.workers}")
+    print(
+        f"session+HEAD per file: {per_file:.3f}s ({args.files / per_file:,.0f} files/s)"
+    )
+    print(f"pooled session:        {pooled:.3f}s ({args.files / pooled:,.0f} files/s)")
+    print(f"speedup:               {per_file / pooled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
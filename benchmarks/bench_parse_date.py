@@ -0,0 +1,58 @@
+import argparse
+import os
+import random
+import sys
+import timeit
+from datetime import date, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from utils import parse_date, parse_dates  # noqa: E402
+
+
+def make_dates(rows: int, distinct: int, invalid_ratio: float, seed: int) -> pd.Series:
+    rng = random.Random(seed)
+    start = date(2015, 1, 1)
+    pool = [(start + timedelta(days=i)).strftime("%d.%m.%Y") for i in range(distinct)]
+    pool += ["", "31.04.2020", "2020-01-01", "n/a"]
+    values = []
+    for _ in range(rows):
+        if rng.random() < invalid_ratio:
+            values.append(rng.choice(pool[distinct:]))
+        else:
+            values.append(rng.choice(pool[:distinct]))
+    return pd.Series(values, dtype=object)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="parse_dates vs Series.apply")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=3_000)
+    parser.add_argument("--invalid-ratio", type=float, default=0.02)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    values = make_dates(args.rows, args.distinct, args.invalid_ratio, seed=42)
+    assert list(parse_dates(values)) == list(values.apply(parse_date))
+
+    apply_time = min(
+        timeit.repeat(lambda: values.apply(parse_date), number=1, repeat=args.repeat)
+    )
+    vector_time = min(
+        timeit.repeat(lambda: parse_dates(values), number=1, repeat=args.repeat)
+    )
+
+    print(f"rows={args.rows} distinct={args.distinct}")
+    print(
+        f"apply(parse_date): {apply_time:.3f}s ({args.rows / apply_time:,.0f} rows/s)"
+    )
+    print(
+        f"parse_dates:       {vector_time:.3f}s ({args.rows / vector_time:,.0f} rows/s)"
+    )
+    print(f"speedup:           {apply_time / vector_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+from synthetic_data import DELIMITERS, ENCODINGS, dataset_path  # noqa: E402
+
+STAGES = ["parse_dates", "detect_encoding", "normalize_csv", "unpack_zip", "import"]
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_DATA_DIR = os.path.join(BENCH_DIR, ".data")
+DEFAULT_TOLERANCE = 0.10
+RSS_SAMPLE_SECONDS = 0.05
+
+SCHEMA_SQL = """
+CREATE TABLE cases (
+    id SERIAL PRIMARY KEY,
+    court_name text NOT NULL,
+    case_number text NOT NULL UNIQUE,
+    case_proc text NULL,
+    registration_date date NULL,
+    judge text NULL,
+    judges text NULL,
+    participants text NULL,
+    stage_date date NULL,
+    stage_name text NULL,
+    cause_result text NULL,
+    cause_dep text NULL,
+    type text NULL,
+    description text NULL
+);
+CREATE TABLE data_version (
+    id integer PRIMARY KEY,
+    version bigint NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+"""
+
+
+def _link_or_copy(src: str, dest: str):
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+def _stage_parse_dates(csv_path: str, work_dir: str, options: dict) -> float:
+    import pandas as pd
+
+    from utils import parse_dates
+
+    sep = DELIMITERS[options["delimiter"]]
+    values = pd.read_csv(
+        csv_path,
+        sep=sep,
+        encoding=options["encoding"],
+        dtype=str,
+        usecols=["registration_date"],
+        on_bad_lines="skip",
+    )["registration_date"]
+    started = time.perf_counter()
+    parse_dates(values)
+    return time.perf_counter() - started
+
+
+def _stage_detect_encoding(csv_path: str, work_dir: str, options: dict) -> float:
+    from detect_encoding import detect_encoding
+
+    started = time.perf_counter()
+    detect_encoding(csv_path, cache_path=os.path.join(work_dir, "encodings.json"))
+    return time.perf_counter() - started
+
+
+def _stage_normalize_csv(csv_path: str, work_dir: str, options: dict) -> float:
+    from csv_to_db import normalize_csv
+
+    # A private copy, so the encoding and dialect caches start cold.
+    source = os.path.join(work_dir, os.path.basename(csv_path))
+    _link_or_copy(csv_path, source)
+    started = time.perf_counter()
+    normalize_csv(source, os.path.join(work_dir, "normalized.csv"), options["chunk"])
+    return time.perf_counter() - started
+
+
+def _stage_unpack_zip(csv_path: str, work_dir: str, options: dict) -> float:
+    from zip_unpacker import create_unpack_pool, unpack_zip
+
+    zip_path = csv_path[: -len(".csv")] + ".zip"
+    if not os.path.exists(zip_path):
+        from synthetic_data import write_cases_zip
+
+        write_cases_zip(zip_path + ".part", [csv_path])
+        os.replace(zip_path + ".part", zip_path)
+    pool = create_unpack_pool(options["unpack_workers"])
+    try:
+        started = time.perf_counter()
+        unpack_zip(zip_path, os.path.join(work_dir, "unpacked"), pool)
+        return time.perf_counter() - started
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def _database_dsn(admin_dsn: str, name: str) -> str:
+    parts = urlsplit(admin_dsn)
+    return urlunsplit(parts._replace(path=f"/{name}"))
+
+
+async def _run_import(csv_path: str, work_dir: str, options: dict) -> float:
+    import asyncpg
+
+    import csv_to_db
+
+    admin_dsn = options["database_url"]
+    name = f"bench_cases_{os.getpid()}"
+    admin = await asyncpg.connect(admin_dsn)
+    try:
+        await admin.execute(f"CREATE DATABASE {name}")
+        dsn = _database_dsn(admin_dsn, name)
+        conn = await asyncpg.connect(dsn)
+        try:
+            await conn.execute(SCHEMA_SQL)
+        finally:
+            await conn.close()
+
+        unpacked = os.path.join(work_dir, "unpacked")
+        os.makedirs(unpacked)
+        _link_or_copy(csv_path, os.path.join(unpacked, os.path.basename(csv_path)))
+        csv_to_db.DATABASE_URL = dsn
+        started = time.perf_counter()
+        await csv_to_db.import_csv_files(
+            unpacked,
+            chunk_size=options["chunk"] or csv_to_db.DEFAULT_CHUNK_SIZE,
+            workers=options["workers"],
+            copy_connections=options["copy_connections"],
+        )
+        return time.perf_counter() - started
+    finally:
+        await admin.execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)")
+        await admin.close()
+
+
+def _stage_import(csv_path: str, work_dir: str, options: dict) -> float:
+    return asyncio.run(_run_import(csv_path, work_dir, options))
+
+
+def _run_stage(stage: str, csv_path: str, options: dict, results):
+    # Runs in a fresh process so ru_maxrss is this stage's own peak; reaped
+    # worker processes count through RUSAGE_CHILDREN.
+    with tempfile.TemporaryDirectory(dir=options["data_dir"]) as work_dir:
+        seconds = globals()[f"_stage_{stage}"](csv_path, work_dir, options)
+    peak_kb = None
+    if resource:
+        peak_kb = max(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        )
+    results.put({"seconds": seconds, "peak_rss_kb": peak_kb})
+
+
+def _tree_rss_kb(root: int) -> int | None:
+    # Resident memory of ``root`` plus all live descendants, read from /proc.
+    # Forkserver workers are not children of the stage process, so rusage
+    # never sees them; sampling the tree also adds up concurrent workers.
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return None
+    children: dict[int, list[int]] = {}
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="ascii", errors="replace") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    page_kb = os.sysconf("SC_PAGE_SIZE") // 1024
+    total = 0
+    pending = [root]
+    while pending:
+        pid = pending.pop()
+        try:
+            with open(f"/proc/{pid}/statm", encoding="ascii") as f:
+                total += int(f.read().split()[1]) * page_kb
+        except (OSError, ValueError, IndexError):
+            continue
+        pending.extend(children.get(pid, ()))
+    return total
+
+
+def _measure(stage: str, csv_path: str, options: dict) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    process = ctx.Process(target=_run_stage, args=(stage, csv_path, options, results))
+    process.start()
+    tree_kb = None
+    while process.is_alive():
+        sample = _tree_rss_kb(process.pid)
+        if sample is not None:
+            tree_kb = max(tree_kb or 0, sample)
+        process.join(RSS_SAMPLE_SECONDS)
+    if process.exitcode != 0:
+        raise RuntimeError(f"Stage {stage} failed with exit code {process.exitcode}")
+    result = results.get()
+    peaks = [kb for kb in (result["peak_rss_kb"], tree_kb) if kb is not None]
+    result["peak_rss_kb"] = max(peaks) if peaks else None
+    return result
+
+
+def run_stage(stage: str, csv_path: str, options: dict, repeat: int = 1) -> dict:
+    # Best time of ``repeat`` runs; the peak RSS is the worst one seen.
+    runs = [_measure(stage, csv_path, options) for _ in range(max(repeat, 1))]
+    seconds = max(min(run["seconds"] for run in runs), 1e-9)
+    size = os.path.getsize(csv_path)
+    peaks = [run["peak_rss_kb"] for run in runs if run["peak_rss_kb"] is not None]
+    peak_kb = max(peaks) if peaks else None
+    return {
+        "seconds": round(seconds, 4),
+        "rows_per_s": round(options["rows"] / seconds),
+        "mb_per_s": round(size / (1024 * 1024) / seconds, 2),
+        "peak_rss_mb": round(peak_kb / 1024, 1) if peak_kb is not None else None,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for stage, result in current.items():
+        before = baseline.get(stage)
+        if not before:
+            continue
+        if result["rows_per_s"] < before["rows_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{stage}: {result['rows_per_s']:,} rows/s "
+                f"(baseline {before['rows_per_s']:,})"
+            )
+        if (
+            result["peak_rss_mb"] is not None
+            and before.get("peak_rss_mb") is not None
+            and result["peak_rss_mb"] > before["peak_rss_mb"] * (1 + tolerance)
+        ):
+            regressions.append(
+                f"{stage}: peak RSS {result['peak_rss_mb']} MB "
+                f"(baseline {before['peak_rss_mb']} MB)"
+            )
+    return regressions
+
+
+def _delta(result: dict, before: dict | None) -> str:
+    if not before:
+        return "new"
+    change = result["rows_per_s"] / before["rows_per_s"] - 1
+    return f"{change:+.1%}"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Throughput and peak memory of each import stage on synthetic data"
+    )
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--encoding", choices=ENCODINGS, default="cp1251")
+    parser.add_argument("--delimiter", choices=DELIMITERS, default="semicolon")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--repeat", type=int, default=3, help="keep the best of N runs")
+    parser.add_argument("--chunk", type=int, default=None, help="CSV chunk size")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--copy-connections", type=int, default=1)
+    parser.add_argument("--unpack-workers", type=int, default=None)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="record these results"
+    )
+    parser.add_argument(
+        "--check", action="store_true", help="exit with 1 on a regression"
+    )
+    args = parser.parse_args()
+
+    stages = list(args.stages)
+    database_url = os.getenv("BENCH_DATABASE_URL")
+    if "import" in stages and not database_url:
+        print("Skipping import: set BENCH_DATABASE_URL to a throwaway PostgreSQL")
+        stages.remove("import")
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    started = time.perf_counter()
+    csv_path = dataset_path(
+        args.data_dir, args.rows, args.encoding, DELIMITERS[args.delimiter]
+    )
+    size_mb = os.path.getsize(csv_path) / (1024 * 1024)
+    print(
+        f"Dataset {os.path.basename(csv_path)}: {args.rows:,} rows, {size_mb:.1f} MB "
+        f"(ready in {time.perf_counter() - started:.1f}s)"
+    )
+
+    options = {
+        "rows": args.rows,
+        "encoding": args.encoding,
+        "delimiter": args.delimiter,
+        "chunk": args.chunk,
+        "workers": args.workers,
+        "copy_connections": args.copy_connections,
+        "unpack_workers": args.unpack_workers,
+        "data_dir": args.data_dir,
+        "database_url": database_url,
+    }
+    key = f"rows={args.rows} encoding={args.encoding} delimiter={args.delimiter}"
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baselines = json.load(f)
+    baseline = baselines.get(key, {}).get("stages", {})
+
+    current = {}
+    print(
+        f"{'stage':<16}{'seconds':>9}{'rows/s':>14}{'MB/s':>9}"
+        f"{'peak RSS MB':>13}{'vs baseline':>13}"
+    )
+    for stage in stages:
+        result = run_stage(stage, csv_path, options, args.repeat)
+        current[stage] = result
+        rss = result["peak_rss_mb"] if result["peak_rss_mb"] is not None else "n/a"
+        print(
+            f"{stage:<16}{result['seconds']:>9.2f}{result['rows_per_s']:>14,}"
+            f"{result['mb_per_s']:>9.1f}{rss:>13}"
+            f"{_delta(result, baseline.get(stage)):>13}"
+        )
+
+    regressions = compare(current, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"❌ Regression: {regression}")
+
+    if args.save_baseline:
+        entry = baselines.setdefault(key, {"stages": {}})
+        entry["stages"].update(current)
+        entry["machine"] = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        }
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baseline for {key} to {args.baseline}")
+
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
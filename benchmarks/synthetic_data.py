@@ -0,0 +1,189 @@
+import argparse
+import csv
+import os
+import random
+import zipfile
+from datetime import date, timedelta
+from typing import Iterator
+
+# Same header as the published exports.
+HEADER = [
+    "court_name",
+    "case_number",
+    "case_proc",
+    "registration_date",
+    "judge",
+    "judges",
+    "participants",
+    "stage_date",
+    "stage_name",
+    "cause_result",
+    "cause_dep",
+    "type",
+    "description",
+]
+DELIMITERS = {"semicolon": ";", "comma": ",", "tab": "\t"}
+ENCODINGS = ["cp1251", "utf-8-sig"]
+
+COURTS = [
+    "Печерський районний суд міста Києва",
+    "Шевченківський районний суд міста Києва",
+    "Господарський суд Львівської області",
+    "Харківський апеляційний суд",
+    "Одеський окружний адміністративний суд",
+    "Дніпровський районний суд м. Дніпра",
+]
+COURT_CODES = [757, 761, 914, 640, 420, 200]
+SUFFIXES = ["ц", "к", "а", "п", "адм"]
+STAGES = [
+    "Призначено до розгляду",
+    "Розглянуто",
+    "Відкладено",
+    "Повернуто",
+    "Залишено без розгляду",
+]
+JUDGES = ["Іваненко І.І.", "Петренко П.П.", "Сидоренко С.С.", "Коваль О.М."]
+RESULTS = ["задоволено", "відмовлено", "частково задоволено", ""]
+TYPES = ["Цивільне", "Кримінальне", "Адміністративне", "Господарське"]
+DESCRIPTIONS = [
+    "про стягнення заборгованості",
+    "про розірвання шлюбу",
+    "про визнання права власності",
+    'про відшкодування шкоди; "позов" громадянина',
+]
+
+NBSP = "\xa0"
+START = date(2015, 1, 1)
+
+
+def _case_number(rng: random.Random, n: int) -> str:
+    code = rng.choice(COURT_CODES)
+    number = f"{code}/{n}/{rng.randint(15, 24)}-{rng.choice(SUFFIXES)}"
+    # Real files carry both "№ 757/..." and bare numbers, sometimes with NBSPs.
+    roll = rng.random()
+    if roll < 0.3:
+        return f"№ {number}"
+    if roll < 0.35:
+        return f"№{NBSP}{number}{NBSP}"
+    return number
+
+
+def _date(rng: random.Random) -> str:
+    return (START + timedelta(days=rng.randrange(3650))).strftime("%d.%m.%Y")
+
+
+def generate_rows(
+    rows: int,
+    seed: int = 42,
+    duplicate_ratio: float = 0.05,
+    blank_ratio: float = 0.01,
+) -> Iterator[list[str]]:
+    rng = random.Random(seed)
+    recent: list[str] = []
+    for n in range(rows):
+        roll = rng.random()
+        if roll < blank_ratio:
+            number = rng.choice(["", " ", "NULL", NBSP])
+        elif roll < blank_ratio + duplicate_ratio and recent:
+            number = rng.choice(recent)
+        else:
+            number = _case_number(rng, n)
+            if len(recent) < 10_000:
+                recent.append(number)
+            else:
+                recent[n % 10_000] = number
+        judge = rng.choice(JUDGES)
+        yield [
+            rng.choice(COURTS) + (NBSP if rng.random() < 0.05 else ""),
+            number,
+            str(rng.randrange(1_000_000)),
+            _date(rng) if rng.random() > 0.02 else "",
+            judge,
+            f"головуючий суддя: {judge}, учасник колегії: {rng.choice(JUDGES)}",
+            f"позивач: ТОВ «Компанія {rng.randrange(1000)}», відповідач: фізична особа",
+            _date(rng) if rng.random() > 0.01 else "31.02.2020",
+            rng.choice(STAGES),
+            rng.choice(RESULTS),
+            rng.choice(["Перша інстанція", "Апеляція"]),
+            rng.choice(TYPES),
+            rng.choice(DESCRIPTIONS),
+        ]
+
+
+def write_cases_csv(
+    path: str,
+    rows: int,
+    encoding: str = "cp1251",
+    delimiter: str = ";",
+    seed: int = 42,
+    duplicate_ratio: float = 0.05,
+    blank_ratio: float = 0.01,
+    malformed_ratio: float = 0.001,
+) -> int:
+    rng = random.Random(seed + 1)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding=encoding, newline="") as f:
+        writer = csv.writer(f, delimiter=delimiter, lineterminator="\r\n")
+        writer.writerow(HEADER)
+        batch = []
+        for row in generate_rows(rows, seed, duplicate_ratio, blank_ratio):
+            if rng.random() < malformed_ratio:
+                # Too many fields: parsers skip the line as a bad row.
+                writer.writerows(batch)
+                batch.clear()
+                f.write(delimiter.join(row + ["extra", "fields"]) + "\r\n")
+                continue
+            batch.append(row)
+            if len(batch) >= 10_000:
+                writer.writerows(batch)
+                batch.clear()
+        writer.writerows(batch)
+    return os.path.getsize(path)
+
+
+def write_cases_zip(zip_path: str, csv_paths: list[str]) -> int:
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for path in csv_paths:
+            zf.write(path, os.path.basename(path))
+        zf.writestr("readme.txt", "Synthetic court cases for benchmarks\n")
+    return os.path.getsize(zip_path)
+
+
+def dataset_path(
+    data_dir: str, rows: int, encoding: str, delimiter: str, seed: int = 42
+) -> str:
+    # Generated once per parameter set and reused by later runs.
+    name = next(k for k, v in DELIMITERS.items() if v == delimiter)
+    path = os.path.join(data_dir, f"cases_{rows}_{encoding}_{name}_{seed}.csv")
+    if not os.path.exists(path):
+        partial = path + ".part"
+        write_cases_csv(partial, rows, encoding, delimiter, seed)
+        os.replace(partial, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic court cases CSV")
+    parser.add_argument("output")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--encoding", choices=ENCODINGS, default="cp1251")
+    parser.add_argument("--delimiter", choices=DELIMITERS, default="semicolon")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.05)
+    parser.add_argument("--malformed-ratio", type=float, default=0.001)
+    args = parser.parse_args()
+
+    size = write_cases_csv(
+        args.output,
+        args.rows,
+        args.encoding,
+        DELIMITERS[args.delimiter],
+        args.seed,
+        duplicate_ratio=args.duplicate_ratio,
+        malformed_ratio=args.malformed_ratio,
+    )
+    print(f"Wrote {args.rows} rows, {size / (1024 * 1024):.1f} MB to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
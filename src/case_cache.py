@@ -0,0 +1,112 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_MAX_ROWS = 1_000_000
+# SQLite limits the number of bound parameters per statement.
+LOOKUP_BATCH = 900
+
+
+class CaseCache:
+    """Local SQLite read-through cache of ``cases`` rows keyed by case_number.
+
+    Rows are stored as JSON lists in ``COLUMNS`` order; a NULL row records a
+    number known to be absent from the database. The whole cache is dropped
+    whenever the database ``data_version`` differs from the one it was filled
+    under, and the least recently used rows are evicted above ``max_rows``.
+    """
+
+    def __init__(self, path: str, max_rows: int = DEFAULT_MAX_ROWS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_rows = max_rows
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS cases (
+                case_number TEXT PRIMARY KEY,
+                row TEXT,
+                last_used INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_cases_last_used ON cases (last_used);
+            """
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def version(self) -> Optional[int]:
+        found = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'data_version'"
+        ).fetchone()
+        return int(found[0]) if found else None
+
+    def sync(self, version: int) -> bool:
+        """Drop every cached row if ``version`` differs; return True if it did."""
+        if self.version == version:
+            return False
+        with self.conn:
+            self.conn.execute("DELETE FROM cases")
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('data_version', ?)",
+                (str(version),),
+            )
+        return True
+
+    def get_many(self, case_numbers: Sequence[str]) -> dict:
+        """Return ``{case_number: row or None}`` for every cached number."""
+        found: dict = {}
+        now = time.time_ns()
+        with self.conn:
+            for start in range(0, len(case_numbers), LOOKUP_BATCH):
+                batch = case_numbers[start : start + LOOKUP_BATCH]
+                marks = ", ".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT case_number, row FROM cases WHERE case_number IN ({marks})",
+                    batch,
+                ).fetchall()
+                for number, row in rows:
+                    found[number] = json.loads(row) if row is not None else None
+                self.conn.execute(
+                    f"UPDATE cases SET last_used = ? WHERE case_number IN ({marks})",
+                    [now, *batch],
+                )
+        return found
+
+    def put_many(self, rows: Iterable[Tuple[str, Optional[List]]]):
+        now = time.time_ns()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO cases (case_number, row, last_used) "
+                "VALUES (?, ?, ?)",
+                (
+                    (
+                        number,
+                        json.dumps(list(row), default=str) if row is not None else None,
+                        now,
+                    )
+                    for number, row in rows
+                ),
+            )
+            self._evict()
+
+    def _evict(self):
+        (count,) = self.conn.execute("SELECT count(*) FROM cases").fetchone()
+        excess = count - self.max_rows
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM cases WHERE case_number IN "
+                "(SELECT case_number FROM cases ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
@@ -0,0 +1,127 @@
+import csv
+import importlib.util
+from typing import Iterable
+
+from utils import load_json, normalize_column_name, update_json
+from zip_unpacker import open_source, source_cache_location, source_identity
+
+SAMPLE_SIZE = 64 * 1024
+DELIMITERS = ";,\t|"
+HEADER_SEARCH_LINES = 10
+CACHE_FILE = ".csv_dialects.json"
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+def _choose_engine(dialect: dict) -> str:
+    columns = dialect["columns"]
+    if (
+        HAS_PYARROW
+        and len(dialect["sep"]) == 1
+        and dialect["escapechar"] is None
+        and dialect["header_row"] in (0, None)
+        and len(set(columns)) == len(columns)
+    ):
+        return "pyarrow"
+    return "c"
+
+
+def _find_header(
+    lines: list[str], sep: str, quotechar: str, expected: set[str]
+) -> tuple[int | None, list[str], int]:
+    columns: list[str] = []
+    for index, line in enumerate(lines[:HEADER_SEARCH_LINES]):
+        if not line.strip():
+            continue
+        cells = next(csv.reader([line], delimiter=sep, quotechar=quotechar), [])
+        if not columns:
+            columns = cells
+        matched = len(expected & {normalize_column_name(c) for c in cells})
+        if matched:
+            return index, cells, matched
+    return None, columns, 0
+
+
+def sniff_csv(
+    path: str,
+    encoding: str,
+    expected_columns: Iterable[str] = (),
+    sample_size: int = SAMPLE_SIZE,
+) -> dict:
+    with open_source(path) as f:
+        raw = f.read(sample_size)
+
+    text = raw.decode(encoding, errors="ignore").lstrip("\ufeff")
+    if len(raw) == sample_size and "\n" in text:
+        text = text[: text.rindex("\n") + 1]
+    lines = text.splitlines()
+
+    try:
+        dialect = csv.Sniffer().sniff(text, delimiters=DELIMITERS)
+        sep = dialect.delimiter
+        quotechar = dialect.quotechar or '"'
+        escapechar = dialect.escapechar
+        doublequote = escapechar is None
+    except csv.Error:
+        first = next((line for line in lines if line.strip()), "")
+        counts = {d: first.count(d) for d in DELIMITERS}
+        sep = max(counts, key=counts.get) if any(counts.values()) else ";"
+        quotechar, doublequote, escapechar = '"', True, None
+
+    expected = {normalize_column_name(c) for c in expected_columns}
+    header_row, columns, matched = _find_header(lines, sep, quotechar, expected)
+    # csv.Sniffer prefers "," whenever several delimiters split every line the
+    # same number of times, e.g. ";" files whose text fields hold a fixed
+    # number of commas. The expected header settles it.
+    for candidate in DELIMITERS:
+        found = _find_header(lines, candidate, quotechar, expected)
+        if found[2] > matched:
+            sep = candidate
+            header_row, columns, matched = found
+    if header_row is None and expected and len(columns) != len(expected):
+        for candidate in DELIMITERS:
+            found = _find_header(lines, candidate, quotechar, expected)
+            if len(found[1]) == len(expected):
+                sep, columns = candidate, found[1]
+                break
+
+    dialect = {
+        "sep": sep,
+        "quotechar": quotechar,
+        "doublequote": doublequote,
+        "escapechar": escapechar,
+        "header_row": header_row,
+        "columns": columns if header_row is not None else [],
+        "column_count": len(columns),
+    }
+    dialect["engine"] = _choose_engine(dialect)
+    return dialect
+
+
+def sniff_csv_cached(
+    path: str,
+    encoding: str,
+    expected_columns: Iterable[str] = (),
+    cache_path: str | None = None,
+    cache_updates: dict | None = None,
+) -> dict:
+    default_cache_path, key = source_cache_location(path, CACHE_FILE)
+    cache_path = cache_path or default_cache_path
+    identity = source_identity(path)
+
+    cache = load_json(cache_path)
+    entry = cache.get(key)
+    if (
+        entry
+        and entry.get("identity") == identity
+        and entry.get("encoding") == encoding
+    ):
+        return entry["dialect"]
+
+    dialect = sniff_csv(path, encoding, expected_columns)
+    entry = {"identity": identity, "encoding": encoding, "dialect": dialect}
+    if cache_updates is not None:
+        cache_updates.setdefault(cache_path, {})[key] = entry
+    else:
+        update_json(cache_path, {key: entry})
+    return dialect
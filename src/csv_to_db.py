@@ -1,12 +1,40 @@
 import asyncio
+import contextlib
+import functools
 import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator
 
 import asyncpg
+import numpy as np
 import pandas as pd
+from tqdm import tqdm
 from dotenv import load_dotenv
 
+from csv_sniffer import sniff_csv_cached
 from detect_encoding import detect_encoding
-from utils import parse_date
+from metrics import RunMetrics
+from profiling import profile
+from utils import (
+    load_json,
+    normalize_column_name,
+    parse_dates,
+    save_cache_updates,
+    save_json,
+    worker_context,
+)
+from zip_unpacker import (
+    list_csv_members,
+    open_source,
+    source_digest,
+    source_key,
+    source_stat,
+    split_source,
+)
 
 EXPECTED_COLUMNS = [
     "court_name",
@@ -24,35 +52,249 @@ EXPECTED_COLUMNS = [
     "description",
 ]
 
+DEFAULT_CHUNK_SIZE = 200_000
+DEFAULT_MAX_CHUNK_BYTES = 256 * 1024 * 1024
+PROBE_ROWS = 1_000
+COPY_QUEUE_SIZE = 4
+QUEUE_POLL_SECONDS = 0.2
+MANIFEST_FILE = ".import_manifest.json"
+
+STAGING_COLUMNS = """
+(
+    court_name        text,
+    case_number       text,
+    case_proc         text,
+    registration_date date,
+    judge             text,
+    judges            text,
+    participants      text,
+    stage_date        date,
+    stage_name        text,
+    cause_result      text,
+    cause_dep         text,
+    type              text,
+    description       text
+)
+"""
+
+MERGE_SQL = """
+    INSERT INTO cases (court_name, case_number, case_proc, registration_date,
+                       judge, judges, participants, stage_date, stage_name,
+                       cause_result, cause_dep, type, description)
+    SELECT DISTINCT
+    ON (case_number) court_name, case_number, case_proc, registration_date,
+        judge, judges, participants, stage_date, stage_name,
+        cause_result, cause_dep, type, description
+    FROM {staging}
+    WHERE case_number IS NOT NULL AND case_number <> ''
+    ORDER BY case_number, stage_date DESC NULLS LAST
+    ON CONFLICT (case_number) DO
+    UPDATE
+        SET
+        court_name = COALESCE(EXCLUDED.court_name, cases.court_name),
+        case_proc = COALESCE(EXCLUDED.case_proc, cases.case_proc),
+        registration_date = COALESCE(EXCLUDED.registration_date, cases.registration_date),
+        judge = COALESCE(EXCLUDED.judge, cases.judge),
+        judges = COALESCE(EXCLUDED.judges, cases.judges),
+        participants = COALESCE(EXCLUDED.participants, cases.participants),
+        stage_date = EXCLUDED.stage_date,
+        stage_name = COALESCE(EXCLUDED.stage_name, cases.stage_name),
+        cause_result = COALESCE(EXCLUDED.cause_result, cases.cause_result),
+        cause_dep = COALESCE(EXCLUDED.cause_dep, cases.cause_dep),
+        type = COALESCE(EXCLUDED.type, cases.type),
+        description = COALESCE(EXCLUDED.description, cases.description)
+    WHERE EXCLUDED.stage_date IS NOT NULL
+      AND (cases.stage_date IS NULL
+       OR EXCLUDED.stage_date
+        > cases.stage_date);
+"""
+# Readers such as the export cache drop anything fetched under an older version.
+BUMP_DATA_VERSION_SQL = """
+    INSERT INTO data_version (id, version, updated_at)
+    VALUES (1, 1, now())
+    ON CONFLICT (id) DO UPDATE
+        SET version = data_version.version + 1, updated_at = now();
+"""
+
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL_SYNC")
 
+# pandas' default NA markers, so the pyarrow reader nulls the same cells.
+NA_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+
+
+def _csv_input(source: str, stack: contextlib.ExitStack):
+    path, member = split_source(source)
+    if member is None:
+        return path
+    return stack.enter_context(open_source(source))
+
 
-def normalize_csv(input_path: str, output_path: str) -> int:
-    enc = detect_encoding(input_path)
+def _read_csv_python(input_path: str, enc: str, stack: contextlib.ExitStack, **kwargs):
     try:
-        df = pd.read_csv(
-            input_path,
+        return pd.read_csv(
+            _csv_input(input_path, stack),
             encoding=enc,
             sep=None,
             engine="python",
             dtype=str,
             on_bad_lines="skip",
+            **kwargs,
         )
     except Exception:
-        df = pd.read_csv(
-            input_path,
+        return pd.read_csv(
+            _csv_input(input_path, stack),
             encoding=enc,
             sep=";",
             engine="python",
             dtype=str,
             on_bad_lines="skip",
+            **kwargs,
+        )
+
+
+def _dialect_options(dialect: dict, chunked: bool) -> dict:
+    engine = dialect["engine"]
+    # pyarrow reads the whole file at once, so chunked reads (the importer)
+    # always use the C parser; only a plain normalize_csv goes through pyarrow.
+    if chunked and engine == "pyarrow":
+        engine = "c"
+    options = {
+        "sep": dialect["sep"],
+        "quotechar": dialect["quotechar"],
+        "doublequote": dialect["doublequote"],
+        "escapechar": dialect["escapechar"],
+        "engine": engine,
+    }
+    if dialect["header_row"] is None:
+        if dialect["column_count"] == len(EXPECTED_COLUMNS):
+            options.update(header=None, names=EXPECTED_COLUMNS)
+    elif dialect["header_row"]:
+        options["skiprows"] = dialect["header_row"]
+    return options
+
+
+def _read_csv_pyarrow(
+    input_path: str, enc: str, dialect: dict, stack: contextlib.ExitStack
+) -> pd.DataFrame | None:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    columns = dialect["columns"] or EXPECTED_COLUMNS
+    short_rows = []
+
+    def on_invalid_row(row) -> str:
+        if row.actual_columns < row.expected_columns:
+            short_rows.append(row)
+        return "skip"
+
+    try:
+        table = pa_csv.read_csv(
+            _csv_input(input_path, stack),
+            read_options=pa_csv.ReadOptions(
+                encoding=enc,
+                skip_rows=1 if dialect["columns"] else 0,
+                column_names=columns,
+            ),
+            parse_options=pa_csv.ParseOptions(
+                delimiter=dialect["sep"],
+                quote_char=dialect["quotechar"],
+                double_quote=dialect["doublequote"],
+                newlines_in_values=True,
+                invalid_row_handler=on_invalid_row,
+            ),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={c: pa.string() for c in columns},
+                strings_can_be_null=True,
+                null_values=NA_VALUES,
+            ),
+        )
+    except Exception:
+        return None
+    # pandas keeps short rows padded with NaN; let the C engine handle those files
+    if short_rows:
+        return None
+    return table.to_pandas()
+
+
+def _read_csv(
+    input_path: str,
+    enc: str,
+    stack: contextlib.ExitStack,
+    cache_updates: dict | None = None,
+    **kwargs,
+):
+    try:
+        dialect = sniff_csv_cached(
+            input_path, enc, EXPECTED_COLUMNS, cache_updates=cache_updates
+        )
+        options = _dialect_options(dialect, "chunksize" in kwargs)
+        if options["engine"] == "pyarrow":
+            df = _read_csv_pyarrow(input_path, enc, dialect, stack)
+            if df is not None:
+                return df
+            options["engine"] = "c"
+        return pd.read_csv(
+            _csv_input(input_path, stack),
+            encoding=enc,
+            dtype=str,
+            on_bad_lines="skip",
+            **options,
+            **kwargs,
         )
+    except Exception:
+        return _read_csv_python(input_path, enc, stack, **kwargs)
+
+
+def _iter_raw_chunks(
+    input_path: str,
+    chunk_size: int | None,
+    max_chunk_bytes: int,
+    cache_updates: dict | None = None,
+) -> Iterator[pd.DataFrame]:
+    enc = detect_encoding(input_path, cache_updates=cache_updates)
+    with contextlib.ExitStack() as stack:
+        if chunk_size is None:
+            yield _read_csv(input_path, enc, stack, cache_updates)
+            return
+
+        # Probe a small chunk first so the ceiling holds from the very first read.
+        rows = min(chunk_size, PROBE_ROWS)
+        with _read_csv(input_path, enc, stack, cache_updates, chunksize=rows) as reader:
+            while True:
+                try:
+                    chunk = reader.get_chunk(rows)
+                except StopIteration:
+                    return
+                used = int(chunk.memory_usage(deep=True).sum())
+                if len(chunk):
+                    per_row = max(1, used // len(chunk))
+                    rows = max(1, min(chunk_size, max_chunk_bytes // per_row))
+                yield chunk
 
-    df.columns = [
-        c.replace("\ufeff", "").strip().lower().replace(" ", "_").replace("-", "_")
-        for c in df.columns
-    ]
+
+def _clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [normalize_column_name(c) for c in df.columns]
 
     for col in EXPECTED_COLUMNS:
         if col not in df.columns:
@@ -72,113 +314,581 @@ def normalize_csv(input_path: str, output_path: str) -> int:
         if df[col].dtype == object:
             df[col] = df[col].str.replace("\xa0", "", regex=False).str.strip()
 
-    df = df[(df["case_number"] != "") & (df["court_name"] != "")]
-    df = df.drop_duplicates(subset=["case_number"], keep="first")
+    return df[(df["case_number"] != "") & (df["court_name"] != "")]
+
+
+class _SeenCaseNumbers:
+    # 64-bit hashes of the case numbers already yielded, 8 bytes each instead
+    # of a Python string per number. Kept as sorted runs merged like a binary
+    # counter, so every hash is copied O(log n) times and a lookup is a
+    # vectorized binary search per run. A hash collision (~n²/2⁶⁵) would drop
+    # one distinct case.
+
+    def __init__(self):
+        self._runs: list[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return sum(len(run) for run in self._runs)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self._runs:
+            positions = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            found |= run[positions] == hashes
+        return found
+
+    def add(self, hashes: np.ndarray):
+        if not len(hashes):
+            return
+        run = np.sort(hashes)
+        while self._runs and len(self._runs[-1]) <= len(run):
+            run = np.sort(np.concatenate((self._runs.pop(), run)), kind="stable")
+        self._runs.append(run)
+
+
+def iter_normalized_chunks(
+    input_path: str,
+    chunk_size: int | None = DEFAULT_CHUNK_SIZE,
+    max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+    counts: dict | None = None,
+    cache_updates: dict | None = None,
+) -> Iterator[pd.DataFrame]:
+    seen = _SeenCaseNumbers()
+    if counts is not None:
+        for name in ("rows_in", "rows_dropped_blank", "rows_dropped_duplicate"):
+            counts.setdefault(name, 0)
+    for chunk in _iter_raw_chunks(
+        input_path, chunk_size, max_chunk_bytes, cache_updates
+    ):
+        rows_in = len(chunk)
+        df = _clean_frame(chunk)
+        cleaned = len(df)
+        df = df.drop_duplicates(subset=["case_number"], keep="first")
+        hashes = pd.util.hash_array(df["case_number"].to_numpy(dtype=object))
+        if len(seen):
+            known = seen.contains(hashes)
+            df, hashes = df[~known], hashes[~known]
+        seen.add(hashes)
+        if counts is not None:
+            counts["rows_in"] += rows_in
+            counts["rows_dropped_blank"] += rows_in - cleaned
+            counts["rows_dropped_duplicate"] += cleaned - len(df)
+
+        df["registration_date"] = parse_dates(df["registration_date"])
+        df["stage_date"] = parse_dates(df["stage_date"])
+        yield df
+
+
+def normalize_csv(
+    input_path: str,
+    output_path: str,
+    chunk_size: int | None = None,
+    max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+) -> int:
+    total = 0
+    with open(output_path, "w", encoding="utf-8", newline="") as out:
+        for df in iter_normalized_chunks(input_path, chunk_size, max_chunk_bytes):
+            df.to_csv(out, index=False, header=False)
+            total += len(df)
+    return total
 
-    df["registration_date"] = df["registration_date"].apply(parse_date)
-    df["stage_date"] = df["stage_date"].apply(parse_date)
 
-    df.to_csv(output_path, index=False, header=False)
-    return len(df)
+def _encode_chunk(df: pd.DataFrame) -> bytes:
+    return df.to_csv(index=False, header=False).encode("utf-8")
+
+
+def _init_normalize_worker(chunk_queue, stop):
+    global _chunk_queue, _stop
+    _chunk_queue = chunk_queue
+    _stop = stop
+
+
+def _normalize_into_queue(
+    input_path: str, chunk_size: int | None, max_chunk_bytes: int
+) -> int:
+    with profile("normalize", source_key(input_path)):
+        rows = 0
+        counts: dict = {}
+        # Encoding and dialect cache entries go back to the parent with "done".
+        cache_updates: dict = {}
+        started, cpu_started = time.perf_counter(), time.thread_time()
+        try:
+            for df in iter_normalized_chunks(
+                input_path, chunk_size, max_chunk_bytes, counts, cache_updates
+            ):
+                if _stop.is_set():
+                    return rows
+                _chunk_queue.put(("chunk", input_path, len(df), _encode_chunk(df)))
+                rows += len(df)
+            digest = source_digest(input_path)
+        except Exception as error:
+            _chunk_queue.put(
+                ("failed", input_path, rows, f"{type(error).__name__}: {error}")
+            )
+            return rows
+        # Wall time includes waiting on a full queue, i.e. on COPY.
+        counts.update(
+            digest=digest,
+            cache_updates=cache_updates,
+            bytes_in=source_stat(input_path)[0],
+            wall=time.perf_counter() - started,
+            cpu=time.thread_time() - cpu_started,
+        )
+        _chunk_queue.put(("done", input_path, rows, counts))
+        return rows
+
+
+def _plan_imports(
+    csv_files: list[str], manifest: dict, force: bool
+) -> tuple[list[str], dict]:
+    to_import = []
+    refreshed = {}
+    for path in csv_files:
+        key = source_key(path)
+        size, mtime_ns = source_stat(path)
+        entry = manifest.get(key)
+        if force or not entry or entry.get("size") != size:
+            to_import.append(path)
+        elif mtime_ns is not None and entry.get("mtime_ns") == mtime_ns:
+            continue
+        elif entry.get("hash") == source_digest(path):
+            refreshed[key] = {**entry, "mtime_ns": mtime_ns}
+        else:
+            to_import.append(path)
+    return to_import, refreshed
+
+
+def _source_identity(source: str) -> tuple:
+    # A path that comes back rewritten (re-extracted or re-downloaded) is a new
+    # source, not a duplicate of the one already planned.
+    path, _ = split_source(source)
+    return source, source_stat(source)[0], os.stat(path).st_mtime_ns
+
+
+async def _plan_stream(
+    sources: AsyncIterable[str], manifest: dict, force: bool, archives: list[str]
+) -> AsyncIterator[str]:
+    # Sources are CSV paths or ZIP archives whose members are read in place.
+    seen = set()
+    skipped = 0
+    async for source in sources:
+        if source.lower().endswith(".zip") and split_source(source)[1] is None:
+            archives.append(source)
+            candidates = await asyncio.to_thread(list_csv_members, source)
+        else:
+            candidates = [source]
+        identities = await asyncio.to_thread(
+            lambda: {path: _source_identity(path) for path in candidates}
+        )
+        candidates = [path for path in candidates if identities[path] not in seen]
+        seen.update(identities[path] for path in candidates)
+        to_import, refreshed = await asyncio.to_thread(
+            _plan_imports, candidates, manifest, force
+        )
+        manifest.update(refreshed)
+        skipped += len(candidates) - len(to_import)
+        for path in to_import:
+            yield path
+    if skipped:
+        print(f"Skipping {skipped} unchanged CSV files")
 
 
-async def import_csv_files(unpacked_dir: str):
-    csv_files = [
-        os.path.join(unpacked_dir, f)
-        for f in os.listdir(unpacked_dir)
-        if f.lower().endswith(".csv")
-    ]
-    if not csv_files:
-        print("No CSV files found")
+def _record_imports(manifest: dict, stats: dict):
+    imported_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    for path, rows in stats.get("files", {}).items():
+        size, mtime_ns = source_stat(path)
+        manifest[source_key(path)] = {
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "hash": stats["hashes"][path],
+            "rows": rows,
+            "imported_at": imported_at,
+        }
+
+
+def _delete_archives(archives: list[str]):
+    for archive in archives:
+        try:
+            os.remove(archive)
+            print(f"🗑️  Removed ingested archive {os.path.basename(archive)}")
+        except FileNotFoundError:
+            pass
+
+
+def _create_normalize_pool(workers: int, queue_size: int):
+    if workers <= 0:
+        chunk_queue, stop = queue.Queue(maxsize=queue_size), threading.Event()
+        executor = ThreadPoolExecutor(
+            max_workers=1,
+            initializer=_init_normalize_worker,
+            initargs=(chunk_queue, stop),
+        )
+        return executor, chunk_queue, stop
+
+    ctx = worker_context()
+    chunk_queue, stop = ctx.Queue(maxsize=queue_size), ctx.Event()
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_normalize_worker,
+        initargs=(chunk_queue, stop),
+    )
+    return executor, chunk_queue, stop
+
+
+async def _as_async_iter(items: Iterable[str] | AsyncIterable[str]):
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def _iter_copy_chunks(
+    input_paths: Iterable[str] | AsyncIterable[str],
+    stats: dict,
+    workers: int = 0,
+    chunk_size: int | None = DEFAULT_CHUNK_SIZE,
+    max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+    queue_size: int = COPY_QUEUE_SIZE,
+    metrics: RunMetrics | None = None,
+) -> AsyncIterator[tuple[int, bytes]]:
+    loop = asyncio.get_running_loop()
+    executor, chunk_queue, stop = _create_normalize_pool(workers, queue_size)
+    futures = []
+    pending = set()
+    bytes_out: dict[str, int] = {}
+    cache_updates: dict[str, dict] = {}
+
+    # input_paths may still be filled by an earlier stage; each path goes to
+    # the pool as soon as it arrives.
+    async def feed():
+        async for path in _as_async_iter(input_paths):
+            pending.add(path)
+            futures.append(
+                executor.submit(
+                    _normalize_into_queue, path, chunk_size, max_chunk_bytes
+                )
+            )
+
+    feeder = asyncio.create_task(feed())
+    get = functools.partial(chunk_queue.get, timeout=QUEUE_POLL_SECONDS)
+
+    try:
+        while pending or not feeder.done():
+            try:
+                kind, path, rows, payload = await loop.run_in_executor(None, get)
+            except queue.Empty:
+                if feeder.done() and feeder.exception():
+                    raise feeder.exception()
+                # A worker killed outright never reports back through the queue.
+                for future in futures:
+                    if future.done() and future.exception():
+                        raise future.exception()
+                continue
+
+            if kind == "failed":
+                raise RuntimeError(f"Failed to normalize {path}: {payload}")
+            if kind == "done":
+                pending.discard(path)
+                stats.setdefault("files", {})[path] = rows
+                stats.setdefault("hashes", {})[path] = payload.pop("digest")
+                for cache_path, entries in payload.pop("cache_updates").items():
+                    cache_updates.setdefault(cache_path, {}).update(entries)
+                if metrics is not None:
+                    metrics.record(
+                        "normalize",
+                        source_key(path),
+                        wall=payload.pop("wall"),
+                        cpu=payload.pop("cpu"),
+                        bytes_out=bytes_out.pop(path, 0),
+                        rows_out=rows,
+                        **payload,
+                    )
+                print(f"Normalized {os.path.basename(path)} → {rows} rows")
+                continue
+            stats["rows"] = stats.get("rows", 0) + rows
+            stats["bytes"] = stats.get("bytes", 0) + len(payload)
+            bytes_out[path] = bytes_out.get(path, 0) + len(payload)
+            yield rows, payload
+        await feeder
+    finally:
+        feeder.cancel()
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await feeder
+        stop.set()
+        for future in futures:
+            future.cancel()
+        # Drain so workers blocked on a full queue can observe the stop flag.
+        while not all(future.done() for future in futures):
+            try:
+                await loop.run_in_executor(None, get)
+            except queue.Empty:
+                pass
+        executor.shutdown(wait=True)
+        save_cache_updates(cache_updates)
+
+
+async def _copy_worker(
+    conn,
+    table: str,
+    chunks: asyncio.Queue,
+    index: int,
+    metrics: RunMetrics | None = None,
+) -> dict:
+    stats = {"rows": 0, "bytes": 0}
+
+    async def source():
+        while (item := await chunks.get()) is not None:
+            rows, data = item
+            stats["rows"] += rows
+            stats["bytes"] += len(data)
+            yield data
+
+    started = time.perf_counter()
+    data = source()
+    try:
+        with profile("copy", f"connection {index}"):
+            await conn.copy_to_table(
+                table_name=table,
+                source=data,
+                format="csv",
+                delimiter=",",
+                null="",
+                columns=EXPECTED_COLUMNS,
+            )
+    finally:
+        await data.aclose()
+
+    seconds = max(time.perf_counter() - started, 1e-9)
+    mb = stats["bytes"] / (1024 * 1024)
+    print(
+        f"✅ COPY #{index} to {table}: {stats['rows']} rows, {mb:.1f} MB "
+        f"in {seconds:.1f}s ({stats['rows'] / seconds:,.0f} rows/s, "
+        f"{mb / seconds:.1f} MB/s)"
+    )
+    if metrics is not None:
+        metrics.record(
+            "copy",
+            f"connection {index}",
+            wall=seconds,
+            rows_in=stats["rows"],
+            bytes_in=stats["bytes"],
+        )
+    return stats
+
+
+async def _copy_parallel(
+    connections: list,
+    table: str,
+    source: AsyncIterator[tuple[int, bytes]],
+    metrics: RunMetrics | None = None,
+) -> list[dict]:
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=len(connections))
+
+    async def dispatch():
+        try:
+            async for item in source:
+                await chunks.put(item)
+        finally:
+            await source.aclose()
+        for _ in connections:
+            await chunks.put(None)
+
+    async with asyncio.TaskGroup() as group:
+        group.create_task(dispatch())
+        workers = [
+            group.create_task(_copy_worker(conn, table, chunks, index, metrics))
+            for index, conn in enumerate(connections, start=1)
+        ]
+    return [worker.result() for worker in workers]
+
+
+async def _create_staging(conn, staging: str, partitions: int):
+    if partitions <= 1:
+        await conn.execute(f"CREATE UNLOGGED TABLE {staging} {STAGING_COLUMNS}")
         return
+    # Every case_number lands in exactly one partition, so slices merge independently.
+    await conn.execute(
+        f"CREATE TABLE {staging} {STAGING_COLUMNS} PARTITION BY HASH (case_number)"
+    )
+    for remainder in range(partitions):
+        await conn.execute(
+            f"CREATE UNLOGGED TABLE {staging}_p{remainder} PARTITION OF {staging} "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+        )
+
+
+def _merged_rows(status: str) -> int:
+    # asyncpg returns the command tag, e.g. "INSERT 0 1234".
+    return int(status.split()[-1])
+
 
-    print(f"Processing {len(csv_files)} CSV files (COPY + normalization)...")
+async def _merge_staging(pool, staging: str, partitions: int, connections: int) -> int:
+    if partitions <= 1:
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                status = await conn.execute(MERGE_SQL.format(staging=staging))
+                await conn.execute(BUMP_DATA_VERSION_SQL)
+        return _merged_rows(status)
+
+    slices: asyncio.Queue = asyncio.Queue()
+    for remainder in range(partitions):
+        slices.put_nowait(f"{staging}_p{remainder}")
+    merged = {"rows": 0}
+    # Slices commit one by one, so caches are invalidated before the first
+    # and again after the last; a failed slice still leaves a fresh version.
+    # Bumping inside each slice would serialize them on the data_version row.
+    async with pool.acquire() as conn:
+        await conn.execute(BUMP_DATA_VERSION_SQL)
+    progress = tqdm(total=partitions, desc="Merging slices", ncols=100)
+
+    async def merge_worker():
+        async with pool.acquire() as conn:
+            while not slices.empty():
+                table = slices.get_nowait()
+                async with conn.transaction():
+                    status = await conn.execute(MERGE_SQL.format(staging=table))
+                merged["rows"] += _merged_rows(status)
+                progress.update(1)
+                progress.set_postfix(rows=merged["rows"])
+
+    try:
+        async with asyncio.TaskGroup() as group:
+            for _ in range(min(connections, partitions)):
+                group.create_task(merge_worker())
+    finally:
+        progress.close()
+        async with pool.acquire() as conn:
+            await conn.execute(BUMP_DATA_VERSION_SQL)
+    print(f"Merged {merged['rows']} rows in {partitions} slices")
+    return merged["rows"]
+
+
+async def import_csv_files(
+    unpacked_dir: str,
+    chunk_size: int | None = DEFAULT_CHUNK_SIZE,
+    max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+    workers: int | None = None,
+    queue_size: int | None = None,
+    copy_connections: int = 1,
+    force: bool = False,
+    archives: list[str] | None = None,
+    delete_archives: bool = False,
+    merge_partitions: int = 1,
+    merge_connections: int = 1,
+    sources: AsyncIterable[str] | None = None,
+    metrics: RunMetrics | None = None,
+):
+    manifest_path = os.path.join(unpacked_dir, MANIFEST_FILE)
+    manifest = load_json(manifest_path)
+    archives = list(archives or [])
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if sources is None:
+        csv_files = [
+            os.path.join(unpacked_dir, f)
+            for f in os.listdir(unpacked_dir)
+            if f.lower().endswith(".csv")
+        ]
+        for archive in archives:
+            csv_files.extend(list_csv_members(archive))
+        if not csv_files:
+            print("No CSV files found")
+            return
+
+        all_files = len(csv_files)
+        csv_files, refreshed = _plan_imports(csv_files, manifest, force)
+        manifest.update(refreshed)
+        if not csv_files:
+            save_json(manifest_path, manifest)
+            print(f"All {all_files} CSV files are already imported")
+            if delete_archives:
+                _delete_archives(archives)
+            return
+        if len(csv_files) < all_files:
+            print(f"Skipping {all_files - len(csv_files)} unchanged CSV files")
+        workers = min(workers, len(csv_files))
+        print(
+            f"Processing {len(csv_files)} CSV files (COPY + normalization, "
+            f"{workers or 'in-process'} workers)..."
+        )
+    else:
+        csv_files = _plan_stream(sources, manifest, force, archives)
+        print(
+            f"Processing CSV files as they arrive (COPY + normalization, "
+            f"{workers or 'in-process'} workers)..."
+        )
+    queue_size = queue_size or max(COPY_QUEUE_SIZE, 2 * workers)
 
-    sem = asyncio.Semaphore(1)
     conn = await asyncpg.connect(DATABASE_URL)
+    pool = None
+    staging = "tmp_cases"
+    stats = {"rows": 0, "bytes": 0}
+    source = _iter_copy_chunks(
+        csv_files, stats, workers, chunk_size, max_chunk_bytes, queue_size, metrics
+    )
+    merged = None
 
     try:
-        async with conn.transaction():
-            await conn.execute(
-                """
-                CREATE TEMP TABLE tmp_cases
-                (
-                    court_name        text,
-                    case_number       text,
-                    case_proc         text,
-                    registration_date date,
-                    judge             text,
-                    judges            text,
-                    participants      text,
-                    stage_date        date,
-                    stage_name        text,
-                    cause_result      text,
-                    cause_dep         text,
-                    type              text,
-                    description       text
-                ) ON COMMIT DROP;
-                """
+        if copy_connections > 1 or merge_partitions > 1:
+            staging = f"staging_cases_{os.getpid()}_{time.time_ns()}"
+            await _create_staging(conn, staging, merge_partitions)
+            pool = await asyncpg.create_pool(
+                DATABASE_URL,
+                min_size=1,
+                max_size=max(copy_connections, merge_connections),
             )
+            async with contextlib.AsyncExitStack() as stack:
+                connections = [
+                    await stack.enter_async_context(pool.acquire())
+                    for _ in range(copy_connections)
+                ]
+                await _copy_parallel(connections, staging, source, metrics)
 
-            async def process_file(path: str):
-                clean_path = path + ".clean"
-                try:
-                    rows = normalize_csv(path, clean_path)
-                    print(f"Normalized {os.path.basename(path)} → {rows} rows")
-
-                    async with sem:
-                        with open(clean_path, "rb") as f:
-                            await conn.copy_to_table(
-                                table_name="tmp_cases",
-                                source=f,
-                                format="csv",
-                                delimiter=",",
-                                null="",
-                                columns=EXPECTED_COLUMNS,
-                            )
-                        print(f"✅ COPY to tmp_cases: {os.path.basename(path)}")
-                finally:
-                    if os.path.exists(clean_path):
-                        os.remove(clean_path)
-
-            await asyncio.gather(*(process_file(f) for f in csv_files))
-
-            print("All CSV copied to tmp_cases. Merging into cases...")
-
-            await conn.execute(
-                """
-                INSERT INTO cases (court_name, case_number, case_proc, registration_date,
-                                   judge, judges, participants, stage_date, stage_name,
-                                   cause_result, cause_dep, type, description)
-                SELECT DISTINCT
-                ON (case_number) court_name, case_number, case_proc, registration_date,
-                    judge, judges, participants, stage_date, stage_name,
-                    cause_result, cause_dep, type, description
-                FROM tmp_cases
-                WHERE case_number IS NOT NULL AND case_number <> ''
-                ORDER BY case_number, stage_date DESC NULLS LAST
-                ON CONFLICT (case_number) DO
-                UPDATE
-                    SET
-                    court_name = COALESCE(EXCLUDED.court_name, cases.court_name),
-                    case_proc = COALESCE(EXCLUDED.case_proc, cases.case_proc),
-                    registration_date = COALESCE(EXCLUDED.registration_date, cases.registration_date),
-                    judge = COALESCE(EXCLUDED.judge, cases.judge),
-                    judges = COALESCE(EXCLUDED.judges, cases.judges),
-                    participants = COALESCE(EXCLUDED.participants, cases.participants),
-                    stage_date = EXCLUDED.stage_date,
-                    stage_name = COALESCE(EXCLUDED.stage_name, cases.stage_name),
-                    cause_result = COALESCE(EXCLUDED.cause_result, cases.cause_result),
-                    cause_dep = COALESCE(EXCLUDED.cause_dep, cases.cause_dep),
-                    type = COALESCE(EXCLUDED.type, cases.type),
-                    description = COALESCE(EXCLUDED.description, cases.description)
-                WHERE EXCLUDED.stage_date IS NOT NULL
-                  AND (cases.stage_date IS NULL
-                   OR EXCLUDED.stage_date
-                    > cases.stage_date);
-                """
-            )
-        print("✅ Data successfully merged into cases.")
+            if stats.get("files"):
+                print(f"All CSV copied to {staging}. Merging into cases...")
+                merge_started = time.perf_counter()
+                with profile("merge"):
+                    merged = await _merge_staging(
+                        pool, staging, merge_partitions, merge_connections
+                    )
+        else:
+            async with conn.transaction():
+                await conn.execute(
+                    f"CREATE TEMP TABLE {staging} {STAGING_COLUMNS} ON COMMIT DROP;"
+                )
+                await _copy_parallel([conn], staging, source, metrics)
+
+                # A streamed run may find nothing new; leave data_version alone.
+                if stats.get("files"):
+                    print(f"All CSV copied to {staging}. Merging into cases...")
+                    merge_started = time.perf_counter()
+                    with profile("merge"):
+                        status = await conn.execute(MERGE_SQL.format(staging=staging))
+                        await conn.execute(BUMP_DATA_VERSION_SQL)
+                    merged = _merged_rows(status)
+        if merged is not None:
+            print("✅ Data successfully merged into cases.")
+            if metrics is not None:
+                metrics.record(
+                    "merge",
+                    wall=time.perf_counter() - merge_started,
+                    rows_in=stats["rows"],
+                    rows_merged=merged,
+                )
+        else:
+            print("No new CSV files to import")
+
+        _record_imports(manifest, stats)
+        save_json(manifest_path, manifest)
+        if delete_archives:
+            _delete_archives(archives)
 
     finally:
+        if pool is not None:
+            await pool.close()
+            await conn.execute(f"DROP TABLE IF EXISTS {staging}")
         await conn.close()
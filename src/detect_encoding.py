@@ -1,10 +1,114 @@
-from charset_normalizer import from_path
+import codecs
+import os
 
+from charset_normalizer import from_bytes, from_fp, from_path
 
-def detect_encoding(file_path: str) -> str:
+from utils import load_json, update_json
+from zip_unpacker import (
+    open_source,
+    source_cache_location,
+    source_identity,
+    split_source,
+)
+
+SAMPLE_SIZE = 256 * 1024
+CACHE_FILE = ".encodings.json"
+
+# UTF-32 first: its little-endian BOM starts with the UTF-16 one.
+BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+def _read_samples(file_path: str, sample_size: int) -> list[bytes]:
+    path, member = split_source(file_path)
+    with open_source(file_path) as f:
+        # Seeking inside a compressed member would decompress up to the offset.
+        if member is not None:
+            return [f.read(sample_size)]
+        size = os.path.getsize(path)
+        if size <= sample_size:
+            return [f.read()]
+        part = sample_size // 3
+        samples = []
+        for offset in (0, (size - part) // 2, size - part):
+            f.seek(offset)
+            samples.append(f.read(part))
+        return samples
+
+
+def _is_utf8(sample: bytes, from_start: bool) -> bool:
+    if not from_start:
+        # Skip a multi-byte character cut by the sample boundary.
+        start = 0
+        while start < 3 and start < len(sample) and 0x80 <= sample[start] <= 0xBF:
+            start += 1
+        sample = sample[start:]
     try:
-        result = from_path(file_path).best()
-        return result.encoding if result else "utf-8"
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _detect_sampled(file_path: str, sample_size: int) -> str:
+    samples = _read_samples(file_path, sample_size)
+    for bom, encoding in BOMS:
+        if samples[0].startswith(bom):
+            return encoding
+    if all(_is_utf8(s, i == 0) for i, s in enumerate(samples)):
+        return "utf-8"
+    result = from_bytes(b"\n".join(samples)).best()
+    return result.encoding if result else "utf-8"
+
+
+def _detect_full(file_path: str) -> str:
+    path, member = split_source(file_path)
+    if member is None:
+        result = from_path(path).best()
+    else:
+        with open_source(file_path) as f:
+            result = from_fp(f).best()
+    return result.encoding if result else "utf-8"
+
+
+def detect_encoding(
+    file_path: str,
+    sample_size: int | None = SAMPLE_SIZE,
+    cache_path: str | None = None,
+    cache_updates: dict | None = None,
+) -> str:
+    default_cache_path, key = source_cache_location(file_path, CACHE_FILE)
+    cache_path = cache_path or default_cache_path
+    try:
+        identity = source_identity(file_path)
+        entry = load_json(cache_path).get(key)
+        if (
+            entry
+            and entry.get("identity") == identity
+            and entry.get("sample_size") == sample_size
+        ):
+            return entry["encoding"]
+
+        if sample_size is None:
+            encoding = _detect_full(file_path)
+        else:
+            encoding = _detect_sampled(file_path, sample_size)
     except Exception as error:
         print(f"Can not detect encoding for {file_path}: {error}")
         return "utf-8"
+
+    entry = {"identity": identity, "sample_size": sample_size, "encoding": encoding}
+    if cache_updates is not None:
+        # Saved later by the caller, e.g. once for all normalize workers.
+        cache_updates.setdefault(cache_path, {})[key] = entry
+        return encoding
+    try:
+        update_json(cache_path, {key: entry})
+    except OSError:
+        pass
+    return encoding
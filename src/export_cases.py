@@ -1,22 +1,41 @@
 import asyncio
+import contextlib
 import csv
 import os
 import sys
-from typing import Iterable, List
+import threading
+from itertools import chain, islice
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Set,
+)
 
 import asyncpg
 from dotenv import load_dotenv
+from PyQt6.QtCore import QThread, pyqtSignal
 from PyQt6.QtWidgets import (
     QApplication,
     QFileDialog,
     QLabel,
     QLineEdit,
     QMessageBox,
+    QProgressBar,
     QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
     QVBoxLayout,
     QWidget,
 )
 
+from case_cache import DEFAULT_MAX_ROWS, CaseCache
+from export_writers import ThreadedWriter, detect_format, open_writer
+
 COLUMNS = [
     "court_name",
     "case_number",
@@ -32,81 +51,332 @@ COLUMNS = [
     "type",
     "description",
 ]
+HEADER_NAMES = {"case_number", "number", "case", "case_no"}
+EXPORT_PREFETCH = 10_000
+PROGRESS_EVERY = 5_000
+PREVIEW_ROWS = 50
+CANCEL_POLL_SECONDS = 0.1
+# Longer lists are COPYed into a temp table and joined instead of bound as an array.
+LOOKUP_TABLE_THRESHOLD = 10_000
+LOOKUP_TABLE = "export_case_numbers"
+CACHE_BATCH = 10_000
+DATA_VERSION_SQL = "SELECT version FROM data_version WHERE id = 1"
+WRITE_BATCH = 10_000
+SELECT_CASES_SQL = "SELECT {columns} FROM cases WHERE case_number = ANY($1::text[])"
+SELECT_CASES_JOIN_SQL = (
+    "SELECT {columns} FROM cases "
+    f"WHERE case_number IN (SELECT case_number FROM {LOOKUP_TABLE})"
+)
 
 
-def _read_case_numbers(csv_path: str) -> List[str]:
-    numbers: List[str] = []
+def _iter_case_numbers(csv_path: str, dedup: bool = True) -> Iterator[str]:
+    seen: Set[str] = set()
+    first = True
     with open(csv_path, "r", encoding="utf-8", newline="") as f:
-        reader = csv.reader(f)
-        for row in reader:
+        for row in csv.reader(f):
             if not row:
                 continue
             val = (row[0] or "").strip()
             if not val:
                 continue
-            numbers.append(val)
+            if first:
+                first = False
+                if val.lower() in HEADER_NAMES:
+                    continue
+            if dedup:
+                if val in seen:
+                    continue
+                seen.add(val)
+            yield val
+
+
+def _read_case_numbers(csv_path: str) -> List[str]:
+    return list(_iter_case_numbers(csv_path))
+
+
+def _resolve_columns(columns: Sequence[str] | None) -> List[str]:
+    if not columns:
+        return list(COLUMNS)
+    unknown = [c for c in columns if c not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown export columns: {', '.join(unknown)}")
+    return list(columns)
+
+
+async def _load_lookup_table(conn, case_numbers: Iterable[str]):
+    await conn.execute(
+        f"CREATE TEMP TABLE {LOOKUP_TABLE} (case_number text) ON COMMIT DROP"
+    )
+    await conn.copy_records_to_table(LOOKUP_TABLE, records=((n,) for n in case_numbers))
+    # Fresh statistics let the planner pick a hash semi-join over the cases index.
+    await conn.execute(f"ANALYZE {LOOKUP_TABLE}")
+
 
-    if numbers and numbers[0].lower() in {"case_number", "number", "case", "case_no"}:
-        numbers = numbers[1:]
+async def _iter_cases(
+    conn,
+    case_numbers: Iterable[str],
+    prefetch: int = EXPORT_PREFETCH,
+    columns: Sequence[str] = COLUMNS,
+) -> AsyncIterator[asyncpg.Record]:
+    numbers = iter(case_numbers)
+    head = list(islice(numbers, LOOKUP_TABLE_THRESHOLD + 1))
+    # Server-side cursors only live inside a transaction.
+    async with conn.transaction():
+        if len(head) <= LOOKUP_TABLE_THRESHOLD:
+            query, args = SELECT_CASES_SQL, (head,)
+        else:
+            await _load_lookup_table(conn, chain(head, numbers))
+            query, args = SELECT_CASES_JOIN_SQL, ()
+        query = query.format(columns=", ".join(columns))
+        async for record in conn.cursor(query, *args, prefetch=prefetch):
+            yield record
 
-    unique = []
-    seen = set()
-    for n in numbers:
-        if n not in seen:
-            seen.add(n)
-            unique.append(n)
-    return unique
 
+async def _iter_cached_cases(
+    conn,
+    case_numbers: Iterable[str],
+    cache: CaseCache,
+    prefetch: int = EXPORT_PREFETCH,
+) -> AsyncIterator[Sequence]:
+    cache.sync(await conn.fetchval(DATA_VERSION_SQL) or 0)
+    numbers = iter(case_numbers)
+    while batch := list(islice(numbers, CACHE_BATCH)):
+        hits = cache.get_many(batch)
+        for row in hits.values():
+            if row is not None:
+                yield row
 
-async def _fetch_cases(dsn: str, case_numbers: Iterable[str]) -> List[dict]:
-    nums = list(case_numbers)
-    if not nums:
-        return []
+        misses = [n for n in batch if n not in hits]
+        if not misses:
+            continue
+        found = {}
+        async for record in _iter_cases(conn, misses, prefetch):
+            found[record["case_number"]] = record
+            yield record
+        # Numbers the database does not know are cached too, as empty rows.
+        cache.put_many((n, found.get(n)) for n in misses)
 
-    conn = await asyncpg.connect(dsn)
+
+class ExportCancelled(Exception):
+    """Raised when an export is cancelled before it finishes."""
+
+
+async def _cancellable(
+    work: Awaitable, conn: asyncpg.Connection, cancel: threading.Event, path: str
+):
+    # Rows arriving are checked for cancel as they come, but a long lookup COPY
+    # or a query still looking for its first row is not; watch cancel beside
+    # the work and cut the connection when it is set.
+    task = asyncio.ensure_future(work)
     try:
-        rows = await conn.fetch(
-            f"SELECT {', '.join(COLUMNS)} FROM cases WHERE case_number = ANY($1::text[])",
-            nums,
-        )
-        return [dict(r) for r in rows]
+        while not task.done():
+            if cancel.is_set():
+                conn.terminate()
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError, Exception):
+                    await task
+                raise ExportCancelled(f"Export to {path} was cancelled")
+            await asyncio.wait({task}, timeout=CANCEL_POLL_SECONDS)
+        return task.result()
     finally:
-        await conn.close()
+        if not task.done():
+            task.cancel()
 
 
-def _write_csv(path: str, rows: List[dict]):
+async def _stream_export(
+    dsn: str,
+    path: str,
+    case_numbers: Iterable[str],
+    prefetch: int = EXPORT_PREFETCH,
+    on_progress: Callable[[int], None] | None = None,
+    on_preview: Callable[[list], None] | None = None,
+    cancel: threading.Event | None = None,
+    cache: CaseCache | None = None,
+    columns: Sequence[str] | None = None,
+    fmt: str | None = None,
+) -> int:
+    columns = _resolve_columns(columns)
+    fmt = fmt or detect_format(path)
     os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-    with open(path, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=COLUMNS)
-        writer.writeheader()
-        for r in rows:
-            writer.writerow({k: r.get(k) for k in COLUMNS})
+    numbers = iter(case_numbers)
+    first = next(numbers, None)
+    count = 0
+    preview: list[tuple] = []
 
+    async def write_records(conn):
+        nonlocal count
+        all_numbers = chain([first], numbers)
+        if cache is None:
+            records = _iter_cases(conn, all_numbers, prefetch, columns)
+            project = None
+        else:
+            # Cached rows always hold every column; project them here.
+            records = _iter_cached_cases(conn, all_numbers, cache, prefetch)
+            project = [COLUMNS.index(c) for c in columns]
+        batch = []
+        async for record in records:
+            if cancel is not None and cancel.is_set():
+                raise ExportCancelled(f"Export to {path} was cancelled")
+            if project is not None:
+                record = tuple(record[i] for i in project)
+            batch.append(record)
+            count += 1
+            if on_preview and count <= PREVIEW_ROWS:
+                preview.append(tuple(record))
+                if count == PREVIEW_ROWS:
+                    on_preview(preview)
+            if on_progress and count % PROGRESS_EVERY == 0:
+                on_progress(count)
+            if len(batch) >= WRITE_BATCH:
+                await asyncio.to_thread(writer.put, batch)
+                batch = []
+        if batch:
+            await asyncio.to_thread(writer.put, batch)
 
-async def export_cases(input_csv: str, output_csv: str) -> int:
+    # Written beside the target and renamed once complete, so a failed or
+    # cancelled export never leaves a truncated file at path.
+    partial = f"{path}.part"
+    writer = ThreadedWriter(open_writer(partial, columns, fmt))
+    try:
+        try:
+            if first is not None:
+                conn = await asyncpg.connect(dsn)
+                try:
+                    if cancel is None:
+                        await write_records(conn)
+                    else:
+                        await _cancellable(write_records(conn), conn, cancel, path)
+                finally:
+                    await conn.close()
+        finally:
+            writer.close()
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(partial)
+        raise
+    os.replace(partial, path)
+
+    if first is None:
+        if on_preview:
+            on_preview(preview)
+        return 0
+    if on_preview and count < PREVIEW_ROWS:
+        on_preview(preview)
+    if on_progress:
+        on_progress(count)
+    return count
+
+
+async def export_cases(
+    input_csv: str,
+    output_csv: str,
+    prefetch: int = EXPORT_PREFETCH,
+    on_progress: Callable[[int], None] | None = None,
+    on_preview: Callable[[list], None] | None = None,
+    cancel: threading.Event | None = None,
+    columns: Sequence[str] | None = None,
+    fmt: str | None = None,
+) -> int:
     load_dotenv()
     database_url = os.getenv("DATABASE_URL_SYNC")
     if not database_url:
         raise ValueError("DATABASE_URL_SYNC is not set in .env file")
 
-    numbers = _read_case_numbers(input_csv)
-    rows = await _fetch_cases(database_url, numbers)
-    _write_csv(output_csv, rows)
-    return len(rows)
+    cache_path = os.getenv("EXPORT_CACHE_PATH")
+    cache_rows = os.getenv("EXPORT_CACHE_MAX_ROWS")
+    cache = (
+        CaseCache(cache_path, int(cache_rows) if cache_rows else DEFAULT_MAX_ROWS)
+        if cache_path
+        else None
+    )
+    # Both database lookups ignore repeated numbers, so only the cached path,
+    # which answers hits itself, needs the in-memory dedup set.
+    numbers = _iter_case_numbers(input_csv, dedup=cache is not None)
+    try:
+        return await _stream_export(
+            database_url,
+            output_csv,
+            numbers,
+            prefetch,
+            on_progress=on_progress,
+            on_preview=on_preview,
+            cancel=cancel,
+            cache=cache,
+            columns=columns,
+            fmt=fmt,
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+class ExportWorker(QThread):
+    progress = pyqtSignal(int)
+    preview = pyqtSignal(list)
+    completed = pyqtSignal(int)
+    cancelled = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(
+        self,
+        input_csv: str,
+        output_csv: str,
+        columns: Sequence[str] | None = None,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.input_csv = input_csv
+        self.output_csv = output_csv
+        self.columns = columns
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        # Signals emitted here are queued onto the GUI thread by Qt.
+        try:
+            count = asyncio.run(
+                export_cases(
+                    self.input_csv,
+                    self.output_csv,
+                    on_progress=self.progress.emit,
+                    on_preview=self.preview.emit,
+                    cancel=self._cancel,
+                    columns=self.columns,
+                )
+            )
+        except ExportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.completed.emit(count)
 
 
 class ExportGUI(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Court Cases Exporter (PyQt6)")
-        self.setGeometry(500, 300, 400, 200)
+        self.setGeometry(500, 300, 700, 500)
+        self.worker: ExportWorker | None = None
 
         self.input_path = QLineEdit(self)
         self.output_path = QLineEdit(self)
+        self.columns_input = QLineEdit(self)
+        self.columns_input.setPlaceholderText("all columns")
 
         self.btn_input = QPushButton("Select Input CSV", self)
         self.btn_output = QPushButton("Select Output CSV", self)
         self.btn_export = QPushButton("Start Export", self)
+        self.btn_cancel = QPushButton("Cancel Export", self)
+        self.btn_cancel.setEnabled(False)
+
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setRange(0, 1)
+        self.status = QLabel("", self)
+        self.preview_table = QTableWidget(0, len(COLUMNS), self)
+        self.preview_table.setHorizontalHeaderLabels(COLUMNS)
 
         layout = QVBoxLayout()
         layout.addWidget(QLabel("Input CSV:"))
@@ -117,12 +387,22 @@ class ExportGUI(QWidget):
         layout.addWidget(self.output_path)
         layout.addWidget(self.btn_output)
 
+        layout.addWidget(QLabel("Columns (comma-separated):"))
+        layout.addWidget(self.columns_input)
+
         layout.addWidget(self.btn_export)
+        layout.addWidget(self.btn_cancel)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.status)
+
+        layout.addWidget(QLabel(f"Preview (first {PREVIEW_ROWS} rows):"))
+        layout.addWidget(self.preview_table)
         self.setLayout(layout)
 
         self.btn_input.clicked.connect(self.load_input_file)
         self.btn_output.clicked.connect(self.save_output_file)
         self.btn_export.clicked.connect(self.start_export)
+        self.btn_cancel.clicked.connect(self.cancel_export)
 
     def load_input_file(self):
         path, _ = QFileDialog.getOpenFileName(
@@ -133,7 +413,11 @@ class ExportGUI(QWidget):
 
     def save_output_file(self):
         path, _ = QFileDialog.getSaveFileName(
-            self, "Save output CSV", "", "CSV Files (*.csv)"
+            self,
+            "Save output file",
+            "",
+            "CSV Files (*.csv);;Gzip CSV (*.csv.gz);;Zstandard CSV (*.csv.zst);;"
+            "Parquet (*.parquet);;Arrow IPC (*.arrow)",
         )
         if path:
             self.output_path.setText(path)
@@ -149,11 +433,62 @@ class ExportGUI(QWidget):
             self.show_message("Please select both input and output paths.")
             return
 
+        columns = [c.strip() for c in self.columns_input.text().split(",") if c.strip()]
         try:
-            count = asyncio.run(export_cases(in_path, out_path))
-            self.show_message(f"✅ Exported {count} rows to:\n{out_path}")
-        except Exception as e:
-            self.show_message(f"❌ Error: {str(e)}")
+            columns = _resolve_columns(columns)
+        except ValueError as e:
+            self.show_message(f"❌ Error: {e}")
+            return
+
+        self.preview_table.setRowCount(0)
+        self.preview_table.setColumnCount(len(columns))
+        self.preview_table.setHorizontalHeaderLabels(columns)
+        self.status.setText("Exporting...")
+        # Total is unknown until the cursor is drained, so show a busy indicator.
+        self.progress_bar.setRange(0, 0)
+        self.btn_export.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+
+        self.worker = ExportWorker(in_path, out_path, columns, self)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.preview.connect(self.on_preview)
+        self.worker.completed.connect(
+            lambda count: self.show_message(f"✅ Exported {count} rows to:\n{out_path}")
+        )
+        self.worker.cancelled.connect(lambda: self.show_message("Export cancelled."))
+        self.worker.failed.connect(
+            lambda error: self.show_message(f"❌ Error: {error}")
+        )
+        self.worker.finished.connect(self.on_worker_finished)
+        self.worker.start()
+
+    def cancel_export(self):
+        if self.worker is not None:
+            self.status.setText("Cancelling...")
+            self.worker.cancel()
+
+    def on_progress(self, count: int):
+        self.status.setText(f"Rows written: {count}")
+
+    def on_preview(self, rows: list):
+        self.preview_table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            for j, value in enumerate(row):
+                text = "" if value is None else str(value)
+                self.preview_table.setItem(i, j, QTableWidgetItem(text))
+
+    def on_worker_finished(self):
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(1)
+        self.btn_export.setEnabled(True)
+        self.btn_cancel.setEnabled(False)
+        self.worker = None
+
+    def closeEvent(self, event):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker.wait()
+        super().closeEvent(event)
 
 
 if __name__ == "__main__":
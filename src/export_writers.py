@@ -0,0 +1,142 @@
+import csv
+import gzip
+import io
+import queue
+import threading
+from datetime import date
+from typing import List, Sequence
+
+FORMATS = {
+    ".csv": "csv",
+    ".csv.gz": "csv.gz",
+    ".csv.zst": "csv.zst",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+}
+DATE_COLUMNS = {"registration_date", "stage_date"}
+WRITER_QUEUE_SIZE = 8
+
+
+def detect_format(path: str) -> str:
+    lower = path.lower()
+    # Longest suffix first, so ".csv.gz" wins over ".csv".
+    for suffix in sorted(FORMATS, key=len, reverse=True):
+        if lower.endswith(suffix):
+            return FORMATS[suffix]
+    return "csv"
+
+
+class CsvBatchWriter:
+    def __init__(self, path: str, columns: Sequence[str], fmt: str = "csv"):
+        if fmt == "csv.gz":
+            self.stream = gzip.open(
+                path, "wt", encoding="utf-8", newline="", compresslevel=6
+            )
+        elif fmt == "csv.zst":
+            import pyarrow as pa
+
+            raw = pa.CompressedOutputStream(path, "zstd")
+            self.stream = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        else:
+            self.stream = open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.stream)
+        self.writer.writerow(columns)
+
+    def write_batch(self, rows: List[Sequence]):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.stream.close()
+
+
+class ArrowBatchWriter:
+    """Writes Parquet or Arrow IPC files one record batch at a time."""
+
+    def __init__(self, path: str, columns: Sequence[str], fmt: str = "parquet"):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.schema = pa.schema(
+            [
+                (name, pa.date32() if name in DATE_COLUMNS else pa.string())
+                for name in columns
+            ]
+        )
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self.writer = self.pa.ipc.new_file(
+                path,
+                self.schema,
+                options=pa.ipc.IpcWriteOptions(compression="zstd"),
+            )
+
+    def write_batch(self, rows: List[Sequence]):
+        columns = list(zip(*rows)) if rows else [()] * len(self.schema)
+        arrays = [
+            self.pa.array(
+                (
+                    [date.fromisoformat(v) if isinstance(v, str) else v for v in values]
+                    if field.type == self.pa.date32()
+                    else values
+                ),
+                type=field.type,
+            )
+            for field, values in zip(self.schema, columns)
+        ]
+        self.writer.write_batch(
+            self.pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+        )
+
+    def close(self):
+        self.writer.close()
+
+
+def open_writer(path: str, columns: Sequence[str], fmt: str | None = None):
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS.values():
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt in ("parquet", "arrow"):
+        return ArrowBatchWriter(path, columns, fmt)
+    return CsvBatchWriter(path, columns, fmt)
+
+
+class ThreadedWriter:
+    """Runs a batch writer in its own thread behind a bounded queue.
+
+    Formatting and compression happen off the fetch loop; ``put`` blocks when
+    the writer falls ``WRITER_QUEUE_SIZE`` batches behind.
+    """
+
+    def __init__(self, writer, queue_size: int = WRITER_QUEUE_SIZE):
+        self.writer = writer
+        self.batches: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.error: BaseException | None = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            while (batch := self.batches.get()) is not None:
+                self.writer.write_batch(batch)
+        except BaseException as e:
+            self.error = e
+            # Keep draining so producers blocked on put() are released.
+            while self.batches.get() is not None:
+                pass
+        finally:
+            self.writer.close()
+
+    def put(self, rows: List[Sequence]):
+        if self.error is not None:
+            raise self.error
+        self.batches.put(rows)
+
+    def close(self):
+        self.batches.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
@@ -1,11 +1,25 @@
 import json
 import os
+import time
 
 import requests
 from dotenv import load_dotenv
 
+from utils import load_json, save_json
+
+METADATA_TTL = 3600
+# CKAN fields that change whenever a resource's content does.
+CHANGE_FIELDS = ("url", "last_modified", "size", "hash", "metadata_modified")
+
+
+def fetch_dataset_metadata(
+    dataset_id: str, cache_path: str | None = None, ttl: float = METADATA_TTL
+) -> dict:
+    cache = load_json(cache_path) if cache_path else {}
+    cached = cache.get(dataset_id)
+    if cached and time.time() - cached.get("fetched_at", 0) < ttl:
+        return cached["result"]
 
-def fetch_dataset_metadata(dataset_id: str) -> dict:
     url = f"https://data.gov.ua/api/3/action/package_show?id={dataset_id}"
     response = requests.get(url=url)
     response.raise_for_status()
@@ -13,6 +27,9 @@ def fetch_dataset_metadata(dataset_id: str) -> dict:
     if not data.get("success"):
         raise RuntimeError("Was returned unsuccessful response from API")
 
+    if cache_path:
+        cache[dataset_id] = {"fetched_at": time.time(), "result": data["result"]}
+        save_json(cache_path, cache)
     return data["result"]
 
 
@@ -27,12 +44,43 @@ def extract_resources(metadata: dict) -> list[dict]:
                 "description": res.get("description"),
                 "format": res.get("format"),
                 "url": res.get("url"),
+                "id": res.get("id"),
+                "last_modified": res.get("last_modified"),
+                "size": res.get("size"),
+                "hash": res.get("hash"),
+                "metadata_modified": res.get("metadata_modified"),
             }
         )
 
     return extracted
 
 
+def resource_key(resource: dict) -> str:
+    return resource.get("id") or resource.get("url")
+
+
+def diff_resources(snapshot: dict, resources: list[dict]) -> dict[str, list[dict]]:
+    """Split ``resources`` against a previous ``{resource_key: resource}`` snapshot.
+
+    Returns ``new``, ``changed`` and ``unchanged`` resources plus the ``removed``
+    snapshot entries that no longer appear in the dataset.
+    """
+    plan = {"new": [], "changed": [], "unchanged": [], "removed": []}
+    keys = set()
+    for res in resources:
+        key = resource_key(res)
+        keys.add(key)
+        previous = snapshot.get(key)
+        if previous is None:
+            plan["new"].append(res)
+        elif any(previous.get(f) != res.get(f) for f in CHANGE_FIELDS):
+            plan["changed"].append(res)
+        else:
+            plan["unchanged"].append(res)
+    plan["removed"] = [res for key, res in snapshot.items() if key not in keys]
+    return plan
+
+
 if __name__ == "__main__":
     load_dotenv()
     dataset_id = os.getenv("DATASET_ID")
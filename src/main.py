@@ -1,77 +1,356 @@
+import argparse
 import asyncio
 import os
 import shutil
+import threading
+from concurrent.futures import Executor
 from pathlib import Path
+from typing import AsyncIterator, Iterator
 
 from dotenv import load_dotenv
 
-from csv_to_db import import_csv_files
-from fetch_metadata import extract_resources, fetch_dataset_metadata
-from resource_downloader import download_all_files
-from zip_unpacker import unpack_zip
+from csv_to_db import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_MAX_CHUNK_BYTES,
+    import_csv_files,
+)
+from fetch_metadata import (
+    METADATA_TTL,
+    diff_resources,
+    extract_resources,
+    fetch_dataset_metadata,
+    resource_key,
+)
+from metrics import RunMetrics
+from profiling import disable_profiling, enable_profiling, profile, profile_dir
+from resource_downloader import iter_downloads
+from utils import load_json, save_json
+from zip_unpacker import create_unpack_pool, unpack_zip
 
 SUPPORTED_FORMATS = ["csv", "zip"]
+METADATA_CACHE_FILE = ".metadata_cache.json"
+SNAPSHOT_FILE = ".resources_snapshot.json"
+RUN_REPORT_FILE = "run_report.json"
+PIPELINE_QUEUE_SIZE = 4
 
 
-def main():
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Import court cases into PostgreSQL")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="re-download and re-import everything, ignoring the resource "
+        "snapshot, the HTTP cache, CSVs already unpacked and the import manifest",
+    )
+    parser.add_argument(
+        "--from-zip",
+        action="store_true",
+        help="import CSV members straight from downloaded ZIPs without extracting",
+    )
+    parser.add_argument(
+        "--delete-archives",
+        action="store_true",
+        help="with --from-zip, delete each archive once it has been ingested",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="write a cProfile per process and tracemalloc dumps for each stage "
+        "and file to DIR (same as setting PROFILE_DIR)",
+    )
+    return parser.parse_args(argv)
+
+
+def _report_download(result: dict):
+    status = result.get("status")
+    if status == "success":
+        verified = " (verified)" if result.get("verified") else ""
+        print(f"✅ {result['name']} -> {result['path']}{verified}")
+    elif status == "skipped":
+        print(f"⏭️  {result['name']} -> already in unpacked ({result['path']})")
+    elif status == "not_modified":
+        print(f"♻️  {result['name']} -> unchanged since last download")
+    else:
+        print(f"❌ {result['name']} -> {result.get('error', 'unknown error')}")
+
+
+async def _download_stage(
+    downloads: Iterator[dict],
+    finished: asyncio.Queue,
+    stop: threading.Event | None = None,
+):
+    # Each next() waits in a thread for the next download to complete; the
+    # bounded queue holds the downloader back while unpacking lags behind.
+    try:
+        while (result := await asyncio.to_thread(next, downloads, None)) is not None:
+            await finished.put(result)
+        await finished.put(None)
+    except asyncio.CancelledError:
+        # A thread blocked in next() cannot be cancelled; the flag makes the
+        # downloads generator abort its transfers and return.
+        if stop is not None:
+            stop.set()
+        raise
+
+
+async def _unpack_stage(
+    finished: asyncio.Queue,
+    sources: asyncio.Queue,
+    unpacked_dir: str,
+    from_zip: bool,
+    results: list,
+    pool: Executor | None = None,
+    max_archives: int = PIPELINE_QUEUE_SIZE,
+    metrics: RunMetrics | None = None,
+):
+    # At most max_archives archives are extracted at once; large ones spread
+    # their members over the worker pool.
+    slots = asyncio.Semaphore(max_archives)
+
+    def extract(name: str, path: str) -> list[str]:
+        with profile("unpack", name):
+            if metrics is None:
+                return unpack_zip(path, unpacked_dir, pool)
+            with metrics.measure("unpack", name) as counters:
+                return unpack_zip(path, unpacked_dir, pool, counters)
+
+    # Paths this run extracts or moves into unpacked_dir.
+    produced = set()
+
+    async def unpack(name: str, path: str):
+        try:
+            csv_files = await asyncio.to_thread(extract, name, path)
+        finally:
+            slots.release()
+        if not csv_files:
+            print(f"📦 {name} -> 0 CSV (Empty or invalid)")
+        for csv_file in csv_files:
+            produced.add(csv_file)
+            await sources.put(csv_file)
+
+    async with asyncio.TaskGroup() as archives:
+        while (result := await finished.get()) is not None:
+            _report_download(result)
+            results.append(result)
+            status, path = result["status"], result.get("path", "")
+            if metrics is not None and status in ("success", "failed"):
+                metrics.record(
+                    "download",
+                    result["name"],
+                    wall=result.get("seconds") or 0.0,
+                    bytes_out=(
+                        os.path.getsize(path)
+                        if status == "success" and os.path.exists(path)
+                        else None
+                    ),
+                    status=status,
+                )
+            is_zip = path.lower().endswith(".zip")
+            # An unchanged archive may never have been unpacked or imported if an
+            # earlier run failed after downloading it. Pass it on anyway:
+            # extraction keeps identical members and the manifest skips them.
+            unchanged = is_zip and status == "not_modified" and os.path.exists(path)
+            if status != "success" and not unchanged:
+                continue
+            elif is_zip and from_zip:
+                if not unchanged:
+                    print(f"📦 {result['name']} -> read directly, without extracting")
+                await sources.put(path)
+            elif is_zip:
+                await slots.acquire()
+                archives.create_task(unpack(result["name"], path))
+            elif path.lower().endswith(".csv"):
+                dest_path = os.path.join(unpacked_dir, Path(path).name)
+                if os.path.abspath(path).startswith(os.path.abspath(unpacked_dir)):
+                    continue
+                # A fresh download (e.g. with --force) replaces the old copy.
+                if os.path.exists(dest_path):
+                    os.remove(dest_path)
+                shutil.move(path, dest_path)
+                produced.add(dest_path)
+                await sources.put(dest_path)
+
+    # CSVs left by earlier runs go last, once no archive can rewrite them while
+    # they are read; the import manifest skips those that are already loaded.
+    for name in sorted(os.listdir(unpacked_dir)):
+        path = os.path.join(unpacked_dir, name)
+        if name.lower().endswith(".csv") and path not in produced:
+            await sources.put(path)
+    await sources.put(None)
+
+
+async def _drain(sources: asyncio.Queue) -> AsyncIterator[str]:
+    while (source := await sources.get()) is not None:
+        yield source
+
+
+async def run_pipeline(
+    downloads: Iterator[dict],
+    unpacked_dir: str,
+    results: list,
+    from_zip: bool = False,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    unpack_workers: int | None = None,
+    metrics: RunMetrics | None = None,
+    stop: threading.Event | None = None,
+    **import_options,
+):
+    # Each stage hands its output to the next through a bounded queue, so a
+    # file is unpacked and COPYed while later downloads are still running.
+    finished: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    sources: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    pool = None if from_zip else create_unpack_pool(unpack_workers)
+    try:
+        async with asyncio.TaskGroup() as group:
+            group.create_task(_download_stage(downloads, finished, stop))
+            group.create_task(
+                _unpack_stage(
+                    finished,
+                    sources,
+                    unpacked_dir,
+                    from_zip,
+                    results,
+                    pool,
+                    queue_size,
+                    metrics,
+                )
+            )
+            group.create_task(
+                import_csv_files(
+                    unpacked_dir,
+                    sources=_drain(sources),
+                    metrics=metrics,
+                    **import_options,
+                )
+            )
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def main(argv: list[str] | None = None):
+    args = parse_args(argv)
     load_dotenv()
+    if args.profile:
+        enable_profiling(args.profile)
+    if profile_dir():
+        print(f"🔬 Profiling each stage into {profile_dir()}")
     dataset_id = os.getenv("DATASET_ID")
 
+    data_dir = os.path.join(os.getcwd(), "data")
+    os.makedirs(data_dir, exist_ok=True)
+
+    metrics = RunMetrics()
+    status = "failed"
+    try:
+        _run(args, dataset_id, data_dir, metrics)
+        status = "success"
+    finally:
+        # The report is written for failed runs too, so they can be compared.
+        metrics.finish(status)
+        report_path = os.getenv("METRICS_REPORT") or os.path.join(
+            data_dir, RUN_REPORT_FILE
+        )
+        metrics.write_json(report_path)
+        textfile = os.getenv("METRICS_TEXTFILE")
+        if textfile:
+            metrics.write_prometheus(textfile)
+        print(f"📊 Run report: {report_path}")
+        disable_profiling()
+
+
+def _run(args: argparse.Namespace, dataset_id: str, data_dir: str, metrics: RunMetrics):
     print("Fetching dataset metadata...")
-    metadata = fetch_dataset_metadata(dataset_id)
+    metadata_ttl = os.getenv("METADATA_TTL")
+    with metrics.measure("metadata"):
+        metadata = fetch_dataset_metadata(
+            dataset_id,
+            cache_path=os.path.join(data_dir, METADATA_CACHE_FILE),
+            ttl=float(metadata_ttl) if metadata_ttl else METADATA_TTL,
+        )
     resources = extract_resources(metadata)
     resources = [
         res for res in resources if res.get("format", "").lower() in SUPPORTED_FORMATS
     ]
     print(f"Found {len(resources)} supported resources")
 
-    data_dir = os.path.join(os.getcwd(), "data")
-    os.makedirs(data_dir, exist_ok=True)
+    snapshot_path = os.path.join(data_dir, SNAPSHOT_FILE)
+    snapshot = load_json(snapshot_path)
+    plan = diff_resources(snapshot, resources)
+    print(
+        f"Plan: {len(plan['new'])} new, {len(plan['changed'])} changed, "
+        f"{len(plan['unchanged'])} unchanged, {len(plan['removed'])} removed"
+    )
+    to_download = resources if args.force else plan["new"] + plan["changed"]
 
     print("Starting download...")
-    results = download_all_files(resources, data_dir, max_workers=8)
-
-    print("\nSummary of downloading:")
-    for result in results:
-        status = result.get("status")
-        if status == "success":
-            print(f"✅ {result['name']} -> {result['path']}")
-        elif status == "skipped":
-            print(f"⏭️  {result['name']} -> already in unpacked ({result['path']})")
-        else:
-            print(f"❌ {result['name']} -> {result.get('error', 'unknown error')}")
-
-    print("\nUnpacking ZIP files...")
-    summary = []
     unpacked_dir = os.path.join(data_dir, "unpacked")
     os.makedirs(unpacked_dir, exist_ok=True)
-    for result in results:
-        if result["status"] == "success" and result["path"].lower().endswith(".zip"):
-            csv_files = unpack_zip(result["path"], unpacked_dir)
-            summary.append(
-                {
-                    "archive": result["name"],
-                    "csv_count": len(csv_files),
-                    "status": "OK" if csv_files else "Empty or invalid",
-                }
-            )
-        elif result["status"] == "success" and result["path"].lower().endswith(".csv"):
-            src_path = result["path"]
-            dest_path = os.path.join(unpacked_dir, Path(src_path).name)
-            if os.path.abspath(src_path).startswith(os.path.abspath(unpacked_dir)):
-                continue
-            if os.path.exists(dest_path):
-                continue
-            shutil.move(src_path, dest_path)
+    segments = os.getenv("DOWNLOAD_SEGMENTS")
+    stop = threading.Event()
+    downloads = iter_downloads(
+        to_download,
+        data_dir,
+        max_workers=8,
+        segments=int(segments) if segments else 1,
+        stop=stop,
+        force=args.force,
+    )
 
-    if summary:
-        print(f"\nSummary of unpacking:")
-        for item in summary:
-            print(f"{item['archive']} -> {item['csv_count']} CSV ({item["status"]})")
-    else:
-        print("No ZIP files to unpack")
+    chunk_size = os.getenv("CSV_CHUNK_SIZE")
+    max_chunk_mb = os.getenv("CSV_MAX_CHUNK_MB")
+    workers = os.getenv("IMPORT_WORKERS")
+    copy_connections = os.getenv("IMPORT_COPY_CONNECTIONS")
+    merge_slices = os.getenv("IMPORT_MERGE_SLICES")
+    merge_connections = os.getenv("IMPORT_MERGE_CONNECTIONS")
+    unpack_workers = os.getenv("UNPACK_WORKERS")
+    results = []
+    try:
+        asyncio.run(
+            run_pipeline(
+                downloads,
+                unpacked_dir,
+                results,
+                from_zip=args.from_zip,
+                unpack_workers=int(unpack_workers) if unpack_workers else None,
+                metrics=metrics,
+                stop=stop,
+                chunk_size=int(chunk_size) if chunk_size else DEFAULT_CHUNK_SIZE,
+                max_chunk_bytes=(
+                    int(max_chunk_mb) * 1024 * 1024
+                    if max_chunk_mb
+                    else DEFAULT_MAX_CHUNK_BYTES
+                ),
+                workers=int(workers) if workers else None,
+                copy_connections=int(copy_connections) if copy_connections else 1,
+                force=args.force,
+                delete_archives=args.delete_archives,
+                merge_partitions=int(merge_slices) if merge_slices else 1,
+                merge_connections=int(merge_connections) if merge_connections else 1,
+            )
+        )
+    finally:
+        # A failed run may leave the generator suspended with transfers in
+        # flight; they see the flag and abort, and close() waits for them.
+        stop.set()
+        downloads.close()
 
-    asyncio.run(import_csv_files(unpacked_dir))
+    # Only resources that made it through are recorded, so failures are retried.
+    # A changed resource kept as its old unpacked copy stays planned as changed,
+    # so the next run checks it with the server again.
+    changed = {res["url"] for res in plan["changed"]}
+    processed = {
+        r["url"]
+        for r in results
+        if r.get("status") != "failed"
+        and not (r.get("status") == "skipped" and r["url"] in changed)
+    }
+    for res in resources:
+        if res["url"] in processed:
+            snapshot[resource_key(res)] = res
+    for res in plan["removed"]:
+        snapshot.pop(resource_key(res), None)
+    save_json(snapshot_path, snapshot)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,229 @@
+import contextlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Iterator
+
+from utils import save_json
+
+PROMETHEUS_PREFIX = "courtcases"
+# Counters kept per stage and per file; anything else passed to record() is
+# stored on the file entry only.
+COUNTERS = (
+    "bytes_in",
+    "bytes_out",
+    "rows_in",
+    "rows_out",
+    "rows_dropped_blank",
+    "rows_dropped_duplicate",
+    "rows_merged",
+)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class RunMetrics:
+    """Wall time, CPU time, bytes and rows per stage and per file of one run.
+
+    Stages of the pipeline overlap, so a stage's ``wall_seconds`` is the span
+    from its first piece of work starting to its last one finishing, while
+    ``busy_seconds`` and ``cpu_seconds`` add up the individual pieces. CPU time
+    is the thread time of whichever thread or worker process did the work.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = _now()
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.stages: dict[str, dict] = {}
+        self.files: dict[str, dict[str, dict]] = {}
+        self.status = "running"
+        self.finished_at: str | None = None
+        self.wall_seconds: float | None = None
+        self.cpu_seconds: float | None = None
+
+    def record(
+        self,
+        stage: str,
+        file: str | None = None,
+        wall: float = 0.0,
+        cpu: float | None = None,
+        **counters,
+    ):
+        now = time.perf_counter() - self.started
+        with self.lock:
+            entry = self.stages.setdefault(
+                stage,
+                {"first": now - wall, "last": now, "busy_seconds": 0.0, "items": 0},
+            )
+            entry["first"] = min(entry["first"], now - wall)
+            entry["last"] = max(entry["last"], now)
+            entry["busy_seconds"] += wall
+            entry["items"] += 1
+            if cpu is not None:
+                entry["cpu_seconds"] = entry.get("cpu_seconds", 0.0) + cpu
+            for name in COUNTERS:
+                if counters.get(name) is not None:
+                    entry[name] = entry.get(name, 0) + counters[name]
+
+            if file is not None:
+                item = self.files.setdefault(stage, {}).setdefault(file, {})
+                item["wall_seconds"] = item.get("wall_seconds", 0.0) + wall
+                if cpu is not None:
+                    item["cpu_seconds"] = item.get("cpu_seconds", 0.0) + cpu
+                for name, value in counters.items():
+                    if value is None:
+                        continue
+                    if name in COUNTERS:
+                        item[name] = item.get(name, 0) + value
+                    else:
+                        item[name] = value
+
+    @contextlib.contextmanager
+    def measure(self, stage: str, file: str | None = None) -> Iterator[dict]:
+        # Fill the yielded dict with counters; CPU time is this thread's own.
+        counters: dict = {}
+        started, cpu_started = time.perf_counter(), time.thread_time()
+        try:
+            yield counters
+        finally:
+            self.record(
+                stage,
+                file,
+                wall=time.perf_counter() - started,
+                cpu=time.thread_time() - cpu_started,
+                **counters,
+            )
+
+    def finish(self, status: str = "success"):
+        times = os.times()
+        self.status = status
+        self.finished_at = _now()
+        self.wall_seconds = time.perf_counter() - self.started
+        # Worker processes count once they have been joined.
+        self.cpu_seconds = (
+            time.process_time()
+            - self.cpu_started
+            + times.children_user
+            + times.children_system
+        )
+
+    def report(self) -> dict:
+        with self.lock:
+            stages = {}
+            for name, entry in self.stages.items():
+                wall = max(entry["last"] - entry["first"], 0.0)
+                stage = {
+                    "wall_seconds": round(wall, 3),
+                    "busy_seconds": round(entry["busy_seconds"], 3),
+                    "items": entry["items"],
+                }
+                if "cpu_seconds" in entry:
+                    stage["cpu_seconds"] = round(entry["cpu_seconds"], 3)
+                for counter in COUNTERS:
+                    if counter in entry:
+                        stage[counter] = entry[counter]
+                if "rows_dropped_blank" in entry or "rows_dropped_duplicate" in entry:
+                    stage["rows_dropped"] = entry.get(
+                        "rows_dropped_blank", 0
+                    ) + entry.get("rows_dropped_duplicate", 0)
+                if wall > 0 and entry.get("rows_in"):
+                    stage["rows_per_second"] = round(entry["rows_in"] / wall, 1)
+                if wall > 0 and entry.get("bytes_in"):
+                    stage["mb_per_second"] = round(
+                        entry["bytes_in"] / (1024 * 1024) / wall, 2
+                    )
+                stages[name] = stage
+            files = {
+                stage: {
+                    name: {
+                        key: round(value, 3) if isinstance(value, float) else value
+                        for key, value in item.items()
+                    }
+                    for name, item in items.items()
+                }
+                for stage, items in self.files.items()
+            }
+        return {
+            "status": self.status,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "wall_seconds": (
+                round(self.wall_seconds, 3) if self.wall_seconds is not None else None
+            ),
+            "cpu_seconds": (
+                round(self.cpu_seconds, 3) if self.cpu_seconds is not None else None
+            ),
+            "stages": stages,
+            "files": files,
+        }
+
+    def write_json(self, path: str):
+        save_json(path, self.report())
+
+    def write_prometheus(self, path: str):
+        # Written to a temporary file and renamed, as the node_exporter textfile
+        # collector may read the file at any moment.
+        report = self.report()
+        lines = []
+
+        def metric(name: str, help_text: str, samples: list[tuple[str, float]]):
+            full = f"{PROMETHEUS_PREFIX}_{name}"
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} gauge")
+            for labels, value in samples:
+                lines.append(f"{full}{labels} {value}")
+
+        metric(
+            "run_success",
+            "1 if the last run finished successfully, else 0.",
+            [("", 1 if report["status"] == "success" else 0)],
+        )
+        metric(
+            "run_finished_timestamp_seconds",
+            "Unix time the last run finished.",
+            [("", round(time.time(), 3))],
+        )
+        if report["wall_seconds"] is not None:
+            metric(
+                "run_wall_seconds",
+                "Wall time of the last run.",
+                [("", report["wall_seconds"])],
+            )
+            metric(
+                "run_cpu_seconds",
+                "CPU time of the last run, including joined worker processes.",
+                [("", report["cpu_seconds"])],
+            )
+        fields = [
+            (
+                "wall_seconds",
+                "Wall time from a stage's first to its last piece of work.",
+            ),
+            ("cpu_seconds", "CPU time spent in a stage."),
+            ("bytes_in", "Bytes read by a stage."),
+            ("bytes_out", "Bytes written by a stage."),
+            ("rows_in", "Rows read by a stage."),
+            ("rows_out", "Rows passed on by a stage."),
+            ("rows_dropped", "Rows dropped for a blank or duplicate case_number."),
+            ("rows_merged", "Rows inserted or updated in cases."),
+            ("rows_per_second", "Rows read per second of stage wall time."),
+        ]
+        for field, help_text in fields:
+            samples = [
+                (f'{{stage="{stage}"}}', values[field])
+                for stage, values in report["stages"].items()
+                if field in values
+            ]
+            if samples:
+                metric(f"stage_{field}", help_text, samples)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(partial, path)
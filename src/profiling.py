@@ -0,0 +1,156 @@
+import atexit
+import contextlib
+import cProfile
+import marshal
+import os
+import re
+import threading
+import time
+import tracemalloc
+from typing import ContextManager, Iterator
+
+# Set to a directory to profile each stage; worker processes inherit it.
+PROFILE_DIR_ENV = "PROFILE_DIR"
+TRACEMALLOC_FRAMES = 10
+TOP_ALLOCATIONS = 25
+
+_lock = threading.Lock()
+_active = 0
+# One cProfile per process for the whole run: a second profiler in the same
+# thread (3.11) or process (3.12+, sys.monitoring) would replace the first.
+_profiler: cProfile.Profile | None = None
+_profiler_dir: str | None = None
+
+
+def profile_dir() -> str | None:
+    return os.environ.get(PROFILE_DIR_ENV) or None
+
+
+def enable_profiling(directory: str):
+    os.makedirs(directory, exist_ok=True)
+    os.environ[PROFILE_DIR_ENV] = os.path.abspath(directory)
+    # Start in the calling (main) thread, which on 3.11 is the one profiled.
+    _start_process_profile(os.environ[PROFILE_DIR_ENV])
+
+
+def dump_name(stage: str, name: str | None = None) -> str:
+    if name is None:
+        return stage
+    safe = re.sub(r"[^\w.-]+", "_", name).strip("_")
+    return f"{stage}-{safe}"
+
+
+def process_profile_path(directory: str) -> str:
+    return os.path.join(directory, f"{dump_name('cprofile', str(os.getpid()))}.prof")
+
+
+def profile(stage: str, name: str | None = None) -> ContextManager:
+    # Disabled profiling costs one environment lookup per stage or file.
+    directory = profile_dir()
+    if directory is None:
+        return contextlib.nullcontext()
+    return _profiled(directory, stage, name)
+
+
+def _start_process_profile(directory: str):
+    global _profiler, _profiler_dir
+    with _lock:
+        if _profiler is not None:
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (e.g. python -m cProfile) already owns this one.
+            return
+        _profiler, _profiler_dir = profiler, directory
+
+
+def disable_profiling():
+    # Writes this process's profile one last time and stops it.
+    global _profiler
+    dump_process_profile()
+    with _lock:
+        if _profiler is not None:
+            _profiler.disable()
+            _profiler = None
+
+
+def dump_process_profile():
+    # Snapshots without disabling, so the profile keeps running; rewritten
+    # after every stage because pool workers never run atexit handlers.
+    with _lock:
+        if _profiler is None:
+            return
+        _profiler.snapshot_stats()
+        os.makedirs(_profiler_dir, exist_ok=True)
+        with open(process_profile_path(_profiler_dir), "wb") as f:
+            marshal.dump(_profiler.stats, f)
+
+
+atexit.register(dump_process_profile)
+
+
+def _start_section():
+    global _active
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    with _lock:
+        # Sections overlapping in one process share the traced peak.
+        if _active == 0:
+            tracemalloc.reset_peak()
+        _active += 1
+
+
+def _end_section() -> bool:
+    global _active
+    with _lock:
+        _active -= 1
+        return _active == 0
+
+
+@contextlib.contextmanager
+def _profiled(directory: str, stage: str, name: str | None) -> Iterator[None]:
+    base = os.path.join(directory, dump_name(stage, name))
+    _start_process_profile(directory)
+    _start_section()
+    before = tracemalloc.take_snapshot()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        last = _end_section()
+        os.makedirs(directory, exist_ok=True)
+        after.dump(f"{base}.tracemalloc")
+        _write_summary(f"{base}.txt", stage, name, seconds, peak, before, after)
+        if last:
+            dump_process_profile()
+
+
+def _write_summary(
+    path: str,
+    stage: str,
+    name: str | None,
+    seconds: float,
+    peak: int,
+    before: tracemalloc.Snapshot,
+    after: tracemalloc.Snapshot,
+):
+    growth = after.compare_to(before, "lineno")[:TOP_ALLOCATIONS]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"stage: {stage}\n")
+        if name is not None:
+            f.write(f"file: {name}\n")
+        f.write(f"pid: {os.getpid()}\n")
+        f.write(f"wall_seconds: {seconds:.3f}\n")
+        f.write(f"peak_traced_mb: {peak / (1024 * 1024):.1f}\n")
+        if _profiler is not None:
+            f.write(f"cprofile: {os.path.basename(process_profile_path('.'))}\n")
+        else:
+            f.write("cprofile: no (another profiler is active)\n")
+        f.write(f"\nTop {TOP_ALLOCATIONS} allocation changes during the stage:\n")
+        for stat in growth:
+            f.write(f"{stat}\n")
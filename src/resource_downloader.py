@@ -1,14 +1,34 @@
+import contextlib
+import hashlib
 import os
-from asyncio import as_completed
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator
 
 import requests
 from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 from urllib3.util.retry import Retry
 
+from profiling import profile
+from utils import load_json, save_json
 
-def create_session() -> requests.Session:
+DEFAULT_POOL_SIZE = 10
+DEFAULT_SEGMENTS = 4
+MIN_SEGMENT_SIZE = 8 * 1024 * 1024
+SEGMENT_STATE_SUFFIX = ".segments.json"
+SEGMENT_STATE_INTERVAL = 1.0
+HTTP_CACHE_FILE = ".http_cache.json"
+DEFAULT_DIGEST = "blake2b"
+# CKAN "hash" values usually come without an algorithm prefix.
+HASH_LENGTHS = {32: "md5", 40: "sha1", 64: "sha256", 128: "sha512"}
+INTEGRITY_ATTEMPTS = 3
+
+
+def create_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    # One session is shared by every download worker, so size its connection
+    # pool to the worker count and keep connections alive between files.
     session = requests.Session()
     retries = Retry(
         total=5,
@@ -16,10 +36,117 @@ def create_session() -> requests.Session:
         status_forcelist=[500, 502, 503, 504],
         allowed_methods=["GET", "HEAD"],
     )
-    session.mount("https://", HTTPAdapter(max_retries=retries))
+    adapter = HTTPAdapter(
+        max_retries=retries, pool_connections=pool_size, pool_maxsize=pool_size
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
     return session
 
 
+class NotModified(Exception):
+    """Raised when the server answers 304 to a conditional request."""
+
+
+class IntegrityError(Exception):
+    """Raised when a downloaded file does not match the expected size or hash."""
+
+
+class DownloadCancelled(Exception):
+    """Raised inside a transfer once its ``stop`` event is set."""
+
+
+def _check_stop(stop: threading.Event | None, url: str):
+    if stop is not None and stop.is_set():
+        raise DownloadCancelled(url)
+
+
+def _expected_digest(ckan_hash) -> tuple[str, str | None]:
+    """Return the hash algorithm to use and the expected hex digest, if known."""
+    value = str(ckan_hash or "").strip().lower()
+    if ":" in value:
+        algorithm, _, hexdigest = value.partition(":")
+        if algorithm in hashlib.algorithms_available:
+            return algorithm, hexdigest
+    elif len(value) in HASH_LENGTHS and all(c in "0123456789abcdef" for c in value):
+        return HASH_LENGTHS[len(value)], value
+    return DEFAULT_DIGEST, None
+
+
+def _new_hasher(integrity: dict | None):
+    if integrity is None:
+        return None
+    return hashlib.new(_expected_digest(integrity.get("hash"))[0])
+
+
+def _hash_file(hasher, path: str, length: int | None = None, block_size=1024 * 1024):
+    remaining = length
+    with open(path, "rb") as file:
+        while remaining is None or remaining > 0:
+            chunk = file.read(
+                block_size if remaining is None else min(block_size, remaining)
+            )
+            if not chunk:
+                break
+            hasher.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+
+
+def _check_integrity(integrity: dict, hasher, path: str):
+    """Compare with the CKAN size/hash, record the digest, or drop the file."""
+    _, expected = _expected_digest(integrity.get("hash"))
+    size = os.path.getsize(path)
+    expected_size = integrity.get("size")
+    expected_size = int(expected_size) if str(expected_size).isdigit() else None
+    hexdigest = hasher.hexdigest()
+
+    problem = None
+    if expected_size is not None and size != expected_size:
+        problem = f"size {size} != expected {expected_size}"
+    elif expected is not None and hexdigest != expected:
+        problem = f"{hasher.name} {hexdigest} != expected {expected}"
+    if problem:
+        os.remove(path)
+        raise IntegrityError(f"{os.path.basename(path)}: {problem}")
+
+    integrity["digest"] = f"{hasher.name}:{hexdigest}"
+    integrity["verified"] = expected is not None or expected_size is not None
+
+
+def _verify_file(integrity: dict | None, path: str):
+    hasher = _new_hasher(integrity)
+    if hasher is not None:
+        _hash_file(hasher, path)
+        _check_integrity(integrity, hasher, path)
+
+
+def _conditional_headers(cache_entry: dict | None, file_name: str) -> dict:
+    # Only a complete local copy of the cached version may be revalidated; a
+    # 304 for a missing or partial file would leave nothing usable on disk.
+    headers = {}
+    if (
+        cache_entry
+        and os.path.exists(file_name)
+        and os.path.getsize(file_name) == cache_entry.get("content_length")
+    ):
+        if cache_entry.get("etag"):
+            headers["If-None-Match"] = cache_entry["etag"]
+        if cache_entry.get("last_modified"):
+            headers["If-Modified-Since"] = cache_entry["last_modified"]
+    return headers
+
+
+def _remember_validators(cache_entry: dict | None, headers, file_name: str):
+    if cache_entry is None:
+        return
+    cache_entry.update(
+        etag=headers.get("ETag"),
+        last_modified=headers.get("Last-Modified"),
+        content_length=os.path.getsize(file_name),
+    )
+
+
 def _parse_total_from_content_range(value: str | None) -> int | None:
     if not value or "/" not in value:
         return None
@@ -29,7 +156,45 @@ def _parse_total_from_content_range(value: str | None) -> int | None:
         return None
 
 
-def download_file(url: str, output_dir: str, position: int = 0) -> str:
+def download_file(
+    url: str,
+    output_dir: str,
+    position: int = 0,
+    session: requests.Session | None = None,
+    cache_entry: dict | None = None,
+    integrity: dict | None = None,
+    stop: threading.Event | None = None,
+) -> str:
+    """Download ``url`` into ``output_dir``, resuming a partial file.
+
+    When ``integrity`` is given (``{"hash": ..., "size": ...}`` from CKAN), the
+    file is hashed while it streams and checked against those values; a
+    mismatch deletes the file and retries. On success ``integrity`` gains
+    ``digest`` (``"algorithm:hex"``) and ``verified``. Setting ``stop`` aborts
+    the transfer with ``DownloadCancelled``, keeping the partial file.
+    """
+    if session is not None:
+        return _download_with_session(
+            url, output_dir, position, session, cache_entry, integrity, stop
+        )
+    session = create_session()
+    try:
+        return _download_with_session(
+            url, output_dir, position, session, cache_entry, integrity, stop
+        )
+    finally:
+        session.close()
+
+
+def _download_with_session(
+    url: str,
+    output_dir: str,
+    position: int,
+    session: requests.Session,
+    cache_entry: dict | None = None,
+    integrity: dict | None = None,
+    stop: threading.Event | None = None,
+) -> str:
     os.makedirs(output_dir, exist_ok=True)
     file_name = os.path.join(output_dir, url.split("/")[-1])
 
@@ -37,27 +202,25 @@ def download_file(url: str, output_dir: str, position: int = 0) -> str:
     attempt = 1
     block_size = 1024 * 1024
 
-    session = create_session()
-
     while attempt <= max_attempts:
         try:
+            _check_stop(stop, url)
             existing_size = (
                 os.path.getsize(file_name) if os.path.exists(file_name) else 0
             )
-            headers = {}
+            headers = _conditional_headers(cache_entry, file_name)
+            if headers:
+                # The local file is the complete cached version: either the
+                # server confirms it (304) or the new version is fetched whole.
+                existing_size = 0
             if existing_size > 0:
                 headers["Range"] = f"bytes={existing_size}-"
 
-            try:
-                head = session.head(url, timeout=30, allow_redirects=True)
-                if head.ok:
-                    cl = head.headers.get("content-length")
-                    remote_total = int(cl) if cl and cl.isdigit() else None
-            except Exception:
-                pass
-
             response = session.get(url, stream=True, timeout=(10, 300), headers=headers)
+            if response.status_code == 304:
+                raise NotModified(url)
             if response.status_code == 416 and existing_size > 0:
+                _verify_file(integrity, file_name)
                 return file_name
             if existing_size > 0 and response.status_code == 200:
                 full_length = response.headers.get("content-length")
@@ -66,6 +229,7 @@ def download_file(url: str, output_dir: str, position: int = 0) -> str:
                     and full_length.isdigit()
                     and int(full_length) == existing_size
                 ):
+                    _verify_file(integrity, file_name)
                     return file_name
                 response.close()
                 try:
@@ -91,6 +255,10 @@ def download_file(url: str, output_dir: str, position: int = 0) -> str:
                 total_size = int(cl) if cl and cl.isdigit() else None
 
             mode = "ab" if existing_size > 0 else "wb"
+            hasher = _new_hasher(integrity)
+            if hasher is not None and existing_size:
+                # Resuming: the digest has to cover the bytes already on disk.
+                _hash_file(hasher, file_name, existing_size)
             written_this_attempt = 0
             with open(file_name, mode) as file, tqdm(
                 total=total_size,
@@ -104,14 +272,22 @@ def download_file(url: str, output_dir: str, position: int = 0) -> str:
                 if total_size is None and existing_size:
                     progress_bar.reset(total=0)
                 for chunk in response.iter_content(block_size):
+                    _check_stop(stop, url)
                     if not chunk:
                         continue
                     file.write(chunk)
+                    if hasher is not None:
+                        hasher.update(chunk)
                     written_this_attempt += len(chunk)
                     progress_bar.update(len(chunk))
 
+            if hasher is not None:
+                _check_integrity(integrity, hasher, file_name)
+            _remember_validators(cache_entry, response.headers, file_name)
             return file_name
 
+        except (NotModified, DownloadCancelled):
+            raise
         except Exception as error:
 
             attempt += 1
@@ -130,63 +306,467 @@ def download_file(url: str, output_dir: str, position: int = 0) -> str:
     return None
 
 
-def download_all_files(resources: list[dict], output_dir: str, max_workers: int = 3):
+def _probe_range_support(
+    url: str,
+    session: requests.Session,
+    cache_entry: dict | None = None,
+    file_name: str | None = None,
+) -> tuple[int | None, dict]:
+    """Return the remote size (None without range support) and the headers."""
+    headers = {"Range": "bytes=0-0"}
+    if file_name is not None:
+        headers.update(_conditional_headers(cache_entry, file_name))
+    response = session.get(url, stream=True, timeout=(10, 30), headers=headers)
+    try:
+        if response.status_code == 304:
+            raise NotModified(url)
+        if response.status_code != 206:
+            return None, {}
+        size = _parse_total_from_content_range(response.headers.get("Content-Range"))
+        return size, response.headers
+    finally:
+        response.close()
+
+
+def _split_ranges(size: int, segments: int) -> list[list[int]]:
+    step = -(-size // segments)
+    return [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+
+
+def _remote_version(headers) -> dict:
+    return {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+
+
+def _load_segment_state(
+    state_path: str, file_name: str, url: str, size: int, version: dict
+):
+    # A replacement of the same size is only told apart by its validators;
+    # resuming onto it would mix old and new bytes.
+    state = load_json(state_path)
+    if (
+        state.get("url") == url
+        and state.get("size") == size
+        and all(state.get(key) == value for key, value in version.items())
+        and os.path.exists(file_name)
+        and os.path.getsize(file_name) == size
+    ):
+        return state
+    return None
+
+
+def _fetch_segment(
+    url: str,
+    file_name: str,
+    segment: list[int],
+    session: requests.Session,
+    on_progress,
+    max_attempts: int = 5,
+    block_size: int = 1024 * 1024,
+    stop: threading.Event | None = None,
+):
+    start, end = segment[0], segment[1]
+    for attempt in range(1, max_attempts + 1):
+        offset = start + segment[2]
+        if offset > end:
+            return
+        try:
+            _check_stop(stop, url)
+            response = session.get(
+                url,
+                stream=True,
+                timeout=(10, 300),
+                headers={"Range": f"bytes={offset}-{end}"},
+            )
+            with response:
+                if response.status_code != 206:
+                    raise RuntimeError(
+                        f"expected 206 for bytes={offset}-{end}, "
+                        f"got {response.status_code}"
+                    )
+                with open(file_name, "r+b") as file:
+                    file.seek(offset)
+                    for chunk in response.iter_content(block_size):
+                        _check_stop(stop, url)
+                        if not chunk:
+                            continue
+                        file.write(chunk)
+                        on_progress(segment, len(chunk))
+            if start + segment[2] > end:
+                return
+            raise RuntimeError(f"bytes={offset}-{end} ended early")
+        except DownloadCancelled:
+            raise
+        except Exception as error:
+            if attempt == max_attempts:
+                raise RuntimeError(
+                    f"An error occurred while loading {url} "
+                    f"bytes={offset}-{end}: {error}"
+                )
+
+
+def download_segmented(
+    url: str,
+    output_dir: str,
+    segments: int = DEFAULT_SEGMENTS,
+    position: int = 0,
+    session: requests.Session | None = None,
+    min_segment_size: int | None = None,
+    cache_entry: dict | None = None,
+    integrity: dict | None = None,
+    stop: threading.Event | None = None,
+) -> str:
+    """Download ``url`` as up to ``segments`` concurrent byte ranges.
+
+    The file is preallocated and every range is written at its own offset.
+    Progress per range lives in ``<file>.segments.json`` so an interrupted
+    download resumes only the missing bytes; it is removed once complete.
+    Servers without range support, and files too small to split, fall back
+    to ``download_file``. Ranges finish out of order, so ``integrity`` is
+    checked by hashing the assembled file once, then retried on mismatch.
+    """
+    if session is None:
+        session = create_session(pool_size=segments)
+        try:
+            return download_segmented(
+                url,
+                output_dir,
+                segments,
+                position,
+                session,
+                min_segment_size,
+                cache_entry,
+                integrity,
+                stop,
+            )
+        finally:
+            session.close()
+
+    min_segment_size = min_segment_size or MIN_SEGMENT_SIZE
+    for attempt in range(1, INTEGRITY_ATTEMPTS + 1):
+        try:
+            return _download_segments(
+                url,
+                output_dir,
+                segments,
+                position,
+                session,
+                min_segment_size,
+                cache_entry,
+                integrity,
+                stop,
+            )
+        except IntegrityError as error:
+            if attempt == INTEGRITY_ATTEMPTS:
+                raise RuntimeError(f"An error occurred while loading {url}: {error}")
+
+
+def _download_segments(
+    url: str,
+    output_dir: str,
+    segments: int,
+    position: int,
+    session: requests.Session,
+    min_segment_size: int,
+    cache_entry: dict | None,
+    integrity: dict | None,
+    stop: threading.Event | None = None,
+) -> str:
     os.makedirs(output_dir, exist_ok=True)
-    results = []
+    file_name = os.path.join(output_dir, url.split("/")[-1])
+    state_path = file_name + SEGMENT_STATE_SUFFIX
 
-    unpacked_dir = os.path.join(output_dir, "unpacked")
+    conditional = bool(_conditional_headers(cache_entry, file_name))
+    size, probe_headers = _probe_range_support(url, session, cache_entry, file_name)
+    if size is None or size < 2 * min_segment_size:
+        return download_file(
+            url,
+            output_dir,
+            position,
+            session=session,
+            cache_entry=cache_entry,
+            integrity=integrity,
+            stop=stop,
+        )
 
-    # Prepare download tasks, skipping CSVs already present in unpacked
-    tasks = []
-    for res in resources:
-        url = res.get("url")
-        if not url:
-            continue
+    version = _remote_version(probe_headers)
+    state = _load_segment_state(state_path, file_name, url, size, version)
+    if state is None:
+        # A probe that passed a conditional check means the remote changed.
+        if (
+            not conditional
+            and os.path.exists(file_name)
+            and not os.path.exists(state_path)
+            and os.path.getsize(file_name) == size
+        ):
+            _verify_file(integrity, file_name)
+            _remember_validators(cache_entry, probe_headers, file_name)
+            return file_name
+        count = max(1, min(segments, size // min_segment_size))
+        state = {
+            "url": url,
+            "size": size,
+            **version,
+            "segments": _split_ranges(size, count),
+        }
+        with open(file_name, "wb") as file:
+            file.truncate(size)
+        save_json(state_path, state)
+
+    lock = threading.Lock()
+    last_save = [time.monotonic()]
+    done = sum(segment[2] for segment in state["segments"])
+
+    with tqdm(
+        total=size,
+        initial=done,
+        unit="B",
+        unit_scale=True,
+        desc=os.path.basename(file_name) + (" (resuming)" if done else ""),
+        ncols=100,
+        position=position,
+        leave=False,
+    ) as progress_bar:
+
+        def on_progress(segment: list[int], n: int):
+            with lock:
+                segment[2] += n
+                progress_bar.update(n)
+                if time.monotonic() - last_save[0] >= SEGMENT_STATE_INTERVAL:
+                    save_json(state_path, state)
+                    last_save[0] = time.monotonic()
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(state["segments"])) as executor:
+                futures = [
+                    executor.submit(
+                        _fetch_segment,
+                        url,
+                        file_name,
+                        segment,
+                        session,
+                        on_progress,
+                        stop=stop,
+                    )
+                    for segment in state["segments"]
+                ]
+                for future in as_completed(futures):
+                    future.result()
+        finally:
+            with lock:
+                save_json(state_path, state)
+
+    os.remove(state_path)
+    _verify_file(integrity, file_name)
+    _remember_validators(cache_entry, probe_headers, file_name)
+    return file_name
 
-        fmt = (res.get("format") or "").lower()
-        file_name = os.path.basename(url)
-        unpacked_path = os.path.join(unpacked_dir, file_name)
 
-        if fmt == "csv" and os.path.exists(unpacked_path):
-            results.append(
-                {
+def download_all_files(
+    resources: list[dict],
+    output_dir: str,
+    max_workers: int = 3,
+    segments: int = 1,
+    cache_path: str | None = None,
+):
+    return list(
+        iter_downloads(resources, output_dir, max_workers, segments, cache_path)
+    )
+
+
+def iter_downloads(
+    resources: list[dict],
+    output_dir: str,
+    max_workers: int = 3,
+    segments: int = 1,
+    cache_path: str | None = None,
+    stop: threading.Event | None = None,
+    force: bool = False,
+) -> Iterator[dict]:
+    """Yield one result dict per resource as soon as its download finishes.
+
+    A CSV already in ``unpacked`` is skipped only when the server confirms,
+    through the cached ETag / Last-Modified, that it has not changed since;
+    otherwise it is downloaded again. Once ``stop`` is set, transfers in
+    flight abort, queued ones never start and the generator returns.
+    ``force`` fetches every resource afresh: no conditional requests, no
+    resuming and no skipping CSVs already unpacked.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    # ETag / Last-Modified per URL; entries are only filled after a full download.
+    cache_path = cache_path or os.path.join(output_dir, HTTP_CACHE_FILE)
+    http_cache = load_json(cache_path)
+
+    unpacked_dir = os.path.join(output_dir, "unpacked")
+    session = create_session(pool_size=max_workers * max(segments, 1))
+    try:
+        # Prepare download tasks, skipping CSVs already present in unpacked
+        tasks = []
+        for res in resources:
+            if stop is not None and stop.is_set():
+                return
+            url = res.get("url")
+            if not url:
+                continue
+
+            fmt = (res.get("format") or "").lower()
+            file_name = os.path.basename(url)
+            unpacked_path = os.path.join(unpacked_dir, file_name)
+
+            if force:
+                http_cache.pop(url, None)
+                for stale in (file_name, file_name + SEGMENT_STATE_SUFFIX):
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(os.path.join(output_dir, stale))
+            elif fmt == "csv" and _unpacked_copy_is_current(
+                url, unpacked_path, http_cache.get(url), session
+            ):
+                yield {
                     "name": res.get("name"),
+                    "url": url,
                     "path": unpacked_path,
                     "status": "skipped",
+                    "digest": http_cache[url].get("digest"),
                 }
-            )
-            continue
+                continue
 
-        tasks.append(res)
+            tasks.append(res)
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_res = {
-            executor.submit(download_file, res["url"], output_dir, index): res
-            for index, res in enumerate(tasks)
+        integrity = {
+            res["url"]: {"hash": res.get("hash"), "size": res.get("size")}
+            for res in tasks
         }
+        yield from _run_downloads(
+            tasks,
+            output_dir,
+            max_workers,
+            segments,
+            session,
+            http_cache,
+            integrity,
+            stop,
+        )
+    finally:
+        session.close()
+        save_json(
+            cache_path, {url: entry for url, entry in http_cache.items() if entry}
+        )
 
-        for future in tqdm(
-            as_completed(future_to_res),
-            total=len(future_to_res),
-            desc="Downloading files...",
-            ncols=100,
-        ):
-            res = future_to_res[future]
-            try:
-                results.append(
-                    {
+
+def _unpacked_copy_is_current(
+    url: str, path: str, cache_entry: dict | None, session: requests.Session
+) -> bool:
+    # The CSV was moved to unpacked whole, so its cached validators still
+    # describe it; without them (or on any error) it is fetched again.
+    headers = _conditional_headers(cache_entry, path)
+    if not headers:
+        return False
+    try:
+        response = session.get(url, stream=True, timeout=(10, 60), headers=headers)
+    except requests.RequestException:
+        return False
+    response.close()
+    return response.status_code == 304
+
+
+def _timed(timings: dict, url: str, func, *args, **kwargs):
+    started = time.perf_counter()
+    try:
+        with profile("download", os.path.basename(url)):
+            return func(*args, **kwargs)
+    finally:
+        timings[url] = time.perf_counter() - started
+
+
+def _run_downloads(
+    tasks: list[dict],
+    output_dir: str,
+    max_workers: int,
+    segments: int,
+    session: requests.Session,
+    http_cache: dict,
+    integrity: dict,
+    stop: threading.Event | None = None,
+) -> Iterator[dict]:
+    timings: dict[str, float] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        if segments > 1:
+            future_to_res = {
+                executor.submit(
+                    _timed,
+                    timings,
+                    res["url"],
+                    download_segmented,
+                    res["url"],
+                    output_dir,
+                    segments,
+                    index,
+                    session=session,
+                    cache_entry=http_cache.setdefault(res["url"], {}),
+                    integrity=integrity[res["url"]],
+                    stop=stop,
+                ): res
+                for index, res in enumerate(tasks)
+            }
+        else:
+            future_to_res = {
+                executor.submit(
+                    _timed,
+                    timings,
+                    res["url"],
+                    download_file,
+                    res["url"],
+                    output_dir,
+                    index,
+                    session=session,
+                    cache_entry=http_cache.setdefault(res["url"], {}),
+                    integrity=integrity[res["url"]],
+                    stop=stop,
+                ): res
+                for index, res in enumerate(tasks)
+            }
+
+        try:
+            for future in tqdm(
+                as_completed(future_to_res),
+                total=len(future_to_res),
+                desc="Downloading files...",
+                ncols=100,
+            ):
+                if stop is not None and stop.is_set():
+                    return
+                res = future_to_res[future]
+                cache_entry = http_cache[res["url"]]
+                try:
+                    path = future.result()
+                    checked = integrity[res["url"]]
+                    # Later stages can trust this digest instead of re-reading the file.
+                    cache_entry["digest"] = checked.get("digest")
+                    result = {
                         "name": res.get("name"),
-                        "path": future.result(),
+                        "url": res["url"],
+                        "path": path,
                         "status": "success",
+                        "digest": checked.get("digest"),
+                        "verified": checked.get("verified", False),
                     }
-                )
-            except Exception as error:
-                results.append(
-                    {
+                except NotModified:
+                    result = {
+                        "name": res.get("name"),
+                        "url": res["url"],
+                        "path": os.path.join(output_dir, os.path.basename(res["url"])),
+                        "status": "not_modified",
+                        "digest": cache_entry.get("digest"),
+                    }
+                except Exception as error:
+                    result = {
                         "name": res.get("name"),
+                        "url": res["url"],
                         "error": str(error),
                         "status": "failed",
                     }
-                )
-
-        return results
+                result["seconds"] = timings.get(res["url"])
+                yield result
+        finally:
+            # Queued downloads never start once stopped or abandoned.
+            for future in future_to_res:
+                future.cancel()
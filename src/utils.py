@@ -1,10 +1,90 @@
+import hashlib
+import json
+import multiprocessing
+import os
 from datetime import date, datetime
 
+import numpy as np
+import pandas as pd
+
+DATE_FORMAT = "%d.%m.%Y"
+
 
 def parse_date(value: str) -> date | None:
     if not isinstance(value, str) or not value.strip():
         return None
     try:
-        return datetime.strptime(value.strip(), "%d.%m.%Y").date()
+        return datetime.strptime(value.strip(), DATE_FORMAT).date()
     except ValueError:
         return None
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    codes, uniques = pd.factorize(values)
+    stripped = pd.Series(uniques, dtype=object).str.strip()
+    parsed = pd.to_datetime(stripped, format=DATE_FORMAT, errors="coerce")
+
+    # Slot -1 (missing values) maps to the trailing None.
+    dates = np.empty(len(uniques) + 1, dtype=object)
+    for i, (raw, value) in enumerate(zip(uniques, parsed)):
+        # NaT also covers years outside pandas' range, which strptime still accepts
+        dates[i] = parse_date(raw) if pd.isna(value) else value.date()
+    dates[-1] = None
+    return pd.Series(dates[codes], index=values.index, dtype=object)
+
+
+def normalize_column_name(name: str) -> str:
+    return (
+        name.replace("\ufeff", "").strip().lower().replace(" ", "_").replace("-", "_")
+    )
+
+
+def file_identity(path: str) -> str:
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def file_digest(path: str, algorithm: str = "blake2b") -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, algorithm).hexdigest()
+
+
+def load_json(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_json(path: str, data: dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def update_json(path: str, entries: dict):
+    data = load_json(path)
+    data.update(entries)
+    save_json(path, data)
+
+
+def save_cache_updates(cache_updates: dict):
+    # Entries collected by worker processes, written by the one parent process
+    # so concurrent workers never overwrite each other's keys.
+    for path, entries in cache_updates.items():
+        try:
+            update_json(path, entries)
+        except OSError:
+            pass
+
+
+def worker_context():
+    # Worker processes start while download and to_thread threads are running;
+    # forking then can deadlock the child, so never use "fork".
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context(
+        "forkserver" if "forkserver" in methods else "spawn"
+    )
@@ -1,18 +1,177 @@
 import os
+import time
 import zipfile
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import repeat
+from typing import BinaryIO
 
+from utils import file_digest, file_identity, worker_context
 
-def unpack_zip(zip_path: str, output_dir: str) -> list[str]:
-    extracted_files = []
+MEMBER_SEPARATOR = "::"
+# Smaller archives are not worth shipping to worker processes.
+PARALLEL_UNPACK_MIN_BYTES = 64 * 1024 * 1024
+CRC_BLOCK_SIZE = 1024 * 1024
+
+
+def create_unpack_pool(workers: int | None = None) -> ProcessPoolExecutor | None:
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 0:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=worker_context())
+
+
+def _member_target(output_dir: str, name: str) -> str | None:
+    # Same path ZipFile.extract would produce for a plain relative name;
+    # anything it would rewrite (absolute, "..") is left to ZipFile.extract.
+    target = os.path.normpath(os.path.join(output_dir, name))
+    root = os.path.abspath(output_dir)
+    inside = os.path.commonpath([root, os.path.abspath(target)]) == root
+    return target if inside and not os.path.isabs(name) else None
+
+
+def _file_crc(path: str) -> int:
+    crc = 0
+    with open(path, "rb") as f:
+        while block := f.read(CRC_BLOCK_SIZE):
+            crc = zlib.crc32(block, crc)
+    return crc
+
+
+# Returns the member's path and the bytes written, or None when an identical
+# copy (same size and CRC) is already on disk.
+def extract_member(zip_path: str, name: str, output_dir: str) -> tuple[str, int | None]:
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        info = zip_ref.getinfo(name)
+        target = _member_target(output_dir, name)
+        if (
+            target is not None
+            and os.path.isfile(target)
+            and os.path.getsize(target) == info.file_size
+            and _file_crc(target) == info.CRC
+        ):
+            return target, None
+        return zip_ref.extract(info, output_dir), info.file_size
+
+
+def unpack_zip(
+    zip_path: str,
+    output_dir: str,
+    executor: Executor | None = None,
+    stats: dict | None = None,
+) -> list[str]:
     os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    try:
+        with zipfile.ZipFile(zip_path, "r") as zip_ref:
+            # Only the members we ingest are ever decompressed.
+            members = [
+                info
+                for info in zip_ref.infolist()
+                if info.filename.lower().endswith(".csv")
+            ]
+        names = [info.filename for info in members]
+        total = sum(info.file_size for info in members)
+        if (
+            executor is not None
+            and len(names) > 1
+            and total >= PARALLEL_UNPACK_MIN_BYTES
+        ):
+            extracted = list(
+                executor.map(
+                    extract_member, repeat(zip_path), names, repeat(output_dir)
+                )
+            )
+        else:
+            extracted = [extract_member(zip_path, name, output_dir) for name in names]
+    except zipfile.BadZipFile:
+        print(f"Error: {zip_path} is not a valid ZIP archive ")
+        return []
+
+    written = sum(size or 0 for _, size in extracted)
+    skipped = sum(1 for _, size in extracted if size is None)
+    seconds = max(time.perf_counter() - started, 1e-9)
+    mb = written / (1024 * 1024)
+    if stats is not None:
+        stats.update(
+            bytes_in=os.path.getsize(zip_path),
+            bytes_out=written,
+            files=len(extracted),
+            files_kept=skipped,
+        )
+    print(
+        f"📦 Unpacked {os.path.basename(zip_path)}: {len(extracted) - skipped} CSV, "
+        f"{skipped} already present, {mb:.1f} MB in {seconds:.1f}s "
+        f"({mb / seconds:.1f} MB/s)"
+    )
+    return [path for path, _ in extracted]
 
+
+def list_csv_members(zip_path: str) -> list[str]:
     try:
         with zipfile.ZipFile(zip_path, "r") as zip_ref:
-            zip_ref.extractall(output_dir)
-            for name in zip_ref.namelist():
-                if name.lower().endswith(".csv"):
-                    extracted_files.append(os.path.join(output_dir, name))
+            return [
+                f"{zip_path}{MEMBER_SEPARATOR}{name}"
+                for name in zip_ref.namelist()
+                if name.lower().endswith(".csv")
+            ]
     except zipfile.BadZipFile:
         print(f"Error: {zip_path} is not a valid ZIP archive ")
+        return []
+
+
+def split_source(source: str) -> tuple[str, str | None]:
+    path, separator, member = source.partition(MEMBER_SEPARATOR)
+    return path, member if separator else None
+
+
+def open_source(source: str) -> BinaryIO:
+    path, member = split_source(source)
+    if member is None:
+        return open(path, "rb")
+    # The member stream keeps the archive file open until it is closed itself.
+    with zipfile.ZipFile(path, "r") as zip_ref:
+        return zip_ref.open(member)
+
+
+def _member_info(path: str, member: str) -> zipfile.ZipInfo:
+    with zipfile.ZipFile(path, "r") as zip_ref:
+        return zip_ref.getinfo(member)
+
+
+def source_identity(source: str) -> str:
+    path, member = split_source(source)
+    if member is None:
+        return file_identity(path)
+    info = _member_info(path, member)
+    return f"{info.file_size}:{info.CRC:08x}"
+
+
+def source_digest(source: str) -> str:
+    path, member = split_source(source)
+    if member is None:
+        return file_digest(path)
+    return f"crc32:{_member_info(path, member).CRC:08x}"
+
+
+def source_stat(source: str) -> tuple[int, int | None]:
+    path, member = split_source(source)
+    if member is None:
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+    return _member_info(path, member).file_size, None
+
+
+def source_key(source: str) -> str:
+    path, member = split_source(source)
+    key = os.path.basename(path)
+    if member is not None:
+        key = f"{key}{MEMBER_SEPARATOR}{member}"
+    return key
+
 
-    return extracted_files
+def source_cache_location(source: str, cache_file: str) -> tuple[str, str]:
+    path, _ = split_source(source)
+    return os.path.join(os.path.dirname(path), cache_file), source_key(source)
@@ -0,0 +1,89 @@
+import csv_sniffer
+from csv_to_db import EXPECTED_COLUMNS
+
+
+def test_sniff_csv_detects_delimiter_and_header(tmp_path):
+    for sep in [";", ",", "\t"]:
+        p = tmp_path / "in.csv"
+        p.write_text(
+            sep.join(["court_name", "case_number", "stage_date"])
+            + "\n"
+            + sep.join(["Court A", "1/2", "01.01.2020"])
+            + "\n",
+            encoding="utf-8",
+        )
+        dialect = csv_sniffer.sniff_csv(str(p), "utf-8", EXPECTED_COLUMNS)
+        assert dialect["sep"] == sep
+        assert dialect["header_row"] == 0
+        assert dialect["column_count"] == 3
+
+
+def test_sniff_csv_finds_header_after_preamble(tmp_path):
+    p = tmp_path / "in.csv"
+    p.write_text(
+        "Registry export\n\nCourt Name;Case Number\nCourt A;1\n", encoding="utf-8"
+    )
+    dialect = csv_sniffer.sniff_csv(str(p), "utf-8", EXPECTED_COLUMNS)
+    assert dialect["header_row"] == 2
+
+
+def test_sniff_csv_headerless(tmp_path):
+    p = tmp_path / "in.csv"
+    p.write_text(";".join(["v"] * 13) + "\n", encoding="utf-8")
+    dialect = csv_sniffer.sniff_csv(str(p), "utf-8", EXPECTED_COLUMNS)
+    assert dialect["header_row"] is None
+    assert dialect["column_count"] == 13
+
+
+def test_sniff_csv_prefers_delimiter_matching_header(tmp_path):
+    # Every line has exactly two commas, so csv.Sniffer alone would pick ",".
+    row = ["Court A", "1/2", "суддя: A, B", "позивач: X, відповідач: Y"]
+    header = ["court_name", "case_number", "judges", "participants"]
+    p = tmp_path / "in.csv"
+    p.write_text(
+        "\n".join(";".join(line) for line in [header] + [row] * 20) + "\n",
+        encoding="utf-8",
+    )
+    dialect = csv_sniffer.sniff_csv(str(p), "utf-8", EXPECTED_COLUMNS)
+    assert dialect["sep"] == ";"
+    assert dialect["header_row"] == 0
+
+    p.write_text(
+        "\n".join(";".join(row + ["v"] * 9) for _ in range(20)) + "\n",
+        encoding="utf-8",
+    )
+    dialect = csv_sniffer.sniff_csv(str(p), "utf-8", EXPECTED_COLUMNS)
+    assert dialect["sep"] == ";"
+    assert dialect["column_count"] == len(EXPECTED_COLUMNS)
+
+
+def test_sniff_csv_engine_choice(tmp_path, monkeypatch):
+    p = tmp_path / "in.csv"
+    p.write_text("court_name;case_number\nA;1\n", encoding="utf-8")
+    monkeypatch.setattr(csv_sniffer, "HAS_PYARROW", False)
+    assert csv_sniffer.sniff_csv(str(p), "utf-8")["engine"] == "c"
+    monkeypatch.setattr(csv_sniffer, "HAS_PYARROW", True)
+    assert csv_sniffer.sniff_csv(str(p), "utf-8")["engine"] == "pyarrow"
+
+
+def test_sniff_csv_cached_skips_resniffing(tmp_path, monkeypatch):
+    p = tmp_path / "in.csv"
+    p.write_text("court_name;case_number\nA;1\n", encoding="utf-8")
+    calls = []
+    real_sniff = csv_sniffer.sniff_csv
+
+    def counting_sniff(*args, **kwargs):
+        calls.append(args[0])
+        return real_sniff(*args, **kwargs)
+
+    monkeypatch.setattr(csv_sniffer, "sniff_csv", counting_sniff)
+    first = csv_sniffer.sniff_csv_cached(str(p), "utf-8", EXPECTED_COLUMNS)
+    second = csv_sniffer.sniff_csv_cached(str(p), "utf-8", EXPECTED_COLUMNS)
+    assert first == second
+    assert len(calls) == 1
+    assert (tmp_path / csv_sniffer.CACHE_FILE).exists()
+
+    p.write_text("court_name,case_number\nA,1\nB,2\n", encoding="utf-8")
+    changed = csv_sniffer.sniff_csv_cached(str(p), "utf-8", EXPECTED_COLUMNS)
+    assert changed["sep"] == ","
+    assert len(calls) == 2
@@ -1,4 +1,12 @@
+import asyncio
+import contextlib
 import csv
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
 
 import csv_to_db as c2d
 
@@ -16,7 +24,7 @@ def test_normalize_csv_basic_cleaning(tmp_path, monkeypatch):
     outp = tmp_path / "out.csv"
     inp.write_text(content, encoding="utf-8")
 
-    monkeypatch.setattr(c2d, "detect_encoding", lambda p: "utf-8")
+    monkeypatch.setattr(c2d, "detect_encoding", lambda p, **kwargs: "utf-8")
     rows = c2d.normalize_csv(str(inp), str(outp))
 
     assert rows == 2
@@ -49,7 +57,7 @@ def test_normalize_csv_header_only(tmp_path, monkeypatch):
     output = tmp_path / "out.csv"
     content = "court_name;case_number;registration_date\n"
     inp.write_text(content, encoding="utf-8")
-    monkeypatch.setattr(c2d, "detect_encoding", lambda p: "utf-8")
+    monkeypatch.setattr(c2d, "detect_encoding", lambda p, **kwargs: "utf-8")
     rows = c2d.normalize_csv(str(inp), str(output))
     assert rows == 0
     assert output.read_text(encoding="utf-8").strip() == ""
@@ -60,7 +68,7 @@ def test_normalize_csv_null_case_number(tmp_path, monkeypatch):
     outp = tmp_path / "out.csv"
     content = "court_name;case_number;registration_date\n" "Court A; ;01.01.2020\n"
     inp.write_text(content, encoding="utf-8")
-    monkeypatch.setattr(c2d, "detect_encoding", lambda p: "utf-8")
+    monkeypatch.setattr(c2d, "detect_encoding", lambda p, **kwargs: "utf-8")
     rows = c2d.normalize_csv(str(inp), str(outp))
     assert rows == 0
     assert outp.read_text(encoding="utf-8").strip() == ""
@@ -75,7 +83,7 @@ def test_normalize_csv_strips_numero_prefix(tmp_path, monkeypatch):
         "Court B;№ 456\n"
     )
     inp.write_text(content, encoding="utf-8")
-    monkeypatch.setattr(c2d, "detect_encoding", lambda p: "utf-8")
+    monkeypatch.setattr(c2d, "detect_encoding", lambda p, **kwargs: "utf-8")
 
     rows = c2d.normalize_csv(str(inp), str(outp))
     assert rows == 2
@@ -86,3 +94,299 @@ def test_normalize_csv_strips_numero_prefix(tmp_path, monkeypatch):
 
     assert out_rows[0][1] == "123"
     assert out_rows[1][1] == "456"
+
+
+def test_normalize_csv_streaming_matches_full_read(tmp_path, monkeypatch):
+    lines = ["court_name;case_number;stage_date"]
+    for i in range(50):
+        lines.append(f"Court {i % 3};N-{i % 20};0{1 + i % 9}.01.2020")
+    inp = tmp_path / "in.csv"
+    inp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    monkeypatch.setattr(c2d, "detect_encoding", lambda p, **kwargs: "utf-8")
+
+    full = tmp_path / "full.csv"
+    streamed = tmp_path / "streamed.csv"
+    full_rows = c2d.normalize_csv(str(inp), str(full))
+    streamed_rows = c2d.normalize_csv(str(inp), str(streamed), chunk_size=7)
+
+    assert full_rows == streamed_rows == 20
+    assert full.read_text(encoding="utf-8") == streamed.read_text(encoding="utf-8")
+
+
+def test_iter_normalized_chunks_respects_memory_ceiling(tmp_path, monkeypatch):
+    lines = ["court_name;case_number;description"]
+    for i in range(3000):
+        lines.append(f"Court;N-{i};{'x' * 200}")
+    inp = tmp_path / "in.csv"
+    inp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    monkeypatch.setattr(c2d, "detect_encoding", lambda p, **kwargs: "utf-8")
+
+    ceiling = 64 * 1024
+    sizes = []
+    for raw in c2d._iter_raw_chunks(str(inp), 10_000, ceiling):
+        sizes.append(len(raw))
+        if len(sizes) > 1:
+            assert raw.memory_usage(deep=True).sum() <= ceiling * 1.1
+
+    assert sum(sizes) == 3000
+    assert max(sizes[1:]) < 10_000
+    chunks = list(c2d.iter_normalized_chunks(str(inp), 10_000, ceiling))
+    assert sum(len(c) for c in chunks) == 3000
+
+
+def test_normalize_csv_headerless_comma_file(tmp_path, monkeypatch):
+    inp = tmp_path / "in.csv"
+    outp = tmp_path / "out.csv"
+    row = ["Court A", "77", "", "01.02.2020"] + [""] * 9
+    inp.write_text(",".join(row) + "\n", encoding="utf-8")
+    monkeypatch.setattr(c2d, "detect_encoding", lambda p, **kwargs: "utf-8")
+
+    assert c2d.normalize_csv(str(inp), str(outp)) == 1
+    with outp.open("r", encoding="utf-8", newline="") as f:
+        out_rows = list(csv.reader(f))
+    assert out_rows[0][:4] == ["Court A", "77", "", "2020-02-01"]
+
+
+def test_normalize_csv_pyarrow_matches_c_engine(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    import csv_sniffer
+
+    content = (
+        "court_name;case_number;stage_date;description\n"
+        'Court A;0123;01.02.2020;"multi\nline"\n'
+        "Court B;456;;\n"
+        "Court C;789\n"
+    )
+    monkeypatch.setattr(c2d, "detect_encoding", lambda p, **kwargs: "utf-8")
+    outputs = []
+    for has_pyarrow in (True, False):
+        work = tmp_path / str(has_pyarrow)
+        work.mkdir()
+        inp = work / "in.csv"
+        inp.write_text(content, encoding="utf-8")
+        monkeypatch.setattr(csv_sniffer, "HAS_PYARROW", has_pyarrow)
+        c2d.normalize_csv(str(inp), str(work / "out.csv"))
+        outputs.append((work / "out.csv").read_text(encoding="utf-8"))
+
+    assert outputs[0] == outputs[1]
+    assert outputs[0].startswith("Court A,0123,")
+
+
+def test_pyarrow_reader_nulls_pandas_na_markers(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    import csv_sniffer
+
+    content = (
+        "court_name;case_number;stage_date;description\n"
+        "Court A;321;NULL;N/A\n"
+        "Court B;#N/A;01.02.2020;nan\n"
+        "Court C;654;<NA>;text\n"
+    )
+    monkeypatch.setattr(c2d, "detect_encoding", lambda p, **kwargs: "utf-8")
+    monkeypatch.setattr(csv_sniffer, "HAS_PYARROW", True)
+    inp = tmp_path / "in.csv"
+    inp.write_text(content, encoding="utf-8")
+    with contextlib.ExitStack() as stack:
+        dialect = csv_sniffer.sniff_csv(str(inp), "utf-8", c2d.EXPECTED_COLUMNS)
+        arrow = c2d._read_csv_pyarrow(str(inp), "utf-8", dialect, stack)
+    c_engine = pd.read_csv(inp, sep=";", dtype=str)
+
+    assert arrow is not None
+    assert arrow.isna().equals(c_engine.isna())
+    assert arrow.fillna("").equals(c_engine.fillna(""))
+
+
+def test_iter_copy_chunks_streams_normalized_csv(tmp_path, monkeypatch):
+    lines = ["court_name;case_number;stage_date"]
+    lines += [f"Court;N-{i % 40};01.01.2020" for i in range(100)]
+    inp = tmp_path / "in.csv"
+    inp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    monkeypatch.setattr(c2d, "detect_encoding", lambda p, **kwargs: "utf-8")
+
+    async def collect():
+        stats = {}
+        chunks = [
+            c
+            async for _, c in c2d._iter_copy_chunks(
+                [str(inp)], stats, chunk_size=9, queue_size=1
+            )
+        ]
+        return stats, chunks
+
+    stats, chunks = asyncio.run(collect())
+    expected = tmp_path / "expected.csv"
+    c2d.normalize_csv(str(inp), str(expected))
+
+    assert len(chunks) > 1
+    assert b"".join(chunks) == expected.read_bytes()
+    assert stats["rows"] == 40
+    assert stats["bytes"] == len(expected.read_bytes())
+
+
+def test_iter_copy_chunks_stops_producer_on_early_close(tmp_path, monkeypatch):
+    lines = ["court_name;case_number"] + [f"Court;N-{i}" for i in range(500)]
+    inp = tmp_path / "in.csv"
+    inp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    monkeypatch.setattr(c2d, "detect_encoding", lambda p, **kwargs: "utf-8")
+
+    async def take_one():
+        source = c2d._iter_copy_chunks([str(inp)], {}, chunk_size=5, queue_size=1)
+        _, first = await source.__anext__()
+        await asyncio.wait_for(source.aclose(), timeout=5)
+        return first
+
+    assert asyncio.run(take_one()).startswith(b"Court,N-0,")
+
+
+def test_iter_copy_chunks_process_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(c2d, "detect_encoding", lambda p, **kwargs: "utf-8")
+    paths = []
+    for f in range(3):
+        lines = ["court_name;case_number"] + [f"Court;F{f}-{i}" for i in range(30)]
+        inp = tmp_path / f"in{f}.csv"
+        inp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        paths.append(str(inp))
+
+    async def collect():
+        stats = {}
+        chunks = [
+            c
+            async for _, c in c2d._iter_copy_chunks(
+                paths, stats, workers=2, chunk_size=7, queue_size=2
+            )
+        ]
+        return stats, chunks
+
+    stats, chunks = asyncio.run(collect())
+    lines = b"".join(chunks).decode("utf-8").splitlines()
+    assert len(lines) == 90
+    assert {line.split(",")[1] for line in lines} == {
+        f"F{f}-{i}" for f in range(3) for i in range(30)
+    }
+    assert stats["rows"] == 90
+    assert stats["files"] == {p: 30 for p in paths}
+
+
+def test_worker_cache_entries_are_saved_once_by_the_parent(tmp_path):
+    import csv_sniffer
+    import detect_encoding
+
+    paths = []
+    for f in range(4):
+        lines = ["court_name;case_number"] + [f"Court;W{f}-{i}" for i in range(20)]
+        inp = tmp_path / f"in{f}.csv"
+        inp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        paths.append(str(inp))
+
+    async def drain():
+        return [c async for c in c2d._iter_copy_chunks(paths, {}, workers=2)]
+
+    asyncio.run(drain())
+
+    # Workers no longer save their own copies, so none overwrites another's.
+    names = {f"in{f}.csv" for f in range(4)}
+    encodings = c2d.load_json(str(tmp_path / detect_encoding.CACHE_FILE))
+    dialects = c2d.load_json(str(tmp_path / csv_sniffer.CACHE_FILE))
+    assert set(encodings) == names
+    assert set(dialects) == names
+    assert all(entry["dialect"]["sep"] == ";" for entry in dialects.values())
+
+
+def test_iter_copy_chunks_reports_worker_failure(tmp_path):
+    missing = str(tmp_path / "missing.csv")
+
+    async def collect():
+        return [c async for c in c2d._iter_copy_chunks([missing], {}, workers=1)]
+
+    with pytest.raises(RuntimeError, match="missing.csv"):
+        asyncio.run(collect())
+
+
+def test_plan_imports_skips_unchanged_files(tmp_path):
+    same = tmp_path / "same.csv"
+    touched = tmp_path / "touched.csv"
+    changed = tmp_path / "changed.csv"
+    new = tmp_path / "new.csv"
+    for p in (same, touched, changed, new):
+        p.write_text("court_name;case_number\nA;1\n", encoding="utf-8")
+
+    manifest = {}
+    stats = {
+        "files": {str(p): 1 for p in (same, touched, changed)},
+        "hashes": {str(p): c2d.source_digest(str(p)) for p in (same, touched, changed)},
+    }
+    c2d._record_imports(manifest, stats)
+
+    os.utime(touched, ns=(0, 1_000_000_000))
+    changed.write_text("court_name;case_number\nB;2\n", encoding="utf-8")
+    os.utime(changed, ns=(0, 2_000_000_000))
+
+    paths = [str(p) for p in (same, touched, changed, new)]
+    to_import, refreshed = c2d._plan_imports(paths, manifest, force=False)
+    assert to_import == [str(changed), str(new)]
+    assert refreshed["touched.csv"]["mtime_ns"] == 1_000_000_000
+
+    to_import, _ = c2d._plan_imports(paths, manifest, force=True)
+    assert to_import == paths
+
+
+def test_plan_stream_imports_a_rewritten_source(tmp_path):
+    path = tmp_path / "p.csv"
+    path.write_text("court_name;case_number\nA;1\n", encoding="utf-8")
+    manifest = {}
+    c2d._record_imports(
+        manifest,
+        {"files": {str(path): 1}, "hashes": {str(path): c2d.source_digest(str(path))}},
+    )
+
+    async def sources():
+        yield str(path)
+        yield str(path)
+        # Re-extracted from a changed archive under the same name.
+        path.write_text("court_name;case_number\nB;2\n", encoding="utf-8")
+        os.utime(path, ns=(0, 3_000_000_000))
+        yield str(path)
+
+    async def plan():
+        return [p async for p in c2d._plan_stream(sources(), manifest, False, [])]
+
+    assert asyncio.run(plan()) == [str(path)]
+
+
+def test_iter_normalized_chunks_reads_zip_member(tmp_path):
+    content = "court_name;case_number;stage_date\n" + "".join(
+        f"Київський районний суд;№ {i};01.02.2020\n" for i in range(200)
+    )
+    archive = tmp_path / "data.zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("nested/cases.csv", content.encode("cp1251"))
+        zf.writestr("readme.txt", "skip me")
+
+    plain = tmp_path / "cases.csv"
+    plain.write_bytes(content.encode("cp1251"))
+
+    sources = c2d.list_csv_members(str(archive))
+    assert sources == [f"{archive}::nested/cases.csv"]
+    for chunk_size in (None, 50):
+        from_zip = pd.concat(c2d.iter_normalized_chunks(sources[0], chunk_size))
+        from_disk = pd.concat(c2d.iter_normalized_chunks(str(plain), chunk_size))
+        assert from_zip.values.tolist() == from_disk.values.tolist()
+        assert len(from_zip) == 200
+        assert from_zip["court_name"].iloc[0] == "Київський районний суд"
+
+
+def test_seen_case_numbers_match_a_set_across_chunks():
+    rng = np.random.default_rng(0)
+    seen = c2d._SeenCaseNumbers()
+    expected = set()
+    for _ in range(40):
+        hashes = np.unique(rng.integers(0, 5000, size=300, dtype=np.uint64))
+        known = seen.contains(hashes)
+        assert known.tolist() == [int(h) in expected for h in hashes]
+        fresh = hashes[~known]
+        seen.add(fresh)
+        expected.update(int(h) for h in fresh)
+
+    assert len(seen) == len(expected)
+    # Runs stay few: merged like a binary counter.
+    assert len(seen._runs) <= 12
@@ -1,3 +1,4 @@
+import codecs
 from typing import Optional
 
 import detect_encoding
@@ -22,15 +23,81 @@ def test_detect_encoding_happy_path(tmp_path, monkeypatch):
     monkeypatch.setattr(
         detect_encoding, "from_path", lambda p: DummyFromPathResult("cp1251")
     )
-    assert detect_encoding.detect_encoding(str(tmp)) == "cp1251"
+    assert detect_encoding.detect_encoding(str(tmp), sample_size=None) == "cp1251"
 
 
 def test_detect_encoding_fallback_on_exception(tmp_path, monkeypatch):
     tmp = tmp_path / "file.txt"
-    tmp.write_bytes(b"abc")
+    # Not valid UTF-8, so both paths have to ask charset_normalizer.
+    tmp.write_bytes("Тест".encode("cp1251"))
 
     def boom(_):
         raise RuntimeError("fail")
 
+    monkeypatch.setattr(detect_encoding, "from_bytes", boom)
     monkeypatch.setattr(detect_encoding, "from_path", boom)
     assert detect_encoding.detect_encoding(str(tmp)) == "utf-8"
+    assert detect_encoding.detect_encoding(str(tmp), sample_size=None) == "utf-8"
+    # A failed detection is not cached.
+    assert not (tmp_path / detect_encoding.CACHE_FILE).exists()
+
+
+def test_detect_encoding_bom_fast_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(detect_encoding, "from_bytes", None)
+    tmp = tmp_path / "bom.csv"
+    tmp.write_bytes(codecs.BOM_UTF8 + "суд;справа\n".encode("utf-8"))
+    assert detect_encoding.detect_encoding(str(tmp)) == "utf-8-sig"
+    tmp16 = tmp_path / "bom16.csv"
+    tmp16.write_bytes("суд;справа\n".encode("utf-16"))
+    assert detect_encoding.detect_encoding(str(tmp16)) == "utf-16"
+
+
+def test_detect_encoding_valid_utf8_sampled(tmp_path, monkeypatch):
+    monkeypatch.setattr(detect_encoding, "from_bytes", None)
+    tmp = tmp_path / "big.csv"
+    # 3-byte characters so the middle and tail samples start mid-character
+    tmp.write_bytes("€суд;справа\n".encode("utf-8") * 5000)
+    assert detect_encoding.detect_encoding(str(tmp), sample_size=1000) == "utf-8"
+
+
+def test_detect_encoding_sampled_cp1251(tmp_path):
+    tmp = tmp_path / "cp.csv"
+    line = "Київський районний суд міста Полтави;справа про адміністративне правопорушення\n"
+    tmp.write_bytes(line.encode("cp1251") * 5000)
+    assert detect_encoding.detect_encoding(str(tmp), sample_size=16 * 1024) == "cp1251"
+
+
+def test_detect_encoding_reads_bounded_sample(tmp_path, monkeypatch):
+    tmp = tmp_path / "big.csv"
+    tmp.write_bytes(b"a;b\n" * 100_000)
+    reads = []
+    real_read_samples = detect_encoding._read_samples
+
+    def tracking_read_samples(path, sample_size):
+        samples = real_read_samples(path, sample_size)
+        reads.append(sum(len(s) for s in samples))
+        return samples
+
+    monkeypatch.setattr(detect_encoding, "_read_samples", tracking_read_samples)
+    detect_encoding.detect_encoding(str(tmp), sample_size=3000)
+    assert reads == [3000]
+
+
+def test_detect_encoding_uses_persistent_cache(tmp_path, monkeypatch):
+    tmp = tmp_path / "file.csv"
+    tmp.write_bytes("Тест".encode("cp1251"))
+    calls = []
+
+    def fake_detect(path, sample_size):
+        calls.append(path)
+        return "cp1251"
+
+    monkeypatch.setattr(detect_encoding, "_detect_sampled", fake_detect)
+    assert detect_encoding.detect_encoding(str(tmp)) == "cp1251"
+    assert detect_encoding.detect_encoding(str(tmp)) == "cp1251"
+    assert len(calls) == 1
+    assert (tmp_path / detect_encoding.CACHE_FILE).exists()
+
+    tmp.write_bytes("Інший тест".encode("cp1251"))
+    detect_encoding.detect_encoding(str(tmp))
+    assert len(calls) == 2
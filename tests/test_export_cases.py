@@ -2,6 +2,8 @@ import asyncio
 import csv
 import importlib.util
 import os
+import threading
+import time
 
 import pytest
 
@@ -148,3 +150,313 @@ def test_export_cases_end_to_end(tmp_path, monkeypatch, get_database_dsn):
         rows = list(csv.DictReader(f))
     got_nums = [r["case_number"] for r in rows]
     assert got_nums == ["X-1", "Y-2"]
+
+
+def _fetch_cases_sync(dsn: str, case_numbers: list[str]) -> list[dict]:
+    # The old buffered export: one query, all rows in memory.
+    import asyncpg
+
+    async def _run():
+        conn = await asyncpg.connect(dsn)
+        try:
+            rows = await conn.fetch(
+                ec.SELECT_CASES_SQL.format(columns=", ".join(ec.COLUMNS)),
+                case_numbers,
+            )
+            return [dict(r) for r in rows]
+        finally:
+            await conn.close()
+
+    return asyncio.run(_run())
+
+
+def test_streaming_export_matches_buffered_export(
+    tmp_path, monkeypatch, get_database_dsn
+):
+    _ensure_schema_sync(get_database_dsn)
+    _insert_rows_sync(
+        get_database_dsn,
+        [
+            ("Court", f"S-{n}", None, None, None, None, None, None, f"Stage {n}")
+            + (None,) * 4
+            for n in range(25)
+        ],
+    )
+
+    input_csv = tmp_path / "cases.csv"
+    input_csv.write_text(
+        "case_number\n" + "\n".join(f"S-{n}" for n in range(30)) + "\n",
+        encoding="utf-8",
+    )
+    streamed_csv = tmp_path / "streamed.csv"
+    buffered_csv = tmp_path / "buffered.csv"
+    monkeypatch.setenv("DATABASE_URL_SYNC", get_database_dsn)
+
+    # A prefetch smaller than the result forces several cursor round trips.
+    count = asyncio.run(ec.export_cases(str(input_csv), str(streamed_csv), prefetch=4))
+    rows = _fetch_cases_sync(get_database_dsn, ec._read_case_numbers(str(input_csv)))
+    with open(buffered_csv, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=ec.COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    assert count == 25
+    assert streamed_csv.read_text(encoding="utf-8") == buffered_csv.read_text(
+        encoding="utf-8"
+    )
+
+
+def test_lookup_table_export_matches_array_export(
+    tmp_path, monkeypatch, get_database_dsn
+):
+    _ensure_schema_sync(get_database_dsn)
+    _insert_rows_sync(
+        get_database_dsn,
+        [
+            ("Court", f"L-{n}", None, None, None, None, None, None, f"Stage {n}")
+            + (None,) * 4
+            for n in range(40)
+        ],
+    )
+
+    input_csv = tmp_path / "cases.csv"
+    numbers = [f"L-{n}" for n in range(50)] + ["L-1", "L-2"]
+    input_csv.write_text("number\n" + "\n".join(numbers) + "\n", encoding="utf-8")
+    monkeypatch.setenv("DATABASE_URL_SYNC", get_database_dsn)
+
+    def _export(name):
+        out = tmp_path / name
+        count = asyncio.run(ec.export_cases(str(input_csv), str(out)))
+        with open(out, "r", encoding="utf-8", newline="") as f:
+            rows = sorted(r["case_number"] for r in csv.DictReader(f))
+        return count, rows
+
+    array_result = _export("array.csv")
+    monkeypatch.setattr(ec, "LOOKUP_TABLE_THRESHOLD", 5)
+    table_result = _export("table.csv")
+
+    assert table_result == array_result
+    assert table_result[0] == 40
+
+
+def test_iter_case_numbers_streams_without_dedup(tmp_path):
+    p = tmp_path / "nums.csv"
+    p.write_text("case_no\nA-1\nA-1\n\n B-2\n", encoding="utf-8")
+    assert list(ec._iter_case_numbers(str(p), dedup=False)) == ["A-1", "A-1", "B-2"]
+    assert list(ec._iter_case_numbers(str(p))) == ["A-1", "B-2"]
+
+
+def test_export_reports_progress_and_preview(tmp_path, monkeypatch, get_database_dsn):
+    _ensure_schema_sync(get_database_dsn)
+    _insert_rows_sync(
+        get_database_dsn,
+        [
+            ("Court", f"P-{n}", None, None, None, None, None, None, None) + (None,) * 4
+            for n in range(12)
+        ],
+    )
+    input_csv = tmp_path / "cases.csv"
+    input_csv.write_text("\n".join(f"P-{n}" for n in range(12)), encoding="utf-8")
+    monkeypatch.setenv("DATABASE_URL_SYNC", get_database_dsn)
+    monkeypatch.setattr(ec, "PROGRESS_EVERY", 5)
+    monkeypatch.setattr(ec, "PREVIEW_ROWS", 3)
+
+    progress, previews = [], []
+    count = asyncio.run(
+        ec.export_cases(
+            str(input_csv),
+            str(tmp_path / "out.csv"),
+            on_progress=progress.append,
+            on_preview=previews.append,
+        )
+    )
+
+    assert count == 12
+    assert progress == [5, 10, 12]
+    assert len(previews) == 1 and len(previews[0]) == 3
+    assert previews[0][0][:2] == ("Court", "P-0")
+
+
+def test_cancelled_export_removes_partial_file(tmp_path, monkeypatch, get_database_dsn):
+    _ensure_schema_sync(get_database_dsn)
+    _insert_rows_sync(
+        get_database_dsn,
+        [
+            ("Court", f"C-{n}", None, None, None, None, None, None, None) + (None,) * 4
+            for n in range(10)
+        ],
+    )
+    input_csv = tmp_path / "cases.csv"
+    input_csv.write_text("\n".join(f"C-{n}" for n in range(10)), encoding="utf-8")
+    output_csv = tmp_path / "out.csv"
+    monkeypatch.setenv("DATABASE_URL_SYNC", get_database_dsn)
+    monkeypatch.setattr(ec, "PROGRESS_EVERY", 2)
+
+    cancel = threading.Event()
+    with pytest.raises(ec.ExportCancelled):
+        asyncio.run(
+            ec.export_cases(
+                str(input_csv),
+                str(output_csv),
+                on_progress=lambda count: cancel.set(),
+                cancel=cancel,
+            )
+        )
+    assert not output_csv.exists()
+
+
+def test_cancel_interrupts_a_query_without_rows(
+    tmp_path, monkeypatch, get_database_dsn
+):
+    async def slow_lookup(conn, numbers, prefetch, columns):
+        # Stands in for a long lookup COPY or a query that matches nothing.
+        await conn.execute("SELECT pg_sleep(30)")
+        return
+        yield
+
+    monkeypatch.setattr(ec, "_iter_cases", slow_lookup)
+    output_csv = tmp_path / "out.csv"
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+
+    started = time.monotonic()
+    with pytest.raises(ec.ExportCancelled):
+        asyncio.run(
+            ec._stream_export(get_database_dsn, str(output_csv), ["A-1"], cancel=cancel)
+        )
+    assert time.monotonic() - started < 10
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_export_leaves_no_partial_file(tmp_path):
+    output_csv = tmp_path / "out.csv"
+    output_csv.write_text("previous export\n", encoding="utf-8")
+
+    with pytest.raises(OSError):
+        asyncio.run(
+            ec._stream_export(
+                "postgresql://postgres@127.0.0.1:1/postgres", str(output_csv), ["A-1"]
+            )
+        )
+
+    assert output_csv.read_text(encoding="utf-8") == "previous export\n"
+    assert list(tmp_path.iterdir()) == [output_csv]
+
+
+def _set_data_version_sync(dsn: str, version: int):
+    import asyncpg
+
+    async def _run():
+        conn = await asyncpg.connect(dsn)
+        try:
+            await conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS data_version (
+                    id integer PRIMARY KEY,
+                    version bigint NOT NULL,
+                    updated_at timestamptz NOT NULL DEFAULT now()
+                );
+                """
+            )
+            await conn.execute(
+                "INSERT INTO data_version (id, version) VALUES (1, $1) "
+                "ON CONFLICT (id) DO UPDATE SET version = EXCLUDED.version",
+                version,
+            )
+        finally:
+            await conn.close()
+
+    asyncio.run(_run())
+
+
+def test_cached_export_serves_repeats_locally(tmp_path, monkeypatch, get_database_dsn):
+    _ensure_schema_sync(get_database_dsn)
+    _set_data_version_sync(get_database_dsn, 1)
+    _insert_rows_sync(
+        get_database_dsn,
+        [
+            ("Court", f"K-{n}", None, None, None, None, None, None, f"Stage {n}")
+            + (None,) * 4
+            for n in range(5)
+        ],
+    )
+    input_csv = tmp_path / "cases.csv"
+    input_csv.write_text("K-0\nK-1\nK-2\nK-9\nK-1\n", encoding="utf-8")
+    monkeypatch.setenv("DATABASE_URL_SYNC", get_database_dsn)
+    monkeypatch.setenv("EXPORT_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+
+    def _export(name):
+        out = tmp_path / name
+        count = asyncio.run(ec.export_cases(str(input_csv), str(out)))
+        with open(out, "r", encoding="utf-8", newline="") as f:
+            return count, sorted(
+                (r["case_number"], r["stage_name"]) for r in csv.DictReader(f)
+            )
+
+    first = _export("first.csv")
+    assert first == (3, [("K-0", "Stage 0"), ("K-1", "Stage 1"), ("K-2", "Stage 2")])
+
+    queried = []
+    original = ec._iter_cases
+
+    def _spy(conn, case_numbers, prefetch=ec.EXPORT_PREFETCH):
+        numbers = list(case_numbers)
+        queried.append(numbers)
+        return original(conn, numbers, prefetch)
+
+    monkeypatch.setattr(ec, "_iter_cases", _spy)
+    assert _export("second.csv") == first
+    assert queried == []
+
+    # A new data version invalidates everything cached under the old one.
+    _set_data_version_sync(get_database_dsn, 2)
+    assert _export("third.csv") == first
+    assert queried == [["K-0", "K-1", "K-2", "K-9"]]
+
+
+def test_case_cache_evicts_least_recently_used(tmp_path):
+    from case_cache import CaseCache
+
+    with CaseCache(str(tmp_path / "cache.sqlite"), max_rows=2) as cache:
+        cache.sync(1)
+        cache.put_many([("A", ["Court", "A"])])
+        cache.put_many([("B", None)])
+        cache.get_many(["A"])
+        cache.put_many([("C", ["Court", "C"])])
+        assert cache.get_many(["A", "B", "C"]) == {
+            "A": ["Court", "A"],
+            "C": ["Court", "C"],
+        }
+        assert cache.sync(2) is True
+        assert cache.get_many(["A", "C"]) == {}
+
+
+def test_export_projects_columns_into_parquet(tmp_path, monkeypatch, get_database_dsn):
+    pq = pytest.importorskip("pyarrow.parquet")
+    _ensure_schema_sync(get_database_dsn)
+    _insert_rows_sync(
+        get_database_dsn,
+        [
+            ("Court", f"Q-{n}", None, None, None, None, "many", None, None)
+            + (None, None, None, "long text")
+            for n in range(3)
+        ],
+    )
+    input_csv = tmp_path / "cases.csv"
+    input_csv.write_text("Q-0\nQ-1\nQ-2\n", encoding="utf-8")
+    output = tmp_path / "out.parquet"
+    monkeypatch.setenv("DATABASE_URL_SYNC", get_database_dsn)
+
+    count = asyncio.run(
+        ec.export_cases(
+            str(input_csv), str(output), columns=["case_number", "stage_date"]
+        )
+    )
+
+    table = pq.read_table(str(output))
+    assert count == 3
+    assert table.column_names == ["case_number", "stage_date"]
+    assert sorted(table.column("case_number").to_pylist()) == ["Q-0", "Q-1", "Q-2"]
+
+    with pytest.raises(ValueError):
+        asyncio.run(ec.export_cases(str(input_csv), str(output), columns=["nope"]))
@@ -0,0 +1,79 @@
+import csv
+import gzip
+import io
+from datetime import date
+
+import pytest
+
+from export_writers import ThreadedWriter, detect_format, open_writer
+
+COLUMNS = ["case_number", "stage_date", "description"]
+ROWS = [
+    ("A-1", date(2024, 1, 2), "first"),
+    ("A-2", None, None),
+    ("A-3", "2024-03-04", "from cache"),
+]
+
+
+def test_detect_format_prefers_longest_suffix():
+    assert detect_format("out.CSV.GZ") == "csv.gz"
+    assert detect_format("out.csv.zst") == "csv.zst"
+    assert detect_format("out.parquet") == "parquet"
+    assert detect_format("out.feather") == "arrow"
+    assert detect_format("out.txt") == "csv"
+
+
+def _write(path, fmt=None):
+    writer = ThreadedWriter(open_writer(str(path), COLUMNS, fmt), queue_size=1)
+    writer.put(ROWS[:2])
+    writer.put(ROWS[2:])
+    writer.close()
+
+
+def test_compressed_csv_round_trip(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+
+    _write(tmp_path / "out.csv.gz")
+    with gzip.open(tmp_path / "out.csv.gz", "rt", encoding="utf-8", newline="") as f:
+        gz_rows = list(csv.reader(f))
+
+    _write(tmp_path / "out.csv.zst")
+    with pa.CompressedInputStream(str(tmp_path / "out.csv.zst"), "zstd") as raw:
+        text = raw.read().decode("utf-8")
+    zst_rows = list(csv.reader(io.StringIO(text, newline="")))
+
+    expected = [COLUMNS, ["A-1", "2024-01-02", "first"], ["A-2", "", ""]]
+    expected.append(["A-3", "2024-03-04", "from cache"])
+    assert gz_rows == expected
+    assert zst_rows == expected
+
+
+@pytest.mark.parametrize("name", ["out.parquet", "out.arrow"])
+def test_columnar_round_trip(tmp_path, name):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    _write(tmp_path / name)
+    path = str(tmp_path / name)
+    table = (
+        pq.read_table(path) if name.endswith("parquet") else feather.read_table(path)
+    )
+
+    assert table.schema.field("stage_date").type == pa.date32()
+    assert table.to_pylist() == [
+        {"case_number": "A-1", "stage_date": date(2024, 1, 2), "description": "first"},
+        {"case_number": "A-2", "stage_date": None, "description": None},
+        {
+            "case_number": "A-3",
+            "stage_date": date(2024, 3, 4),
+            "description": "from cache",
+        },
+    ]
+
+
+def test_writer_errors_surface_on_close(tmp_path):
+    writer = ThreadedWriter(open_writer(str(tmp_path / "out.csv"), COLUMNS))
+    writer.put([object()])  # not a row: csv.writer rejects it in the thread
+    with pytest.raises(csv.Error):
+        writer.close()
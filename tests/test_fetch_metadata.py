@@ -49,4 +49,67 @@ def test_extract_resources_basic():
         "description": "desc",
         "format": "CSV",
         "url": "http://example/a.csv",
+        "id": None,
+        "last_modified": None,
+        "size": None,
+        "hash": None,
+        "metadata_modified": None,
     }
+
+
+def test_extract_resources_keeps_ckan_change_fields():
+    metadata = {
+        "resources": [
+            {
+                "id": "r-1",
+                "name": "A",
+                "format": "ZIP",
+                "url": "http://example/a.zip",
+                "last_modified": "2025-01-02T03:04:05",
+                "size": 1024,
+                "hash": "md5:abc",
+                "metadata_modified": "2025-01-02T03:04:06",
+            }
+        ]
+    }
+    (res,) = fm.extract_resources(metadata)
+    assert res["id"] == "r-1"
+    assert res["size"] == 1024
+    assert res["hash"] == "md5:abc"
+    assert res["last_modified"] == "2025-01-02T03:04:05"
+
+
+def test_fetch_dataset_metadata_cached_within_ttl(tmp_path, monkeypatch):
+    calls = []
+    body = {"success": True, "result": {"resources": [{"name": "r1"}]}}
+
+    def fake_get(**kw):
+        calls.append(kw["url"])
+        return DummyResponse(200, body)
+
+    monkeypatch.setattr(fm.requests, "get", fake_get)
+    cache_path = str(tmp_path / "metadata.json")
+
+    assert fm.fetch_dataset_metadata("abc", cache_path) == body["result"]
+    assert fm.fetch_dataset_metadata("abc", cache_path) == body["result"]
+    assert len(calls) == 1
+
+    fm.fetch_dataset_metadata("abc", cache_path, ttl=0)
+    assert len(calls) == 2
+
+
+def test_diff_resources_plans_delta():
+    old = {"id": "a", "url": "u/a", "hash": "1", "size": 1}
+    snapshot = {"a": old, "b": {"id": "b", "url": "u/b"}, "gone": {"id": "gone"}}
+    resources = [
+        dict(old),
+        {"id": "b", "url": "u/b", "last_modified": "2025-02-01"},
+        {"id": "c", "url": "u/c"},
+    ]
+
+    plan = fm.diff_resources(snapshot, resources)
+
+    assert [r["id"] for r in plan["unchanged"]] == ["a"]
+    assert [r["id"] for r in plan["changed"]] == ["b"]
+    assert [r["id"] for r in plan["new"]] == ["c"]
+    assert [r["id"] for r in plan["removed"]] == ["gone"]
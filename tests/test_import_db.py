@@ -1,6 +1,8 @@
 import asyncio
 import importlib.util
 import os
+import threading
+import zipfile
 from typing import List
 
 import asyncpg
@@ -32,6 +34,11 @@ async def _ensure_schema(dsn: str):
                 type text NULL,
                 description text NULL
             );
+            CREATE TABLE IF NOT EXISTS data_version (
+                id integer PRIMARY KEY,
+                version bigint NOT NULL,
+                updated_at timestamptz NOT NULL DEFAULT now()
+            );
             """
         )
         await conn.execute("TRUNCATE TABLE cases;")
@@ -194,3 +201,263 @@ def test_copy_is_sequential_with_semaphore(tmp_path, monkeypatch, db_dsn):
     asyncio.run(csv_to_db.import_csv_files(str(tmp_path)))
 
     assert max_concurrent["value"] == 1
+
+
+def test_parallel_copy_uses_shared_staging_table(tmp_path, monkeypatch, db_dsn):
+    monkeypatch.setattr(csv_to_db, "DATABASE_URL", db_dsn)
+
+    for i in range(4):
+        _write_csv(
+            tmp_path / f"p{i}.csv",
+            [["court_name", "case_number", "stage_date"]]
+            + [["Court", f"P{i}-{n}", "01.01.2021"] for n in range(50)],
+        )
+
+    asyncio.run(
+        csv_to_db.import_csv_files(
+            str(tmp_path), chunk_size=10, workers=2, copy_connections=3
+        )
+    )
+
+    async def _fetch():
+        conn = await asyncpg.connect(db_dsn)
+        try:
+            count = await conn.fetchval("SELECT count(*) FROM cases")
+            leftovers = await conn.fetchval(
+                "SELECT count(*) FROM pg_tables WHERE tablename LIKE 'staging_cases_%'"
+            )
+            return count, leftovers
+        finally:
+            await conn.close()
+
+    count, leftovers = asyncio.run(_fetch())
+    assert count == 200
+    assert leftovers == 0
+
+
+def test_import_manifest_skips_already_loaded_files(tmp_path, monkeypatch, db_dsn):
+    monkeypatch.setattr(csv_to_db, "DATABASE_URL", db_dsn)
+    f1 = tmp_path / "a.csv"
+    _write_csv(f1, [["court_name", "case_number"], ["Court", "M-1"]])
+
+    asyncio.run(csv_to_db.import_csv_files(str(tmp_path), workers=0))
+    assert (tmp_path / csv_to_db.MANIFEST_FILE).exists()
+
+    copies = []
+    real_copy_worker = csv_to_db._copy_worker
+
+    async def counting_copy_worker(*args, **kwargs):
+        copies.append(args)
+        return await real_copy_worker(*args, **kwargs)
+
+    monkeypatch.setattr(csv_to_db, "_copy_worker", counting_copy_worker)
+
+    asyncio.run(csv_to_db.import_csv_files(str(tmp_path), workers=0))
+    assert copies == []
+
+    _write_csv(tmp_path / "b.csv", [["court_name", "case_number"], ["Court", "M-2"]])
+    asyncio.run(csv_to_db.import_csv_files(str(tmp_path), workers=0))
+    assert len(copies) == 1
+
+    asyncio.run(csv_to_db.import_csv_files(str(tmp_path), workers=0, force=True))
+    assert len(copies) == 2
+
+
+def test_import_straight_from_zip_members(tmp_path, monkeypatch, db_dsn):
+    monkeypatch.setattr(csv_to_db, "DATABASE_URL", db_dsn)
+    unpacked = tmp_path / "unpacked"
+    unpacked.mkdir()
+    archive = tmp_path / "cases.zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("a.csv", "court_name;case_number\nCourt;Z-1\n")
+        zf.writestr("b/b.csv", "court_name;case_number\nCourt;Z-2\n")
+
+    asyncio.run(
+        csv_to_db.import_csv_files(
+            str(unpacked), workers=1, archives=[str(archive)], delete_archives=True
+        )
+    )
+
+    async def _fetch():
+        conn = await asyncpg.connect(db_dsn)
+        try:
+            rows = await conn.fetch("SELECT case_number FROM cases ORDER BY 1")
+            return [r["case_number"] for r in rows]
+        finally:
+            await conn.close()
+
+    assert asyncio.run(_fetch()) == ["Z-1", "Z-2"]
+    assert not archive.exists()
+    assert list(unpacked.iterdir()) == [unpacked / csv_to_db.MANIFEST_FILE]
+
+
+async def _data_version(dsn: str) -> int:
+    conn = await asyncpg.connect(dsn)
+    try:
+        return await conn.fetchval("SELECT version FROM data_version WHERE id = 1") or 0
+    finally:
+        await conn.close()
+
+
+def test_partitioned_merge_matches_single_merge(tmp_path, monkeypatch, db_dsn):
+    monkeypatch.setattr(csv_to_db, "DATABASE_URL", db_dsn)
+
+    _write_csv(
+        tmp_path / "old.csv",
+        [["court_name", "case_number", "stage_date", "stage_name"]]
+        + [["Court", f"H-{n}", "01.01.2021", "Old"] for n in range(60)],
+    )
+    _write_csv(
+        tmp_path / "new.csv",
+        [["court_name", "case_number", "stage_date", "stage_name"]]
+        + [["Court", f"H-{n}", "02.01.2021", "New"] for n in range(0, 60, 2)],
+    )
+
+    version_before = asyncio.run(_data_version(db_dsn))
+    asyncio.run(
+        csv_to_db.import_csv_files(
+            str(tmp_path), workers=0, merge_partitions=4, merge_connections=2
+        )
+    )
+
+    async def _fetch():
+        conn = await asyncpg.connect(db_dsn)
+        try:
+            rows = await conn.fetch("SELECT case_number, stage_name FROM cases")
+            leftovers = await conn.fetchval(
+                "SELECT count(*) FROM pg_tables WHERE tablename LIKE 'staging_cases_%'"
+            )
+            return {r["case_number"]: r["stage_name"] for r in rows}, leftovers
+        finally:
+            await conn.close()
+
+    stages, leftovers = asyncio.run(_fetch())
+    # Bumped before the first slice and after the last one.
+    assert asyncio.run(_data_version(db_dsn)) == version_before + 2
+    assert len(stages) == 60
+    assert all(stages[f"H-{n}"] == ("New" if n % 2 == 0 else "Old") for n in range(60))
+    assert leftovers == 0
+
+
+def test_failed_slice_still_bumps_data_version(tmp_path, monkeypatch, db_dsn):
+    monkeypatch.setattr(csv_to_db, "DATABASE_URL", db_dsn)
+    merge_sql = csv_to_db.MERGE_SQL
+
+    class FailingSlice(str):
+        def format(self, staging):
+            if staging.endswith("_p1"):
+                return "SELECT 1 / 0"
+            return merge_sql.format(staging=staging)
+
+    monkeypatch.setattr(csv_to_db, "MERGE_SQL", FailingSlice(merge_sql))
+    _write_csv(
+        tmp_path / "f.csv",
+        [["court_name", "case_number"]] + [["Court", f"F-{n}"] for n in range(40)],
+    )
+
+    version_before = asyncio.run(_data_version(db_dsn))
+    with pytest.raises(ExceptionGroup):
+        asyncio.run(
+            csv_to_db.import_csv_files(
+                str(tmp_path), workers=0, merge_partitions=4, merge_connections=1
+            )
+        )
+
+    # Some slices did commit, so cached rows must not outlive this run.
+    assert asyncio.run(_data_version(db_dsn)) == version_before + 2
+
+
+def test_import_streamed_sources(tmp_path, monkeypatch, db_dsn):
+    monkeypatch.setattr(csv_to_db, "DATABASE_URL", db_dsn)
+    unpacked = tmp_path / "unpacked"
+    unpacked.mkdir()
+    _write_csv(unpacked / "a.csv", [["court_name", "case_number"], ["Court", "S-1"]])
+    archive = tmp_path / "later.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("b.csv", "court_name;case_number\nCourt;S-2\n")
+
+    first_done = threading.Event()
+    real_normalize = csv_to_db._normalize_into_queue
+
+    def normalize(path, *args):
+        real_normalize(path, *args)
+        first_done.set()
+
+    monkeypatch.setattr(csv_to_db, "_normalize_into_queue", normalize)
+
+    async def sources():
+        yield str(unpacked / "a.csv")
+        # The archive only "arrives" once the first file has gone through.
+        assert await asyncio.to_thread(first_done.wait, 10)
+        yield str(archive)
+
+    version_before = asyncio.run(_data_version(db_dsn))
+    asyncio.run(csv_to_db.import_csv_files(str(unpacked), workers=0, sources=sources()))
+
+    async def _fetch():
+        conn = await asyncpg.connect(db_dsn)
+        try:
+            rows = await conn.fetch("SELECT case_number FROM cases ORDER BY 1")
+            return [r["case_number"] for r in rows]
+        finally:
+            await conn.close()
+
+    assert asyncio.run(_fetch()) == ["S-1", "S-2"]
+    assert asyncio.run(_data_version(db_dsn)) == version_before + 1
+
+    # Nothing new on the second pass: no merge and no data_version bump.
+    asyncio.run(csv_to_db.import_csv_files(str(unpacked), workers=0, sources=sources()))
+    assert asyncio.run(_data_version(db_dsn)) == version_before + 1
+
+
+def test_import_records_metrics(tmp_path, monkeypatch, db_dsn):
+    from metrics import RunMetrics
+
+    monkeypatch.setattr(csv_to_db, "DATABASE_URL", db_dsn)
+    _write_csv(
+        tmp_path / "m.csv",
+        [
+            ["court_name", "case_number", "stage_name"],
+            ["Court", "M-1", "First"],
+            ["Court", "", "Blank"],
+            ["Court", "M-2", "First"],
+            ["Court", "M-1", "Second"],
+        ],
+    )
+
+    metrics = RunMetrics()
+    asyncio.run(csv_to_db.import_csv_files(str(tmp_path), workers=0, metrics=metrics))
+    report = metrics.report()
+
+    normalize = report["stages"]["normalize"]
+    assert normalize["rows_in"] == 4
+    assert normalize["rows_out"] == 2
+    assert normalize["rows_dropped"] == 2
+    assert normalize["bytes_in"] == (tmp_path / "m.csv").stat().st_size
+    assert report["files"]["normalize"]["m.csv"]["rows_dropped_blank"] == 1
+    assert report["stages"]["copy"]["rows_in"] == 2
+    assert report["stages"]["merge"]["rows_merged"] == 2
+
+
+def test_import_writes_profiles_when_enabled(tmp_path, monkeypatch, db_dsn):
+    import tracemalloc
+
+    import profiling
+
+    monkeypatch.setattr(csv_to_db, "DATABASE_URL", db_dsn)
+    monkeypatch.setenv(profiling.PROFILE_DIR_ENV, str(tmp_path / "profiles"))
+    unpacked = tmp_path / "unpacked"
+    unpacked.mkdir()
+    _write_csv(unpacked / "p.csv", [["court_name", "case_number"], ["Court", "PR-1"]])
+
+    try:
+        asyncio.run(csv_to_db.import_csv_files(str(unpacked), workers=0))
+    finally:
+        profiling.disable_profiling()
+        tracemalloc.stop()
+
+    names = {path.name for path in (tmp_path / "profiles").iterdir()}
+    assert f"cprofile-{os.getpid()}.prof" in names
+    for stage in ("normalize-p.csv", "copy-connection_1", "merge"):
+        assert f"{stage}.txt" in names
+        assert f"{stage}.tracemalloc" in names
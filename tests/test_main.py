@@ -0,0 +1,214 @@
+import asyncio
+import json
+import threading
+import zipfile
+
+import pytest
+
+import main
+from metrics import RunMetrics
+
+
+def test_pipeline_imports_while_downloads_continue(tmp_path, monkeypatch):
+    unpacked = tmp_path / "unpacked"
+    unpacked.mkdir()
+    (unpacked / "old.csv").write_text("court_name;case_number\n", encoding="utf-8")
+    archive = tmp_path / "first.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("a.csv", "court_name;case_number\nCourt;P-1\n")
+    single = tmp_path / "second.csv"
+    single.write_text("court_name;case_number\nCourt;P-2\n", encoding="utf-8")
+
+    imported = []
+    first_imported = threading.Event()
+
+    def downloads():
+        yield {"name": "first", "url": "u1", "path": str(archive), "status": "success"}
+        # The second download only finishes once the first file reached the import.
+        assert first_imported.wait(10)
+        yield {"name": "second", "url": "u2", "path": str(single), "status": "success"}
+        yield {"name": "broken", "url": "u3", "error": "boom", "status": "failed"}
+
+    async def fake_import(unpacked_dir, sources, **options):
+        async for source in sources:
+            imported.append(source)
+            if source.endswith("a.csv"):
+                first_imported.set()
+
+    monkeypatch.setattr(main, "import_csv_files", fake_import)
+
+    results = []
+    asyncio.run(main.run_pipeline(downloads(), str(unpacked), results))
+
+    # Leftovers from earlier runs are queued after this run's files.
+    assert imported == [
+        str(unpacked / "a.csv"),
+        str(unpacked / "second.csv"),
+        str(unpacked / "old.csv"),
+    ]
+    assert [r["status"] for r in results] == ["success", "success", "failed"]
+    assert not single.exists()
+
+
+def test_pipeline_queues_rewritten_leftover_once(tmp_path, monkeypatch):
+    unpacked = tmp_path / "unpacked"
+    unpacked.mkdir()
+    (unpacked / "a.csv").write_text("court_name;case_number\nOld;P-1\n")
+    archive = tmp_path / "cases.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("a.csv", "court_name;case_number\nNew;P-1\n")
+
+    def downloads():
+        yield {"name": "cases", "url": "u1", "path": str(archive), "status": "success"}
+
+    imported = []
+
+    async def fake_import(unpacked_dir, sources, **options):
+        async for source in sources:
+            imported.append((source, open(source).read()))
+
+    monkeypatch.setattr(main, "import_csv_files", fake_import)
+    asyncio.run(main.run_pipeline(downloads(), str(unpacked), []))
+
+    assert imported == [(str(unpacked / "a.csv"), "court_name;case_number\nNew;P-1\n")]
+
+
+def test_pipeline_unpacks_unchanged_archives(tmp_path, monkeypatch):
+    unpacked = tmp_path / "unpacked"
+    unpacked.mkdir()
+    archive = tmp_path / "cases.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("a.csv", "court_name;case_number\nCourt;P-1\n")
+
+    def downloads():
+        # Downloaded by a run that failed before unpacking it.
+        yield {
+            "name": "cases",
+            "url": "u1",
+            "path": str(archive),
+            "status": "not_modified",
+        }
+
+    imported = []
+
+    async def fake_import(unpacked_dir, sources, **options):
+        imported.extend([source async for source in sources])
+
+    monkeypatch.setattr(main, "import_csv_files", fake_import)
+    asyncio.run(main.run_pipeline(downloads(), str(unpacked), []))
+
+    assert imported == [str(unpacked / "a.csv")]
+
+
+def test_failed_import_stops_downloads(tmp_path, monkeypatch):
+    unpacked = tmp_path / "unpacked"
+    unpacked.mkdir()
+    stop = threading.Event()
+
+    def downloads():
+        # Stands in for a transfer that only ends when it is told to stop.
+        assert stop.wait(10)
+        return
+        yield
+
+    async def fake_import(unpacked_dir, sources, **options):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(main, "import_csv_files", fake_import)
+    with pytest.raises(ExceptionGroup):
+        asyncio.run(main.run_pipeline(downloads(), str(unpacked), [], stop=stop))
+    assert stop.is_set()
+
+
+def test_pipeline_passes_archives_through_with_from_zip(tmp_path, monkeypatch):
+    unpacked = tmp_path / "unpacked"
+    unpacked.mkdir()
+    archive = tmp_path / "cases.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("a.csv", "court_name;case_number\nCourt;P-1\n")
+
+    def downloads():
+        yield {"name": "new", "url": "u1", "path": str(archive), "status": "success"}
+        yield {
+            "name": "same",
+            "url": "u2",
+            "path": str(archive),
+            "status": "not_modified",
+        }
+
+    imported = []
+
+    async def fake_import(unpacked_dir, sources, **options):
+        imported.extend([source async for source in sources])
+
+    monkeypatch.setattr(main, "import_csv_files", fake_import)
+    asyncio.run(main.run_pipeline(downloads(), str(unpacked), [], from_zip=True))
+
+    assert imported == [str(archive), str(archive)]
+    assert list(unpacked.iterdir()) == []
+
+
+def test_pipeline_records_download_and_unpack_metrics(tmp_path, monkeypatch):
+    unpacked = tmp_path / "unpacked"
+    unpacked.mkdir()
+    archive = tmp_path / "cases.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("a.csv", "court_name;case_number\nCourt;P-1\n")
+        zf.writestr("readme.txt", "not imported")
+
+    def downloads():
+        yield {
+            "name": "cases",
+            "url": "u1",
+            "path": str(archive),
+            "status": "success",
+            "seconds": 0.5,
+        }
+
+    received = {}
+
+    async def fake_import(unpacked_dir, sources, metrics=None, **options):
+        received["metrics"] = metrics
+        [source async for source in sources]
+
+    monkeypatch.setattr(main, "import_csv_files", fake_import)
+    metrics = RunMetrics()
+    asyncio.run(main.run_pipeline(downloads(), str(unpacked), [], metrics=metrics))
+
+    report = metrics.report()
+    assert received["metrics"] is metrics
+    assert report["files"]["download"]["cases"] == {
+        "wall_seconds": 0.5,
+        "bytes_out": archive.stat().st_size,
+        "status": "success",
+    }
+    unpack = report["files"]["unpack"]["cases"]
+    assert unpack["files"] == 1
+    assert unpack["bytes_out"] == len("court_name;case_number\nCourt;P-1\n")
+
+
+def test_main_keeps_a_changed_csv_planned_until_it_is_fetched(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = tmp_path / "data"
+    data.mkdir()
+    old = {"id": "r1", "url": "http://x/cases.csv", "format": "CSV"}
+    (data / main.SNAPSHOT_FILE).write_text(
+        json.dumps({"r1": {**old, "last_modified": "2024-01-01"}})
+    )
+    metadata = {"resources": [{**old, "last_modified": "2024-02-01"}]}
+    monkeypatch.setattr(main, "fetch_dataset_metadata", lambda *a, **k: metadata)
+
+    def fake_iter_downloads(resources, output_dir, **kwargs):
+        assert [res["id"] for res in resources] == ["r1"]
+        # An old copy still in unpacked: nothing new was imported.
+        yield {"name": None, "url": old["url"], "path": "", "status": "skipped"}
+
+    async def fake_pipeline(downloads, unpacked_dir, results, **options):
+        results.extend(downloads)
+
+    monkeypatch.setattr(main, "iter_downloads", fake_iter_downloads)
+    monkeypatch.setattr(main, "run_pipeline", fake_pipeline)
+    main.main([])
+
+    snapshot = json.loads((data / main.SNAPSHOT_FILE).read_text())
+    assert snapshot["r1"]["last_modified"] == "2024-01-01"
@@ -0,0 +1,77 @@
+import json
+
+from metrics import RunMetrics
+
+
+def test_record_aggregates_stages_and_files():
+    metrics = RunMetrics()
+    metrics.record(
+        "normalize",
+        "a.csv",
+        wall=0.5,
+        cpu=0.4,
+        rows_in=10,
+        rows_out=8,
+        rows_dropped_blank=1,
+        rows_dropped_duplicate=1,
+        digest="abc",
+    )
+    metrics.record("normalize", "b.csv", wall=0.25, cpu=0.2, rows_in=6, rows_out=6)
+    metrics.record("merge", wall=0.1, rows_merged=14)
+    metrics.finish()
+    report = metrics.report()
+
+    normalize = report["stages"]["normalize"]
+    assert normalize["items"] == 2
+    assert normalize["busy_seconds"] == 0.75
+    assert normalize["cpu_seconds"] == 0.6
+    assert normalize["rows_in"] == 16
+    assert normalize["rows_out"] == 14
+    assert normalize["rows_dropped"] == 2
+    assert normalize["wall_seconds"] >= 0.5
+    assert report["files"]["normalize"]["a.csv"] == {
+        "wall_seconds": 0.5,
+        "cpu_seconds": 0.4,
+        "rows_in": 10,
+        "rows_out": 8,
+        "rows_dropped_blank": 1,
+        "rows_dropped_duplicate": 1,
+        "digest": "abc",
+    }
+    assert report["stages"]["merge"]["rows_merged"] == 14
+    assert "merge" not in report["files"]
+    assert report["status"] == "success"
+    assert report["wall_seconds"] is not None
+
+
+def test_measure_records_failed_work_too():
+    metrics = RunMetrics()
+    try:
+        with metrics.measure("unpack", "a.zip") as counters:
+            counters["bytes_in"] = 100
+            raise OSError("disk full")
+    except OSError:
+        pass
+
+    report = metrics.report()
+    assert report["stages"]["unpack"]["bytes_in"] == 100
+    assert report["files"]["unpack"]["a.zip"]["bytes_in"] == 100
+
+
+def test_write_json_and_prometheus(tmp_path):
+    metrics = RunMetrics()
+    metrics.record("copy", "connection 0", wall=1.0, rows_in=5, bytes_in=2048)
+    metrics.finish("failed")
+
+    report_path = tmp_path / "run_report.json"
+    metrics.write_json(str(report_path))
+    assert json.loads(report_path.read_text())["status"] == "failed"
+
+    textfile = tmp_path / "textfile" / "courtcases.prom"
+    metrics.write_prometheus(str(textfile))
+    lines = textfile.read_text().splitlines()
+    assert "courtcases_run_success 0" in lines
+    assert "# TYPE courtcases_stage_rows_in gauge" in lines
+    assert 'courtcases_stage_rows_in{stage="copy"} 5' in lines
+    assert 'courtcases_stage_bytes_in{stage="copy"} 2048' in lines
+    assert [p.name for p in textfile.parent.iterdir()] == ["courtcases.prom"]
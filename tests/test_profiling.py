@@ -0,0 +1,77 @@
+import contextlib
+import os
+import pstats
+import tracemalloc
+
+import pytest
+
+import profiling
+
+
+@pytest.fixture(autouse=True)
+def stop_tracing():
+    yield
+    profiling.disable_profiling()
+    tracemalloc.stop()
+
+
+def test_profile_is_a_no_op_when_disabled(tmp_path, monkeypatch):
+    monkeypatch.delenv(profiling.PROFILE_DIR_ENV, raising=False)
+
+    section = profiling.profile("normalize", "a.csv")
+
+    assert isinstance(section, contextlib.nullcontext)
+    with section:
+        pass
+    assert not tracemalloc.is_tracing()
+    assert profiling._profiler is None
+
+
+def test_profile_writes_dumps_per_stage_and_file(tmp_path, monkeypatch):
+    # Registered first, so the variable is restored after the test.
+    monkeypatch.setenv(profiling.PROFILE_DIR_ENV, "")
+    profiling.enable_profiling(str(tmp_path / "profiles"))
+
+    with profiling.profile("normalize", "cases.zip::2024 a.csv"):
+        blocks = [bytearray(1024) for _ in range(1024)]
+    del blocks
+
+    base = tmp_path / "profiles" / "normalize-cases.zip_2024_a.csv"
+    assert not os.path.exists(str(base) + ".prof")
+    assert tracemalloc.Snapshot.load(str(base) + ".tracemalloc").traces
+    summary = (tmp_path / "profiles" / f"{base.name}.txt").read_text()
+    assert "stage: normalize" in summary
+    assert "file: cases.zip::2024 a.csv" in summary
+    peak = float(summary.split("peak_traced_mb: ")[1].split()[0])
+    assert peak >= 1.0
+
+
+def _copy_a():
+    return sum(range(1000))
+
+
+def _copy_b():
+    return sum(range(1000))
+
+
+def test_overlapping_sections_share_one_process_profile(tmp_path, monkeypatch):
+    monkeypatch.setenv(profiling.PROFILE_DIR_ENV, "")
+    profiling.enable_profiling(str(tmp_path))
+
+    with profiling.profile("copy", "a"):
+        _copy_a()
+        with profiling.profile("copy", "b"):
+            _copy_b()
+    profiling.disable_profiling()
+
+    for name in ("copy-a", "copy-b"):
+        summary = (tmp_path / f"{name}.txt").read_text()
+        assert f"cprofile: cprofile-{os.getpid()}.prof" in summary
+    stats = pstats.Stats(profiling.process_profile_path(str(tmp_path)))
+    called = {func for _, _, func in stats.stats}
+    assert {"_copy_a", "_copy_b"} <= called
+
+
+def test_dump_name_without_file():
+    assert profiling.dump_name("merge") == "merge"
+    assert profiling.dump_name("copy", "connection 0") == "copy-connection_0"
@@ -1,6 +1,11 @@
+import hashlib
+import http.server
 import os
+import threading
 from typing import Optional
 
+import pytest
+
 import resource_downloader
 
 
@@ -87,6 +92,9 @@ class FakeSession:
             content=self._content,
         )
 
+    def close(self):
+        pass
+
 
 def test_download_file_success(tmp_path, monkeypatch):
     monkeypatch.setattr(resource_downloader, "tqdm", DummyTqdm)
@@ -113,7 +121,15 @@ def test_download_all_files_aggregates_results(tmp_path, monkeypatch):
         {"name": "C", "url": "https://example.com/c.bin"},
     ]
 
-    def fake_download(url, output_dir, position=0):
+    def fake_download(
+        url,
+        output_dir,
+        position=0,
+        session=None,
+        cache_entry=None,
+        integrity=None,
+        stop=None,
+    ):
         if url.endswith("/c.bin"):
             raise RuntimeError("boom")
         return os.path.join(output_dir, os.path.basename(url))
@@ -126,6 +142,430 @@ def test_download_all_files_aggregates_results(tmp_path, monkeypatch):
     )
 
     assert len(results) == 2
+    assert {r["name"]: r["url"] for r in results} == {
+        "A": "https://example.com/a.bin",
+        "C": "https://example.com/c.bin",
+    }
     statuses = {r["name"]: r["status"] for r in results}
     assert statuses.get("A") == "success"
     assert statuses.get("C") == "failed"
+
+
+@pytest.fixture
+def local_server(tmp_path):
+    served = tmp_path / "served"
+    served.mkdir()
+    requests_seen = []
+
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=str(served), **kwargs)
+
+        def send_head(self):
+            requests_seen.append((self.command, self.client_address[1]))
+            return super().send_head()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", served, requests_seen
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_download_file_aborts_once_stopped(tmp_path, monkeypatch):
+    monkeypatch.setattr(resource_downloader, "tqdm", DummyTqdm)
+    stop = threading.Event()
+    stop.set()
+
+    with pytest.raises(resource_downloader.DownloadCancelled):
+        resource_downloader.download_file(
+            "https://example.com/file.bin",
+            str(tmp_path),
+            session=FakeSession(b"data"),
+            stop=stop,
+        )
+
+
+def test_iter_downloads_returns_once_stopped(tmp_path, monkeypatch):
+    monkeypatch.setattr(resource_downloader, "tqdm", DummyTqdm)
+    started = []
+
+    def fake_download(url, output_dir, position=0, stop=None, **kwargs):
+        if not stop.is_set():
+            started.append(url)
+            assert stop.wait(10)
+        raise resource_downloader.DownloadCancelled(url)
+
+    monkeypatch.setattr(resource_downloader, "download_file", fake_download)
+    resources = [{"name": n, "url": f"https://example.com/{n}.bin"} for n in "abc"]
+    stop = threading.Event()
+    downloads = resource_downloader.iter_downloads(
+        resources, str(tmp_path), max_workers=1, stop=stop
+    )
+    timer = threading.Timer(0.2, stop.set)
+    timer.start()
+
+    assert list(downloads) == []
+    assert started == ["https://example.com/a.bin"]
+
+
+def test_download_all_files_reuses_connections_without_head(
+    tmp_path, monkeypatch, local_server
+):
+    monkeypatch.setattr(resource_downloader, "tqdm", DummyTqdm)
+    base_url, served, requests_seen = local_server
+    resources = []
+    for n in range(12):
+        (served / f"file{n}.zip").write_bytes(bytes([n]) * 4096)
+        resources.append({"name": str(n), "url": f"{base_url}/file{n}.zip"})
+
+    out_dir = tmp_path / "dl"
+    results = resource_downloader.download_all_files(
+        resources, str(out_dir), max_workers=2
+    )
+
+    assert {r["status"] for r in results} == {"success"}
+    for n in range(12):
+        assert (out_dir / f"file{n}.zip").read_bytes() == bytes([n]) * 4096
+    assert [method for method, _ in requests_seen] == ["GET"] * 12
+    # Two workers share one pooled session, so at most two connections are opened.
+    assert len({port for _, port in requests_seen}) <= 2
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    payload = b""
+    ranges = True
+    etag = None
+    corrupt_once = False
+    seen: list = []
+
+    def do_GET(self):
+        header = self.headers.get("Range")
+        self.seen.append(header)
+        size = len(self.payload)
+        if self.etag and self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        payload = self.payload
+        if self.corrupt_once and header != "bytes=0-0":
+            type(self).corrupt_once = False
+            payload = bytes(len(payload))
+        if header and self.ranges:
+            start, end = header.removeprefix("bytes=").split("-")
+            start, end = int(start), min(int(end or size - 1), size - 1)
+            body = payload[start : end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            body = payload
+            self.send_response(200)
+        if self.etag:
+            self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def range_server():
+    payload = os.urandom(64 * 1024 + 7)
+    handler = type("Handler", (RangeHandler,), {"payload": payload, "seen": []})
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/big.zip", handler
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_download_segmented_writes_ranges_at_offsets(
+    tmp_path, monkeypatch, range_server
+):
+    monkeypatch.setattr(resource_downloader, "tqdm", DummyTqdm)
+    url, handler = range_server
+
+    path = resource_downloader.download_segmented(
+        url, str(tmp_path), segments=4, min_segment_size=1024
+    )
+
+    assert open(path, "rb").read() == handler.payload
+    assert not os.path.exists(path + resource_downloader.SEGMENT_STATE_SUFFIX)
+    assert sorted(handler.seen[1:]) == [
+        "bytes=0-16385",
+        "bytes=16386-32771",
+        "bytes=32772-49157",
+        "bytes=49158-65542",
+    ]
+
+
+def test_download_segmented_resumes_from_state(tmp_path, monkeypatch, range_server):
+    monkeypatch.setattr(resource_downloader, "tqdm", DummyTqdm)
+    url, handler = range_server
+    size = len(handler.payload)
+    target = tmp_path / "big.zip"
+
+    # Simulate an interrupted run: first half of segment 0 and all of segment 1.
+    segments = resource_downloader._split_ranges(size, 2)
+    partial = bytearray(size)
+    half = (segments[0][1] + 1) // 2
+    partial[:half] = handler.payload[:half]
+    partial[segments[1][0] :] = handler.payload[segments[1][0] :]
+    target.write_bytes(bytes(partial))
+    segments[0][2] = half
+    segments[1][2] = segments[1][1] - segments[1][0] + 1
+    resource_downloader.save_json(
+        str(target) + resource_downloader.SEGMENT_STATE_SUFFIX,
+        {"url": url, "size": size, "segments": segments},
+    )
+
+    resource_downloader.download_segmented(
+        url, str(tmp_path), segments=2, min_segment_size=1024
+    )
+
+    assert target.read_bytes() == handler.payload
+    assert handler.seen[1:] == [f"bytes={half}-{segments[0][1]}"]
+
+
+def test_download_segmented_restarts_when_the_remote_was_replaced(
+    tmp_path, monkeypatch, range_server
+):
+    monkeypatch.setattr(resource_downloader, "tqdm", DummyTqdm)
+    url, handler = range_server
+    size = len(handler.payload)
+    target = tmp_path / "big.zip"
+
+    # Half of the old version, then the file is replaced by one of the same size.
+    segments = resource_downloader._split_ranges(size, 2)
+    old = os.urandom(size)
+    target.write_bytes(old[: size // 2] + bytes(size - size // 2))
+    segments[0][2] = segments[0][1] - segments[0][0] + 1
+    resource_downloader.save_json(
+        str(target) + resource_downloader.SEGMENT_STATE_SUFFIX,
+        {"url": url, "size": size, "etag": '"v1"', "segments": segments},
+    )
+    handler.etag = '"v2"'
+
+    resource_downloader.download_segmented(
+        url, str(tmp_path), segments=2, min_segment_size=1024
+    )
+
+    assert target.read_bytes() == handler.payload
+    assert sorted(handler.seen[1:]) == sorted(
+        f"bytes={start}-{end}" for start, end, _ in segments
+    )
+
+
+def test_download_segmented_falls_back_without_range_support(
+    tmp_path, monkeypatch, range_server
+):
+    monkeypatch.setattr(resource_downloader, "tqdm", DummyTqdm)
+    url, handler = range_server
+    handler.ranges = False
+
+    path = resource_downloader.download_segmented(
+        url, str(tmp_path), segments=4, min_segment_size=1024
+    )
+
+    assert open(path, "rb").read() == handler.payload
+    assert handler.seen == ["bytes=0-0", None]
+
+
+@pytest.mark.parametrize("segments", [1, 4])
+def test_download_all_files_skips_unchanged_resources(
+    tmp_path, monkeypatch, range_server, segments
+):
+    monkeypatch.setattr(resource_downloader, "tqdm", DummyTqdm)
+    monkeypatch.setattr(resource_downloader, "MIN_SEGMENT_SIZE", 1024)
+    url, handler = range_server
+    handler.etag = '"v1"'
+    resources = [{"name": "big", "url": url}]
+
+    def _run():
+        handler.seen.clear()
+        return resource_downloader.download_all_files(
+            resources, str(tmp_path), max_workers=1, segments=segments
+        )
+
+    (first,) = _run()
+    assert first["status"] == "success"
+    cache = resource_downloader.load_json(
+        str(tmp_path / resource_downloader.HTTP_CACHE_FILE)
+    )
+    assert cache[url]["etag"] == '"v1"'
+    assert cache[url]["content_length"] == len(handler.payload)
+
+    results = _run()
+    assert isinstance(results[0].pop("seconds"), float)
+    assert results == [
+        {
+            "name": "big",
+            "url": url,
+            "path": str(tmp_path / "big.zip"),
+            "status": "not_modified",
+            "digest": first["digest"],
+        }
+    ]
+    assert len(handler.seen) == 1
+
+    handler.etag = '"v2"'
+    handler.payload = handler.payload[::-1]
+    assert [r["status"] for r in _run()] == ["success"]
+    assert (tmp_path / "big.zip").read_bytes() == handler.payload
+
+
+@pytest.mark.parametrize("segments", [1, 4])
+def test_cached_validators_need_the_local_file(
+    tmp_path, monkeypatch, range_server, segments
+):
+    monkeypatch.setattr(resource_downloader, "tqdm", DummyTqdm)
+    monkeypatch.setattr(resource_downloader, "MIN_SEGMENT_SIZE", 1024)
+    url, handler = range_server
+    handler.etag = '"v1"'
+    resources = [{"name": "big", "url": url}]
+
+    def _run():
+        return resource_downloader.download_all_files(
+            resources, str(tmp_path), max_workers=1, segments=segments
+        )
+
+    assert [r["status"] for r in _run()] == ["success"]
+    # Deleted, e.g. by --delete-archives: a 304 would leave nothing to import.
+    (tmp_path / "big.zip").unlink()
+    assert [r["status"] for r in _run()] == ["success"]
+    assert (tmp_path / "big.zip").read_bytes() == handler.payload
+
+
+def test_forced_downloads_skip_no_resource(tmp_path, monkeypatch, range_server):
+    monkeypatch.setattr(resource_downloader, "tqdm", DummyTqdm)
+    url, handler = range_server
+    handler.etag = '"v1"'
+    unpacked = tmp_path / "unpacked"
+    unpacked.mkdir()
+    (unpacked / "cases.csv").write_text("old")
+    resources = [
+        {"name": "big", "url": url},
+        {"name": "csv", "url": url.replace("big.zip", "cases.csv"), "format": "CSV"},
+    ]
+
+    def _run(force):
+        results = resource_downloader.iter_downloads(
+            resources, str(tmp_path), max_workers=1, force=force
+        )
+        return {r["name"]: r["status"] for r in results}
+
+    # Nothing vouches for the old copy, so it is fetched again.
+    assert _run(force=False) == {"big": "success", "csv": "success"}
+    os.replace(tmp_path / "cases.csv", unpacked / "cases.csv")
+    assert _run(force=False) == {"big": "not_modified", "csv": "skipped"}
+    handler.seen.clear()
+    assert _run(force=True) == {"big": "success", "csv": "success"}
+    # Fetched whole: no resume range and no revalidation.
+    assert handler.seen == [None, None]
+
+
+def test_changed_csv_in_unpacked_is_downloaded_again(
+    tmp_path, monkeypatch, range_server
+):
+    monkeypatch.setattr(resource_downloader, "tqdm", DummyTqdm)
+    url, handler = range_server
+    handler.etag = '"v1"'
+    unpacked = tmp_path / "unpacked"
+    unpacked.mkdir()
+    resources = [
+        {"name": "csv", "url": url.replace("big.zip", "cases.csv"), "format": "CSV"}
+    ]
+
+    def _run():
+        return list(
+            resource_downloader.iter_downloads(resources, str(tmp_path), max_workers=1)
+        )
+
+    assert [r["status"] for r in _run()] == ["success"]
+    # The unpack stage moves downloaded CSVs into unpacked.
+    os.replace(tmp_path / "cases.csv", unpacked / "cases.csv")
+    assert [r["status"] for r in _run()] == ["skipped"]
+
+    handler.payload = b"court_name;case_number\nCourt;P-1\n"
+    handler.etag = '"v2"'
+    [result] = _run()
+
+    assert result["status"] == "success"
+    assert result["path"] == str(tmp_path / "cases.csv")
+    assert (tmp_path / "cases.csv").read_bytes() == handler.payload
+
+
+def test_expected_digest_from_ckan_hash():
+    assert resource_downloader._expected_digest("A" * 32) == ("md5", "a" * 32)
+    assert resource_downloader._expected_digest("sha1:" + "b" * 40) == (
+        "sha1",
+        "b" * 40,
+    )
+    assert resource_downloader._expected_digest("c" * 64)[0] == "sha256"
+    assert resource_downloader._expected_digest("") == ("blake2b", None)
+    assert resource_downloader._expected_digest("not-a-hash") == ("blake2b", None)
+
+
+@pytest.mark.parametrize("segments", [1, 4])
+def test_download_retries_corrupt_file(tmp_path, monkeypatch, range_server, segments):
+    monkeypatch.setattr(resource_downloader, "tqdm", DummyTqdm)
+    monkeypatch.setattr(resource_downloader, "MIN_SEGMENT_SIZE", 1024)
+    url, handler = range_server
+    handler.ranges = segments > 1
+    handler.corrupt_once = True
+    md5 = hashlib.md5(handler.payload).hexdigest()
+
+    results = resource_downloader.download_all_files(
+        [{"name": "big", "url": url, "hash": md5, "size": len(handler.payload)}],
+        str(tmp_path),
+        max_workers=1,
+        segments=segments,
+    )
+
+    (result,) = results
+    assert result["status"] == "success"
+    assert result["digest"] == f"md5:{md5}"
+    assert result["verified"] is True
+    assert (tmp_path / "big.zip").read_bytes() == handler.payload
+    # The corrupt copy was detected and fetched again.
+    assert len(handler.seen) == (2 if segments == 1 else 10)
+
+
+def test_resumed_download_hashes_existing_prefix(tmp_path, monkeypatch, range_server):
+    monkeypatch.setattr(resource_downloader, "tqdm", DummyTqdm)
+    url, handler = range_server
+    (tmp_path / "big.zip").write_bytes(handler.payload[:1000])
+    sha256 = hashlib.sha256(handler.payload).hexdigest()
+    integrity = {"hash": sha256, "size": str(len(handler.payload))}
+
+    resource_downloader.download_file(url, str(tmp_path), integrity=integrity)
+
+    assert handler.seen == ["bytes=1000-"]
+    assert integrity["digest"] == f"sha256:{sha256}"
+    assert integrity["verified"] is True
+
+
+def test_download_rejects_wrong_size(tmp_path, monkeypatch, range_server):
+    monkeypatch.setattr(resource_downloader, "tqdm", DummyTqdm)
+    url, handler = range_server
+
+    with pytest.raises(RuntimeError, match="size"):
+        resource_downloader.download_file(
+            url, str(tmp_path), integrity={"size": len(handler.payload) + 1}
+        )
+    assert not (tmp_path / "big.zip").exists()
@@ -1,5 +1,6 @@
 from datetime import date
 
+import pandas as pd
 import pytest
 
 import utils
@@ -27,3 +28,37 @@ def test_parse_date_invalid(value):
 @pytest.mark.parametrize("value", ["", "   ", None, 123])
 def test_parse_date_non_string_or_blank(value):
     assert utils.parse_date(value) is None
+
+
+def test_parse_dates_matches_parse_date():
+    values = pd.Series(
+        [
+            "01.02.2020",
+            " 31.12.1999 ",
+            "1.2.2020",
+            "32.01.2020",
+            "2020-02-01",
+            "01.02.0999",
+            "",
+            None,
+            float("nan"),
+            "01.02.2020",
+        ],
+        index=range(10, 20),
+    )
+    result = utils.parse_dates(values)
+    assert list(result.index) == list(values.index)
+    assert list(result) == [utils.parse_date(v) for v in values]
+    assert result.iloc[0] == date(2020, 2, 1)
+    assert result.iloc[5] == date(999, 2, 1)
+    assert result.iloc[6] is None
+    assert result.iloc[7] is None
+
+
+def test_parse_dates_empty_and_all_missing():
+    assert utils.parse_dates(pd.Series([], dtype=object)).empty
+    assert list(utils.parse_dates(pd.Series([None, None]))) == [None, None]
+
+
+def test_worker_context_never_forks():
+    assert utils.worker_context().get_start_method() in ("forkserver", "spawn")
@@ -1,6 +1,7 @@
 import os
 import zipfile
 
+import zip_unpacker
 from zip_unpacker import unpack_zip
 
 
@@ -25,3 +26,70 @@ def test_unpack_invalid_zip(tmp_path):
 
     extracted = unpack_zip(str(zip_path), str(out_dir))
     assert extracted == []
+
+
+def test_zip_member_sources(tmp_path):
+    zip_path = tmp_path / "sample.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("data/file1.csv", "a,b\n1,2\n")
+        zf.writestr("readme.txt", "hello")
+
+    sources = zip_unpacker.list_csv_members(str(zip_path))
+    assert sources == [f"{zip_path}::data/file1.csv"]
+    assert zip_unpacker.split_source(sources[0]) == (str(zip_path), "data/file1.csv")
+    assert zip_unpacker.source_key(sources[0]) == "sample.zip::data/file1.csv"
+
+    with zip_unpacker.open_source(sources[0]) as f:
+        assert f.read() == b"a,b\n1,2\n"
+    size, mtime_ns = zip_unpacker.source_stat(sources[0])
+    assert (size, mtime_ns) == (8, None)
+    assert zip_unpacker.source_digest(sources[0]).startswith("crc32:")
+    assert not (tmp_path / "data").exists()
+
+
+def test_list_csv_members_invalid_zip(tmp_path):
+    zip_path = tmp_path / "broken.zip"
+    zip_path.write_bytes(b"nope")
+    assert zip_unpacker.list_csv_members(str(zip_path)) == []
+
+
+def test_unpack_zip_extracts_only_csv_and_skips_identical(tmp_path, capsys):
+    zip_path = tmp_path / "sample.zip"
+    out_dir = tmp_path / "out"
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("a.csv", "a,b\n1,2\n")
+        zf.writestr("b.csv", "a,b\n3,4\n")
+        zf.writestr("readme.txt", "hello")
+
+    first = unpack_zip(str(zip_path), str(out_dir))
+    assert sorted(os.listdir(out_dir)) == ["a.csv", "b.csv"]
+    assert "2 CSV, 0 already present" in capsys.readouterr().out
+
+    (out_dir / "b.csv").write_text("a,b\n9,9\n")
+    os.utime(out_dir / "a.csv", ns=(1, 1))
+    second = unpack_zip(str(zip_path), str(out_dir))
+
+    assert second == first
+    assert "1 CSV, 1 already present" in capsys.readouterr().out
+    assert os.stat(out_dir / "a.csv").st_mtime_ns == 1
+    assert (out_dir / "b.csv").read_text() == "a,b\n3,4\n"
+
+
+def test_unpack_zip_spreads_members_over_pool(tmp_path, monkeypatch):
+    zip_path = tmp_path / "big.zip"
+    out_dir = tmp_path / "out"
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for n in range(4):
+            zf.writestr(f"part{n}.csv", f"a,b\n{n},{n}\n" * 1000)
+    monkeypatch.setattr(zip_unpacker, "PARALLEL_UNPACK_MIN_BYTES", 0)
+
+    pool = zip_unpacker.create_unpack_pool(2)
+    try:
+        extracted = unpack_zip(str(zip_path), str(out_dir), pool)
+    finally:
+        pool.shutdown()
+
+    assert [os.path.basename(p) for p in extracted] == [
+        f"part{n}.csv" for n in range(4)
+    ]
+    assert (out_dir / "part3.csv").read_text() == "a,b\n3,3\n" * 1000